@@ -0,0 +1,562 @@
+# backend/benchmark.py
+"""
+Command-line benchmarks for the indexing backends.
+
+Usage:
+    python -m backend.benchmark detection <image_folder> [--batch-sizes 1 4 8 16]
+    python -m backend.benchmark scaling <image_folder> [--workers 1 2 4 8]
+    python -m backend.benchmark accuracy <image_folder> [--backend onnx-int8]
+    python -m backend.benchmark index-search [--images 500000]
+    python -m backend.benchmark face-match [--clusters 10000]
+    python -m backend.benchmark face-ann [--clusters 200000]
+    python -m backend.benchmark face-detect <image_folder> <labels.json> [--sides 0 640 1024 1600]
+    python -m backend.benchmark face-search [--faces 100000]
+    python -m backend.benchmark ocr <image_folder> [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import time
+
+from backend.onnx_backend import BACKENDS
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def list_images(folder, limit=None):
+    """Return sorted image paths in folder, optionally capped at limit."""
+    paths = sorted(
+        os.path.join(folder, f) for f in os.listdir(folder)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def load_detector(backend="torch"):
+    """Build an ObjectDetector from the registry entries for backend."""
+    from backend.model_loader import get_model, detection_model_names
+    from backend.object_detector import ObjectDetector
+
+    yolo_name, detr_name = detection_model_names(backend)
+    return ObjectDetector(get_model(yolo_name), *get_model(detr_name))
+
+
+def benchmark_detection(image_folder, batch_sizes=(1, 4, 8, 16), limit=64, backend="torch"):
+    """
+    Measure ObjectDetector throughput at several mini-batch sizes.
+
+    Returns:
+        list: (batch_size, images_per_second) tuples
+    """
+    from backend.frame_decoder import decode_frames
+
+    image_paths = list_images(image_folder, limit)
+    if not image_paths:
+        raise ValueError(f"No images found in {image_folder}")
+
+    detector = load_detector(backend)
+    # Warm-up so lazy initialisation is not charged to the first batch size
+    detector.detect_batch(decode_frames(image_paths[:1]))
+
+    rows = []
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(image_paths), batch_size):
+            detector.detect_batch(decode_frames(image_paths[i:i + batch_size]))
+        elapsed = time.perf_counter() - start
+        rows.append((batch_size, len(image_paths) / elapsed))
+        print(f"batch={batch_size:<3d} {len(image_paths) / elapsed:8.2f} images/sec")
+    return rows
+
+
+def benchmark_scaling(image_folder, worker_counts=(1, 2, 4, 8), batch_size=8, limit=256):
+    """
+    Measure sharded multi-process detection throughput for several pool sizes.
+
+    Workers are started and warmed before timing, so the numbers are steady-state.
+
+    Returns:
+        list: (workers, images_per_second, speedup_vs_first) tuples
+    """
+    from backend.parallel_detection import ParallelDetectionEngine
+
+    image_paths = list_images(image_folder, limit)
+    if not image_paths:
+        raise ValueError(f"No images found in {image_folder}")
+    shards = [(i, image_paths[i:i + batch_size]) for i in range(0, len(image_paths), batch_size)]
+
+    rows = []
+    for workers in worker_counts:
+        engine = ParallelDetectionEngine(workers)
+        try:
+            engine.warm_up()
+            start = time.perf_counter()
+            for _ in engine.detect(shards):
+                pass
+            rate = len(image_paths) / (time.perf_counter() - start)
+        finally:
+            engine.shutdown()
+        speedup = rate / rows[0][1] if rows else 1.0
+        rows.append((workers, rate, speedup))
+        print(f"workers={workers:<3d} threads/worker={engine.threads_per_worker:<3d} "
+              f"{rate:8.2f} images/sec  x{speedup:.2f}")
+    return rows
+
+
+def benchmark_accuracy(image_folder, backend="onnx-int8", reference="torch", batch_size=8, limit=64):
+    """
+    Compare a candidate inference backend against the reference on a sample folder.
+
+    For every image the label sets from both backends are compared, and for
+    labels found by both the absolute score difference is recorded.
+
+    Returns:
+        dict: Summary with label agreement, score deltas and throughput of both backends
+    """
+    from backend.frame_decoder import decode_frames
+    from backend.index_manager import objects_above
+    from backend.object_detector import DEFAULT_QUERY_THRESHOLD
+
+    image_paths = list_images(image_folder, limit)
+    if not image_paths:
+        raise ValueError(f"No images found in {image_folder}")
+    batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+
+    outputs, rates = {}, {}
+    for name in (reference, backend):
+        detector = load_detector(name)
+        detector.detect_batch(decode_frames(batches[0][:1]))
+        results = []
+        start = time.perf_counter()
+        for batch in batches:
+            results.extend(detector.detect_batch(decode_frames(batch)))
+        rates[name] = len(image_paths) / (time.perf_counter() - start)
+        outputs[name] = results
+
+    jaccards, deltas, mismatched = [], [], []
+    for image_path, ref, cand in zip(image_paths, outputs[reference], outputs[backend]):
+        # Compare what the search would show at its default threshold
+        ref = objects_above(ref, DEFAULT_QUERY_THRESHOLD)
+        cand = objects_above(cand, DEFAULT_QUERY_THRESHOLD)
+        ref_labels, cand_labels = set(ref), set(cand)
+        union = ref_labels | cand_labels
+        jaccards.append(len(ref_labels & cand_labels) / len(union) if union else 1.0)
+        deltas.extend(abs(ref[label] - cand[label]) for label in ref_labels & cand_labels)
+        if ref_labels != cand_labels:
+            mismatched.append((os.path.basename(image_path), sorted(ref_labels - cand_labels), sorted(cand_labels - ref_labels)))
+
+    summary = {
+        "images": len(image_paths),
+        "label_jaccard_mean": sum(jaccards) / len(jaccards),
+        "exact_label_match": 1 - len(mismatched) / len(image_paths),
+        "score_delta_mean": sum(deltas) / len(deltas) if deltas else 0.0,
+        "score_delta_max": max(deltas) if deltas else 0.0,
+        "images_per_second": rates,
+    }
+    print(f"{backend} vs {reference} on {len(image_paths)} images")
+    print(f"  label Jaccard (mean)   {summary['label_jaccard_mean']:.4f}")
+    print(f"  identical label sets   {summary['exact_label_match']:.2%}")
+    print(f"  |score delta| mean/max {summary['score_delta_mean']:.4f} / {summary['score_delta_max']:.4f}")
+    print(f"  images/sec             {reference}: {rates[reference]:.2f}  {backend}: {rates[backend]:.2f}")
+    for filename, missing, extra in mismatched:
+        print(f"  {filename}: missing {missing} extra {extra}")
+    return summary
+
+
+def benchmark_index_search(images=500000, labels=600, labels_per_image=4, queries=("dog", "car", "person", "e"),
+                           threshold=0.7, seed=0):
+    """
+    Build a synthetic ObjectIndex and time label searches against it.
+
+    Returns:
+        dict: {query: (matches, milliseconds)} plus the build time under "build_seconds"
+    """
+    import random
+    import tempfile
+    from backend.index_manager import ObjectIndex
+
+    rng = random.Random(seed)
+    names = [f"label{i}" for i in range(labels - 3)] + ["dog", "car", "person"]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ObjectIndex(os.path.join(tmp, "object_index.db"))
+        start = time.perf_counter()
+        chunk = {}
+        for i in range(images):
+            objects = {label: round(rng.uniform(0.25, 1.0), 4) for label in rng.sample(names, labels_per_image)}
+            chunk[f"img_{i:07d}.jpg"] = {"objects": objects, "tier": "full"}
+            if len(chunk) == 10000:
+                index.put_many(chunk)
+                chunk = {}
+        index.put_many(chunk)
+        build_seconds = time.perf_counter() - start
+        print(f"Built index of {images} images in {build_seconds:.1f}s")
+
+        rows = {"build_seconds": build_seconds}
+        for query in queries:
+            start = time.perf_counter()
+            matches = index.search(query, threshold)
+            elapsed_ms = 1000 * (time.perf_counter() - start)
+            rows[query] = (len(matches), elapsed_ms)
+            print(f"  '{query}' >= {threshold}: {len(matches):>7} matches in {elapsed_ms:8.1f} ms")
+        index.close()
+    return rows
+
+
+def benchmark_face_match(clusters=10000, faces=500, seed=0):
+    """
+    Compare the per-cluster Python loop with FaceClusterIndex on synthetic encodings.
+
+    The loop reproduces the old matching: rebuild each cluster's array from
+    its JSON list and test it with a one-element distance check, stopping at
+    the first cluster under tolerance.
+
+    Returns:
+        dict: Faces per second for "loop" and "index", and how often they picked the same cluster
+    """
+    import numpy as np
+    from backend.face_index import FaceClusterIndex, FACE_TOLERANCE
+
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.1, size=(clusters, 128))
+    metadata = {f"Face_{i:05d}": {"images": [], "encoding": centres[i].tolist()} for i in range(clusters)}
+    # Half the probes are near an existing cluster, half are new people
+    targets = rng.integers(0, clusters, size=faces)
+    probes = centres[targets] + rng.normal(0, 0.01, size=(faces, 128))
+    probes[faces // 2:] = rng.normal(0, 0.1, size=(faces - faces // 2, 128))
+
+    start = time.perf_counter()
+    loop_matches = []
+    for encoding in probes:
+        match = None
+        for face_id, data in metadata.items():
+            known = np.array(data["encoding"])
+            if np.linalg.norm(known - encoding) <= FACE_TOLERANCE:
+                match = face_id
+                break
+        loop_matches.append(match)
+    loop_rate = faces / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    index = FaceClusterIndex.from_metadata(metadata)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    index_matches = [index.match(encoding, FACE_TOLERANCE) for encoding in probes]
+    index_rate = faces / (time.perf_counter() - start)
+
+    agreement = sum(a == b for a, b in zip(loop_matches, index_matches)) / faces
+    print(f"{faces} faces against {clusters} clusters")
+    print(f"  python loop   {loop_rate:10.1f} faces/s")
+    print(f"  float32 index {index_rate:10.1f} faces/s  (built in {build_seconds * 1000:.0f} ms)")
+    print(f"  same cluster  {agreement:.2%} (the index picks the nearest, the loop the first under tolerance)")
+    return {"loop": loop_rate, "index": index_rate, "agreement": agreement}
+
+
+def benchmark_face_ann(clusters=200000, queries=500, k=10, nprobes=(1, 4, 16, 64), efs=(16, 64, 256), seed=0):
+    """
+    Recall and latency of the approximate face indexes against exact search.
+
+    Synthetic encodings are drawn around a few thousand identities so the
+    data has the clumpy structure of real face encodings.
+
+    Returns:
+        list: (index, setting, recall@1, recall@k, ms per query) rows
+    """
+    import numpy as np
+    from backend.face_index import FaceClusterIndex, IVFFaceIndex, HnswFaceIndex, hnswlib_available
+
+    rng = np.random.default_rng(seed)
+    people = rng.normal(0, 0.1, size=(max(1, clusters // 50), 128))
+    data = (people[rng.integers(0, len(people), size=clusters)] + rng.normal(0, 0.03, size=(clusters, 128))).astype(np.float32)
+    probes = (data[rng.integers(0, clusters, size=queries)] + rng.normal(0, 0.02, size=(queries, 128))).astype(np.float32)
+    ids = [f"Face_{i:07d}" for i in range(clusters)]
+
+    def build(cls, **kwargs):
+        start = time.perf_counter()
+        index = cls(capacity=clusters, **kwargs)
+        index.add_many(ids, data)
+        return index, time.perf_counter() - start
+
+    def run(index):
+        # One query per call, as when clustering face by face
+        start = time.perf_counter()
+        results = [index.search(probe, k)[0] for probe in probes]
+        return results, 1000 * (time.perf_counter() - start) / queries
+
+    exact, build_seconds = build(FaceClusterIndex)
+    truth, exact_ms = run(exact)
+    rows = [("exact", "-", 1.0, 1.0, exact_ms)]
+    print(f"{clusters} clusters, {queries} queries, k={k}")
+    print(f"  {'index':<6} {'setting':<12} {'recall@1':>9} {'recall@k':>9} {'ms/query':>9}")
+    print(f"  {'exact':<6} {'-':<12} {1.0:9.3f} {1.0:9.3f} {exact_ms:9.3f}   (built in {build_seconds:.1f}s)")
+
+    def report(name, setting, results, ms):
+        top1 = sum(r[0][:1] == t[0][:1] for r, t in zip(results, truth)) / queries
+        topk = sum(len(set(r[0]) & set(t[0])) for r, t in zip(results, truth)) / (queries * k)
+        rows.append((name, setting, top1, topk, ms))
+        print(f"  {name:<6} {setting:<12} {top1:9.3f} {topk:9.3f} {ms:9.3f}")
+
+    ivf, build_seconds = build(IVFFaceIndex)
+    print(f"  ivf built in {build_seconds:.1f}s with {len(ivf.centroids) if ivf.centroids is not None else 0} lists")
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        report("ivf", f"nprobe={nprobe}", *run(ivf))
+
+    if hnswlib_available():
+        hnsw, build_seconds = build(HnswFaceIndex)
+        print(f"  hnsw built in {build_seconds:.1f}s")
+        for ef in efs:
+            hnsw.ef = ef
+            report("hnsw", f"ef={ef}", *run(hnsw))
+    else:
+        print("  hnsw skipped (pip install hnswlib to include it)")
+    return rows
+
+
+def _box_iou(a, b):
+    """IoU of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area = lambda box: max(0, box[2] - box[0]) * max(0, box[1] - box[3])
+    union = area(a) + area(b) - inter
+    return inter / union if union else 0.0
+
+
+def benchmark_face_detection(image_folder, labels_file, sides=(0, 640, 1024, 1600), models=("hog",), upsamples=(1,),
+                             iou=0.5):
+    """
+    Speed and recall of face detection settings on a labelled sample.
+
+    labels_file is JSON mapping each filename in image_folder to either its
+    list of [top, right, bottom, left] face boxes at full resolution or just
+    its face count. With boxes a face counts as found when a detection
+    overlaps it with IoU >= iou; with counts, recall is capped per image.
+
+    Returns:
+        list: (setting key, images_per_second, recall, precision or None) rows
+    """
+    import json
+    import cv2
+    from backend.model_loader import get_model
+    from backend.face_pipeline import FaceDetectionSettings, locate_faces
+
+    with open(labels_file, "r") as f:
+        labels = json.load(f)
+    face_recognition = get_model("face")
+    images = []
+    for filename in sorted(labels):
+        image = cv2.imread(os.path.join(image_folder, filename))
+        if image is not None:
+            images.append((filename, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)))
+    if not images:
+        raise ValueError(f"None of the labelled images could be read from {image_folder}")
+
+    rows = []
+    print(f"{len(images)} labelled images")
+    print(f"  {'setting':<22} {'images/s':>9} {'recall':>7} {'precision':>9}")
+    for model in models:
+        for upsample in upsamples:
+            for side in sides:
+                settings = FaceDetectionSettings(side or None, model, upsample)
+                found = expected = matched = detected = 0
+                start = time.perf_counter()
+                boxes_per_image = [(filename, locate_faces(face_recognition, rgb, settings)) for filename, rgb in images]
+                rate = len(images) / (time.perf_counter() - start)
+
+                has_boxes = True
+                for filename, boxes in boxes_per_image:
+                    truth = labels[filename]
+                    detected += len(boxes)
+                    if isinstance(truth, int):
+                        has_boxes = False
+                        expected += truth
+                        found += min(truth, len(boxes))
+                        continue
+                    expected += len(truth)
+                    unused = list(boxes)
+                    for face in truth:
+                        best = max(unused, key=lambda box: _box_iou(face, box), default=None)
+                        if best is not None and _box_iou(face, best) >= iou:
+                            unused.remove(best)
+                            found += 1
+                    matched += len(boxes) - len(unused)
+
+                recall = found / expected if expected else 1.0
+                precision = (matched / detected if detected else 1.0) if has_boxes else None
+                rows.append((settings.key(), rate, recall, precision))
+                shown = f"{precision:9.3f}" if precision is not None else f"{'-':>9}"
+                print(f"  {settings.key():<22} {rate:9.2f} {recall:7.3f} {shown}")
+    return rows
+
+
+def benchmark_face_search(faces=100000, queries=200, k=50, kind="auto", seed=0):
+    """
+    Search-by-example latency over a synthetic per-face library.
+
+    Builds a throwaway face table (one face per image), then times the first
+    search, which builds and saves the search index, a reload from disk, and
+    warm queries through FaceSearchIndex.search.
+
+    Returns:
+        dict: Seconds for "build" and "reload", and "ms_per_query"
+    """
+    import tempfile
+    import numpy as np
+    from backend.face_table import get_face_table
+    from backend.face_search import FaceSearchIndex
+
+    rng = np.random.default_rng(seed)
+    people = rng.normal(0, 0.1, size=(max(1, faces // 50), 128))
+    data = (people[rng.integers(0, len(people), size=faces)] + rng.normal(0, 0.03, size=(faces, 128))).astype(np.float32)
+    probes = (data[rng.integers(0, faces, size=queries)] + rng.normal(0, 0.02, size=(queries, 128))).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as folder:
+        metadata_file = os.path.join(folder, "face_metadata.json")
+        table = get_face_table(metadata_file)
+        table.put_many(
+            table.entry(os.path.join(folder, f"img_{i:07d}.jpg"), [(0, 1, 1, 0)], data[i:i + 1], ["Face_000"], [None])
+            for i in range(faces)
+        )
+
+        start = time.perf_counter()
+        FaceSearchIndex(metadata_file, kind).search(probes[:1], k)
+        build = time.perf_counter() - start
+
+        search = FaceSearchIndex(metadata_file, kind)
+        start = time.perf_counter()
+        search.refresh()
+        reload = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for probe in probes:
+            search.search(probe, k)
+        ms = 1000 * (time.perf_counter() - start) / queries
+
+    print(f"{faces} faces ({type(search.index).__name__}), k={k}")
+    print(f"  first search (build + save) {build:.1f}s, reload {reload:.1f}s, {ms:.2f} ms per query face")
+    return {"build": build, "reload": reload, "ms_per_query": ms}
+
+
+def benchmark_ocr(image_folder, worker_counts=(1, 2, 4, 8), chunk_size=None, limit=1000, engine="auto"):
+    """
+    Tesseract throughput, one pytesseract call per image vs TesseractPool.
+
+    The per-image path is what extract_text_tesseract does (a temporary PNG
+    and a new tesseract process per image). Each pool run starts cold, so
+    engine start-up is included. Agreement is the share of images whose
+    stripped text matches the per-image path exactly.
+
+    Returns:
+        list: One dict per run with "mode", "workers", "images_per_second" and "agreement"
+    """
+    from backend.ocr_logic import extract_text_tesseract
+    from backend.ocr_pipeline import TesseractPool, OCR_CHUNK_SIZE
+
+    paths = list_images(image_folder, limit)
+    if not paths:
+        print(f"No images found in {image_folder}")
+        return []
+    chunk_size = chunk_size or OCR_CHUNK_SIZE
+
+    start = time.perf_counter()
+    reference = {path: extract_text_tesseract(path).strip() for path in paths}
+    baseline = len(paths) / (time.perf_counter() - start)
+    rows = [{"mode": "pytesseract", "workers": 1, "images_per_second": baseline, "agreement": 1.0}]
+
+    for workers in worker_counts:
+        pool = TesseractPool(workers, chunk_size, engine=engine)
+        start = time.perf_counter()
+        texts = dict(pool.extract(paths))
+        rate = len(paths) / (time.perf_counter() - start)
+        pool.shutdown()
+        agreement = sum(texts[path].strip() == reference[path] for path in paths) / len(paths)
+        rows.append({"mode": pool.engine, "workers": workers, "images_per_second": rate, "agreement": agreement})
+
+    print(f"{len(paths)} images, chunk size {chunk_size}")
+    print(f"  {'mode':<12} {'workers':>7} {'images/s':>9} {'speedup':>8} {'agreement':>9}")
+    for row in rows:
+        print(
+            f"  {row['mode']:<12} {row['workers']:>7} {row['images_per_second']:9.2f} "
+            f"{row['images_per_second'] / baseline:7.2f}x {row['agreement']:9.3f}"
+        )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Imgfusion backend benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    detection = sub.add_parser("detection", help="Object detection throughput per batch size")
+    detection.add_argument("image_folder")
+    detection.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    detection.add_argument("--limit", type=int, default=64)
+    detection.add_argument("--backend", default="torch", choices=BACKENDS)
+
+    scaling = sub.add_parser("scaling", help="Multi-process detection throughput per worker count")
+    scaling.add_argument("image_folder")
+    scaling.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    scaling.add_argument("--batch-size", type=int, default=8)
+    scaling.add_argument("--limit", type=int, default=256)
+
+    accuracy = sub.add_parser("accuracy", help="Detection accuracy delta of a backend against PyTorch")
+    accuracy.add_argument("image_folder")
+    accuracy.add_argument("--backend", default="onnx-int8", choices=BACKENDS[1:])
+    accuracy.add_argument("--batch-size", type=int, default=8)
+    accuracy.add_argument("--limit", type=int, default=64)
+
+    index_search = sub.add_parser("index-search", help="Object index search latency on a synthetic index")
+    index_search.add_argument("--images", type=int, default=500000)
+    index_search.add_argument("--labels", type=int, default=600)
+    index_search.add_argument("--threshold", type=float, default=0.7)
+
+    face_match = sub.add_parser("face-match", help="Face-to-cluster matching speed, Python loop vs float32 index")
+    face_match.add_argument("--clusters", type=int, default=10000)
+    face_match.add_argument("--faces", type=int, default=500)
+
+    face_ann = sub.add_parser("face-ann", help="Recall vs latency of the approximate face indexes")
+    face_ann.add_argument("--clusters", type=int, default=200000)
+    face_ann.add_argument("--queries", type=int, default=500)
+    face_ann.add_argument("--k", type=int, default=10)
+
+    face_detect = sub.add_parser("face-detect", help="Face detection speed vs recall per resolution and model")
+    face_detect.add_argument("image_folder")
+    face_detect.add_argument("labels_file", help="JSON {filename: [[top, right, bottom, left], ...] or face count}")
+    face_detect.add_argument("--sides", type=int, nargs="+", default=[0, 640, 1024, 1600], help="0 means full resolution")
+    face_detect.add_argument("--models", nargs="+", default=["hog"], choices=["hog", "cnn"])
+    face_detect.add_argument("--upsample", type=int, nargs="+", default=[1])
+
+    face_search = sub.add_parser("face-search", help="Search-by-example latency over a synthetic per-face library")
+    face_search.add_argument("--faces", type=int, default=100000)
+    face_search.add_argument("--queries", type=int, default=200)
+    face_search.add_argument("--k", type=int, default=50)
+    face_search.add_argument("--kind", default="auto", choices=["auto", "exact", "ivf", "hnsw"])
+
+    ocr = sub.add_parser("ocr", help="Tesseract throughput, per-image pytesseract vs the OCR worker pool")
+    ocr.add_argument("image_folder")
+    ocr.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ocr.add_argument("--chunk-size", type=int, default=None)
+    ocr.add_argument("--limit", type=int, default=1000)
+    ocr.add_argument("--engine", default="auto", choices=["auto", "tesserocr", "cli"])
+
+    args = parser.parse_args(argv)
+    if args.command == "detection":
+        benchmark_detection(args.image_folder, args.batch_sizes, args.limit, args.backend)
+    elif args.command == "accuracy":
+        benchmark_accuracy(args.image_folder, args.backend, batch_size=args.batch_size, limit=args.limit)
+    elif args.command == "scaling":
+        benchmark_scaling(args.image_folder, args.workers, args.batch_size, args.limit)
+    elif args.command == "index-search":
+        benchmark_index_search(args.images, args.labels, threshold=args.threshold)
+    elif args.command == "face-match":
+        benchmark_face_match(args.clusters, args.faces)
+    elif args.command == "face-ann":
+        benchmark_face_ann(args.clusters, args.queries, args.k)
+    elif args.command == "face-detect":
+        benchmark_face_detection(args.image_folder, args.labels_file, args.sides, args.models, args.upsample)
+    elif args.command == "face-search":
+        benchmark_face_search(args.faces, args.queries, args.k, args.kind)
+    elif args.command == "ocr":
+        benchmark_ocr(args.image_folder, args.workers, args.chunk_size, args.limit, args.engine)
+
+
+if __name__ == "__main__":
+    main()
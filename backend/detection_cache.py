@@ -0,0 +1,152 @@
+# backend/detection_cache.py
+import os
+import json
+import sqlite3
+import threading
+from backend.file_hash import content_hash
+from backend.index_manager import index_db_file
+
+LEGACY_CACHE_PATH = os.path.join("data", "detection_cache.json")  # JSON cache, imported once
+
+
+class DetectionCache:
+    """
+    Content-addressed store of detection results.
+
+    Results are keyed by a hash of the file bytes under a model-set key, so a
+    renamed file or a byte-identical copy elsewhere reuses earlier detections.
+    A separate file table maps paths to their hash and is revalidated by size
+    and mtime, so unchanged files are not re-hashed.
+
+    Both live as tables in the object index database. Lookups are single-row
+    queries, so opening the cache costs nothing however large it is, and
+    save() only inserts the rows added since the last save in one transaction.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS detection_results (
+            model_key TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            detections TEXT NOT NULL,
+            PRIMARY KEY (model_key, digest)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS detection_files (
+            path TEXT PRIMARY KEY,
+            hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, model_key, db_file=index_db_file, legacy_file=LEGACY_CACHE_PATH):
+        self.model_key = model_key
+        self.db_file = db_file
+        self._conn, self._lock = _connection(db_file)
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+        # Rows written by save()
+        self._results = {}
+        self._files = {}
+        self.migrate_json(legacy_file)
+
+    @property
+    def dirty(self):
+        return bool(self._results or self._files)
+
+    def migrate_json(self, json_file=LEGACY_CACHE_PATH):
+        """Import the old JSON cache once; a marker in the meta table stops repeats."""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'detection_cache_migrated'").fetchone()
+        if done or not os.path.exists(json_file):
+            return 0
+        try:
+            with open(json_file, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error migrating {json_file}: {e}")
+            return 0
+        results = [
+            (model_key, digest, json.dumps(detections))
+            for model_key, entries in data.get("results", {}).items()
+            for digest, detections in entries.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO detection_results VALUES (?, ?, ?)", results)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO detection_files VALUES (?, ?, ?, ?)",
+                [(path, e["hash"], e["size"], e["mtime"]) for path, e in data.get("files", {}).items()],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('detection_cache_migrated', ?)", (json_file,)
+            )
+        return len(results)
+
+    def save(self):
+        """Write the results and file hashes added since the last save."""
+        if not self.dirty:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO detection_results VALUES (?, ?, ?)",
+                [(self.model_key, digest, json.dumps(detections)) for digest, detections in self._results.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO detection_files VALUES (?, ?, ?, ?)",
+                [(path, e["hash"], e["size"], e["mtime"]) for path, e in self._files.items()],
+            )
+            self._results = {}
+            self._files = {}
+
+    def file_hash(self, path):
+        """Return the content hash of path, reusing the stored one if the file is unchanged."""
+        key = os.path.normpath(os.path.abspath(path))
+        stat = os.stat(path)
+        entry = self._files.get(key)
+        if entry is None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT hash, size, mtime FROM detection_files WHERE path = ?", (key,)
+                ).fetchone()
+            if row:
+                entry = {"hash": row[0], "size": row[1], "mtime": row[2]}
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry["hash"]
+
+        digest = content_hash(path)
+        self._files[key] = {"hash": digest, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+        return digest
+
+    def get(self, digest):
+        """Return cached detections for digest under the current model set, or None."""
+        if digest in self._results:
+            return self._results[digest]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT detections FROM detection_results WHERE model_key = ? AND digest = ?",
+                (self.model_key, digest),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, digest, detections):
+        self._results[digest] = detections
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def _connection(db_file):
+    """Return the shared (connection, lock) for db_file; runs on any thread, serialised by the lock."""
+    key = os.path.abspath(db_file)
+    with _connections_lock:
+        if key not in _connections:
+            if os.path.dirname(db_file):
+                os.makedirs(os.path.dirname(db_file), exist_ok=True)
+            conn = sqlite3.connect(db_file, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            _connections[key] = (conn, threading.RLock())
+        return _connections[key]
@@ -0,0 +1,182 @@
+# backend/detection_pipeline.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from backend.frame_decoder import decode_frame, MAX_DECODE_SIDE
+
+DEFAULT_DECODE_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_QUEUE_SIZE = 16  # Frames allowed to wait between stages
+BATCH_WAIT_SECONDS = 0.05  # How long inference waits to fill a partial batch
+
+_DONE = object()
+
+
+class StageStats:
+    """Item count, busy time and queue depth samples for one pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self._lock = threading.Lock()
+
+    def record(self, items, seconds):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def sample_depth(self, depth):
+        with self._lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "items": self.items,
+                "busy_seconds": self.busy_seconds,
+                "latency_ms": 1000 * self.busy_seconds / self.items if self.items else 0.0,
+                "queue_depth_avg": self.depth_total / self.depth_samples if self.depth_samples else 0.0,
+                "queue_depth_max": self.depth_max,
+            }
+
+
+class DetectionPipeline:
+    """
+    Three-stage decode / infer / persist pipeline with bounded queues.
+
+    A thread pool decodes frames ahead of inference. A dedicated thread
+    batches decoded frames through the detector, and a writer thread hands
+    results to on_result. The queues are bounded and decode jobs are only
+    submitted while there is room, so memory stays flat on any folder size.
+    The queue depth recorded for a stage is the depth of its input queue.
+    """
+
+    def __init__(self, detector, on_result, batch_size=8, max_decode_side=MAX_DECODE_SIDE,
+                 decode_workers=DEFAULT_DECODE_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.detector = detector
+        self.on_result = on_result
+        self.batch_size = max(1, int(batch_size))
+        self.max_decode_side = max_decode_side
+        self.decode_workers = max(1, int(decode_workers))
+        self.queue_size = max(self.batch_size, int(queue_size))
+        self.stats = {name: StageStats(name) for name in ("decode", "infer", "write")}
+        self._errors = []
+
+    def run(self, items):
+        """
+        Process (key, image_path) pairs and block until every result is written.
+
+        on_result(key, detections, decoded) is called from the writer thread
+        once per item.
+        """
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        # One slot per frame that is decoding or waiting for inference
+        slots = threading.Semaphore(self.queue_size)
+
+        stages = [
+            threading.Thread(target=self._decode_stage, args=(items, frame_queue, slots), name="pipeline-decode"),
+            threading.Thread(target=self._infer_stage, args=(frame_queue, result_queue, slots), name="pipeline-infer"),
+            threading.Thread(target=self._write_stage, args=(result_queue,), name="pipeline-write"),
+        ]
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.report()
+
+    def report(self):
+        """Return per-stage counters as {stage: {...}}."""
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def _decode(self, key, image_path, frame_queue):
+        start = time.perf_counter()
+        try:
+            frame = decode_frame(image_path, self.max_decode_side)
+        except Exception as e:
+            print(f"Decode error on {image_path}: {e}")
+            frame = None
+        self.stats["decode"].record(1, time.perf_counter() - start)
+        self.stats["infer"].sample_depth(frame_queue.qsize())
+        frame_queue.put((key, os.path.basename(image_path), frame))
+
+    def _decode_stage(self, items, frame_queue, slots):
+        try:
+            with ThreadPoolExecutor(self.decode_workers, thread_name_prefix="pipeline-decode") as pool:
+                for key, image_path in items:
+                    # Backpressure: wait until inference has taken a frame
+                    slots.acquire()
+                    if self._errors:
+                        break
+                    pool.submit(self._decode, key, image_path, frame_queue)
+        except Exception as e:
+            print(f"Detection pipeline error while decoding: {e}")
+            self._errors.append(e)
+        finally:
+            frame_queue.put(_DONE)
+
+    def _infer_stage(self, frame_queue, result_queue, slots):
+        done = False
+        try:
+            while not done:
+                item = frame_queue.get()
+                if item is _DONE:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + BATCH_WAIT_SECONDS
+                while len(batch) < self.batch_size:
+                    try:
+                        item = frame_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        done = True
+                        break
+                    batch.append(item)
+                for _ in batch:
+                    slots.release()
+
+                keys, names, frames = zip(*batch)
+                start = time.perf_counter()
+                results = self.detector.detect_batch(list(frames), list(names))
+                self.stats["infer"].record(len(batch), time.perf_counter() - start)
+
+                for key, frame, detections in zip(keys, frames, results):
+                    self.stats["write"].sample_depth(result_queue.qsize())
+                    result_queue.put((key, detections, frame is not None))
+        except Exception as e:
+            print(f"Detection pipeline error during inference: {e}")
+            self._errors.append(e)
+            # Keep draining so the decode stage is never left blocked
+            while not done:
+                if frame_queue.get() is _DONE:
+                    done = True
+                slots.release()
+        finally:
+            result_queue.put(_DONE)
+
+    def _write_stage(self, result_queue):
+        while True:
+            item = result_queue.get()
+            if item is _DONE:
+                break
+            if self._errors:
+                # Drain without writing so the upstream stages can finish
+                continue
+            start = time.perf_counter()
+            try:
+                self.on_result(*item)
+            except Exception as e:
+                print(f"Detection pipeline error while writing: {e}")
+                self._errors.append(e)
+            self.stats["write"].record(1, time.perf_counter() - start)
@@ -1,72 +1,170 @@
 import os
-import torch
+import copy
+import time
+from contextlib import nullcontext
 from PyQt6.QtCore import QThread, pyqtSignal
-from PIL import Image
-from backend.model_loader import load_yolo_models, load_detr_model
+from backend.model_loader import registry, detection_model_names, DETECTION_BACKEND
+from backend.object_detector import ObjectDetector, model_set_key
+from backend.detection_cache import DetectionCache
+from backend.frame_decoder import MAX_DECODE_SIDE
+from backend.detection_pipeline import DetectionPipeline
+from backend.parallel_detection import get_engine
+
+DEFAULT_BATCH_SIZE = 8
+PERSIST_EVERY = 256  # Results written between detection cache checkpoints
 
 class ObjectDetectionThread(QThread):
     detection_complete = pyqtSignal(dict)
     progress_update = pyqtSignal(int, int)
 
-    def __init__(self, image_folder, existing_index):
+    def __init__(self, image_folder, existing_index, batch_size=DEFAULT_BATCH_SIZE,
+                 max_decode_side=MAX_DECODE_SIDE, workers=1, backend=DETECTION_BACKEND, cascade=None):
         super().__init__()
         self.image_folder = image_folder
+        # Anything supporting `in` over indexed filenames (an ObjectIndex or a set)
         self.existing_index = existing_index
+        self.batch_size = max(1, int(batch_size))
+        self.max_decode_side = max_decode_side
+        # More than one worker shards inference across processes
+        self.workers = max(1, int(workers))
+        # Inference backend: "torch", "onnx" or "onnx-int8"
+        self.backend = backend
+        # Optional CascadePolicy: run the cheap YOLO first and escalate only when needed
+        self.cascade = cascade
+        # Model load and inference time are tracked separately
+        self.timings = {"load_seconds": 0.0, "inference_seconds": 0.0}
+        # Per-stage counters from the last pipelined run
+        self.stage_stats = {}
 
     def run(self):
-        index_data = self.existing_index.copy()
+        # Only new entries are collected and emitted; the caller stores them
+        index_data = {}
         image_files = [f for f in os.listdir(self.image_folder) if f.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))]
 
-        new_images = [f for f in image_files if f not in index_data]
+        new_images = [f for f in image_files if f not in self.existing_index]
         total_new = len(new_images)
 
         if not total_new:
             self.detection_complete.emit(index_data)
             return
 
-        # Load YOLO models
-        yolo_models = load_yolo_models()
-        # Load DETR model
-        detr_model, detr_processor = load_detr_model()
-
-        for i, filename in enumerate(new_images, start=1):
-            image_path = os.path.join(self.image_folder, filename)
-            detected_objects = {}
-
-            # YOLO detection
-            for model in yolo_models:
-                try:
-                    # Run inference with YOLO models
-                    results = model(image_path)
-                    for result in results:
-                        for box, cls_idx, conf in zip(result.boxes.xyxy, result.boxes.cls, result.boxes.conf):
-                            label = result.names[int(cls_idx)]
-                            if conf >= 0.7:  # Confidence threshold for YOLO
-                                detected_objects[label] = max(detected_objects.get(label, 0), float(conf))
-                except Exception as e:
-                    print(f"YOLO error on {filename}: {e}")
-
-            # DETR detection
-            try:
-                image = Image.open(image_path).convert("RGB")
-                encoding = detr_processor(images=image, return_tensors="pt").to("cpu")
-                with torch.no_grad():
-                    # Run inference with DETR
-                    outputs = detr_model(**encoding)
-                logits = outputs.logits.softmax(-1)[0]
-                for logit, box in zip(logits, outputs.pred_boxes):
-                    max_score, label = logit[:-1].max(0)
-                    if max_score > 0.7:  # Confidence threshold for DETR
-                        obj_name = detr_model.config.id2label[label.item()]
-                        detected_objects[obj_name] = max(detected_objects.get(obj_name, 0), float(max_score))
-            except Exception as e:
-                print(f"DETR error on {filename}: {e}")
-
-            # Update index data with detected objects for the current image
-            index_data[filename] = detected_objects
-            # Update progress (emit signal)
-            self.progress_update.emit(i, total_new)
+        self.total_new = total_new
+        self.processed = 0
 
+        # Reuse results for files whose bytes were already analysed under another name
+        cache = DetectionCache(model_set_key(self.max_decode_side, self.backend, self.cascade))
+        pending = self._apply_cached(cache, new_images, index_data)
+        if not pending:
+            cache.save()
+            self.detection_complete.emit(index_data)
+            return
+
+        try:
+            if self.workers > 1:
+                self._detect_parallel(cache, pending, index_data)
+            else:
+                # Fetch YOLO and DETR from the shared registry (only the first use loads from disk)
+                yolo_name, detr_name = detection_model_names(self.backend)
+                start_time = time.perf_counter()
+                # The cascade's cheap YOLO is borrowed too, so the idle reaper cannot unload it mid-run
+                cheap = registry.borrow("yolo-cheap") if self.cascade else nullcontext()
+                with registry.borrow(yolo_name) as yolo_models, registry.borrow(detr_name) as (detr_model, detr_processor), \
+                        cheap as cheap_model:
+                    self.timings["load_seconds"] = time.perf_counter() - start_time
+                    detector = ObjectDetector(yolo_models, detr_model, detr_processor, cheap_model, self.cascade)
+                    self._detect(detector, cache, pending, index_data)
+        except Exception as e:
+            # Images without a result stay out of index_data and are retried next run
+            print(f"Object detection stopped early: {e}")
+        cache.save()
+
+        print(
+            f"Object detection: models ready in {self.timings['load_seconds']:.2f}s, "
+            f"inference {self.timings['inference_seconds']:.2f}s for {len(pending)} images "
+            f"({total_new - len(pending)} served from cache)"
+        )
         # Emitting the final detection results
         self.detection_complete.emit(index_data)
 
+    def _apply_cached(self, cache, new_images, index_data):
+        """
+        Fill index_data from the content-hash cache.
+
+        Returns:
+            dict: {content_hash: [filenames]} still needing inference; byte-identical
+            files share one entry so they are only detected once
+        """
+        pending = {}
+        for filename in new_images:
+            try:
+                digest = cache.file_hash(os.path.join(self.image_folder, filename))
+            except OSError as e:
+                print(f"Hash error on {filename}: {e}")
+                index_data[filename] = {}
+                self._advance()
+                continue
+
+            cached = cache.get(digest)
+            if cached is not None:
+                index_data[filename] = copy.deepcopy(cached)
+                self._advance()
+            else:
+                pending.setdefault(digest, []).append(filename)
+        return pending
+
+    def _advance(self, count=1):
+        for _ in range(count):
+            self.processed += 1
+            # Update progress (emit signal)
+            self.progress_update.emit(self.processed, self.total_new)
+
+    def _detect(self, detector, cache, pending, index_data):
+        """Run pending images through the decode / infer / persist pipeline."""
+        written = 0
+
+        def write_result(digest, detected_objects, decoded):
+            nonlocal written
+            self._merge(cache, pending, [digest], [decoded], [detected_objects], index_data)
+            written += 1
+            # Checkpoint so a crash mid-run keeps most of the work
+            if written % PERSIST_EVERY == 0:
+                cache.save()
+
+        pipeline = DetectionPipeline(
+            detector, write_result,
+            batch_size=self.batch_size,
+            max_decode_side=self.max_decode_side,
+        )
+        items = [(digest, os.path.join(self.image_folder, files[0])) for digest, files in pending.items()]
+        self.stage_stats = pipeline.run(items)
+        self.timings["inference_seconds"] = self.stage_stats["infer"]["busy_seconds"]
+        for name, stats in self.stage_stats.items():
+            print(
+                f"  {name:<6} {stats['items']:>6} items  {stats['latency_ms']:8.1f} ms/item  "
+                f"queue avg {stats['queue_depth_avg']:.1f} max {stats['queue_depth_max']}"
+            )
+
+    def _detect_parallel(self, cache, pending, index_data):
+        """Shard pending images across worker processes and merge results as they stream back."""
+        engine = get_engine(self.workers, self.max_decode_side, self.backend, self.cascade)
+        digests = list(pending)
+        shards = []
+        for start in range(0, len(digests), self.batch_size):
+            batch_digests = tuple(digests[start:start + self.batch_size])
+            shards.append((batch_digests, [os.path.join(self.image_folder, pending[d][0]) for d in batch_digests]))
+
+        for batch_digests, results, decoded, timings in engine.detect(shards):
+            # Workers run concurrently, so these are summed CPU-side seconds
+            self.timings["load_seconds"] += timings["load_seconds"]
+            self.timings["inference_seconds"] += timings["inference_seconds"]
+            self._merge(cache, pending, batch_digests, decoded, results, index_data)
+
+    def _merge(self, cache, pending, batch_digests, decoded, results, index_data):
+        for digest, ok, detected_objects in zip(batch_digests, decoded, results):
+            # Only cache real results, so unreadable files are retried next run
+            if ok:
+                cache.put(digest, detected_objects)
+            # Update index data for every file with these bytes
+            for filename in pending[digest]:
+                index_data[filename] = copy.deepcopy(detected_objects)
+            self._advance(len(pending[digest]))
@@ -0,0 +1,118 @@
+# backend/face_clusters.py
+"""
+How a face group summarises its members.
+
+Each group in the face metadata keeps
+    "encoding":  the mean of all its faces (a running, count-weighted centroid),
+    "count":     how many faces that mean covers,
+    "exemplars": up to MAX_EXEMPLARS member encodings, packed as base64 float32.
+
+Adding, moving and merging faces update these in constant time without
+revisiting the members. Exemplars are picked by farthest-point selection, so
+a group keeps its spread of poses and lighting rather than several copies of
+one look. Matching compares a face against the centroid and the exemplars
+(see face_index.cluster_vectors), so each group costs at most
+MAX_EXEMPLARS + 1 vectors however large it grows.
+
+Groups written before exemplars existed have only "encoding"; their count
+falls back to the number of images.
+"""
+import numpy as np
+from backend.face_index import ENCODING_DIM, pack_encodings, unpack_encodings
+
+MAX_EXEMPLARS = 8  # Member encodings kept per group besides the centroid
+
+
+def face_count(entry):
+    """Number of faces the group's centroid covers."""
+    if entry.get("count") is not None:
+        return int(entry["count"])
+    return max(1, len(entry.get("images", [])))
+
+
+def exemplars(entry):
+    """Return the group's exemplars as an (n, 128) array (the centroid for legacy groups)."""
+    if entry.get("exemplars"):
+        return unpack_encodings(entry["exemplars"])
+    if entry.get("encoding") is not None:
+        return np.asarray(entry["encoding"], dtype=np.float32).reshape(1, ENCODING_DIM)
+    return np.zeros((0, ENCODING_DIM), dtype=np.float32)
+
+
+def select_exemplars(encodings, centroid, limit=MAX_EXEMPLARS):
+    """
+    Pick up to limit diverse rows of encodings.
+
+    Starts from the member nearest the centroid, then repeatedly adds the
+    member farthest from everything picked so far. Costs O(len(encodings) * limit).
+    """
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    if len(encodings) <= limit:
+        return encodings
+    picked = [int(np.linalg.norm(encodings - centroid, axis=1).argmin())]
+    nearest = np.linalg.norm(encodings - encodings[picked[0]], axis=1)
+    while len(picked) < limit:
+        row = int(nearest.argmax())
+        picked.append(row)
+        nearest = np.minimum(nearest, np.linalg.norm(encodings - encodings[row], axis=1))
+    # Keep the input order so unchanged exemplars keep their index slots
+    return encodings[sorted(picked)]
+
+
+def _store(entry, centroid, count, kept):
+    entry["encoding"] = np.asarray(centroid, dtype=np.float32).tolist()
+    entry["count"] = int(count)
+    entry["exemplars"] = pack_encodings(kept)
+    return entry
+
+
+def new_cluster(encodings, images=None):
+    """Build a group entry from its member encodings."""
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    centroid = encodings.mean(axis=0)
+    entry = {"images": list(images or [])}
+    return _store(entry, centroid, len(encodings), select_exemplars(encodings, centroid))
+
+
+def add_faces(entry, encodings):
+    """Fold new member encodings into a group in place."""
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    if not len(encodings):
+        return entry
+    count = face_count(entry)
+    centroid = (np.asarray(entry["encoding"], dtype=np.float32) * count + encodings.sum(axis=0)) / (count + len(encodings))
+    kept = select_exemplars(np.vstack([exemplars(entry), encodings]), centroid)
+    return _store(entry, centroid, count + len(encodings), kept)
+
+
+def remove_faces(entry, encodings):
+    """Take member encodings out of a group in place (e.g. when an image moves to another group)."""
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    count = face_count(entry)
+    if not len(encodings) or count <= len(encodings):
+        # Nothing left to average; an emptied group is normally deleted by the caller
+        return entry
+    centroid = (np.asarray(entry["encoding"], dtype=np.float32) * count - encodings.sum(axis=0)) / (count - len(encodings))
+    kept = exemplars(entry)
+    if len(kept):
+        # Exemplars are copies of member encodings, so the removed faces match exactly
+        gone = (np.abs(kept[:, None, :] - encodings[None, :, :]).max(axis=2) < 1e-6).any(axis=1)
+        kept = kept[~gone]
+    if not len(kept):
+        kept = centroid.reshape(1, ENCODING_DIM)
+    return _store(entry, centroid, count - len(encodings), kept)
+
+
+def merge_clusters(target, source):
+    """Merge source's summary into target in place, weighting each centroid by its face count."""
+    if source.get("encoding") is None:
+        return target
+    if target.get("encoding") is None:
+        return _store(target, source["encoding"], face_count(source), exemplars(source))
+    target_count, source_count = face_count(target), face_count(source)
+    centroid = (
+        np.asarray(target["encoding"], dtype=np.float32) * target_count
+        + np.asarray(source["encoding"], dtype=np.float32) * source_count
+    ) / (target_count + source_count)
+    kept = select_exemplars(np.vstack([exemplars(target), exemplars(source)]), centroid)
+    return _store(target, centroid, target_count + source_count, kept)
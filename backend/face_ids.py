@@ -0,0 +1,58 @@
+# backend/face_ids.py
+"""
+Face_NNN IDs for new face groups.
+
+Merges, moves and reclustering delete groups, so the highest ID left in
+the metadata says nothing about which numbers were already given out. A
+high-water mark kept next to the metadata (face_metadata.json ->
+face_metadata.ids.json) only ever goes up: every writer reserves the IDs it
+creates or deletes, and new IDs start above both the mark and every ID
+still in use, so a number never passes to a second person.
+"""
+import os
+import re
+from backend.journal import get_store
+
+NEXT_NUMBER_KEY = "next_face_number"  # Lowest Face_NNN number never handed out
+
+
+def ids_path_for(metadata_file):
+    """Where the face ID high-water mark for metadata_file is kept."""
+    return os.path.splitext(metadata_file)[0] + ".ids.json"
+
+
+def face_number(face_id):
+    """Return NNN for a Face_NNN ID, or None for a name a user gave."""
+    match = re.fullmatch(r"Face_(\d+)", face_id)
+    return int(match.group(1)) if match else None
+
+
+def next_face_ids(taken, start=0):
+    """Yield Face_NNN IDs numbered from start and above the highest numbered one in taken."""
+    numbers = [number for number in map(face_number, taken) if number is not None]
+    number = max(max(numbers, default=-1) + 1, start)
+    while True:
+        face_id = f"Face_{number:03d}"
+        if face_id not in taken:
+            yield face_id
+        number += 1
+
+
+def fresh_face_ids(metadata_file, taken):
+    """
+    Yield IDs for new groups of metadata_file that were never used before.
+
+    Call reserve_face_ids with the ones that get written.
+    """
+    return next_face_ids(taken, get_store(ids_path_for(metadata_file)).data.get(NEXT_NUMBER_KEY, 0))
+
+
+def reserve_face_ids(metadata_file, face_ids):
+    """Raise the high-water mark past face_ids, so none of them is handed out again."""
+    numbers = [number for number in map(face_number, face_ids) if number is not None]
+    if not numbers:
+        return
+    store = get_store(ids_path_for(metadata_file))
+    with store.lock:
+        if max(numbers) + 1 > store.data.get(NEXT_NUMBER_KEY, 0):
+            store.update({NEXT_NUMBER_KEY: max(numbers) + 1})
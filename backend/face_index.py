@@ -0,0 +1,652 @@
+# backend/face_index.py
+"""
+Nearest-neighbour indexes over the 128-d face_recognition cluster encodings.
+
+FaceClusterIndex is exact: one float32 matrix scanned with a single matrix
+product per query batch. IVFFaceIndex adds a k-means coarse quantiser and
+only scans the nprobe closest inverted lists, and HnswFaceIndex wraps the
+optional hnswlib package. All three share the add / update / remove /
+search / match / save API, so callers pick one with create_face_index.
+
+A cluster is indexed as its centroid plus its exemplar encodings (see
+face_clusters), each stored as its own vector; match and nearest report the
+cluster a hit belongs to.
+
+Indexes persist next to the metadata file they were built from
+(face_metadata.json -> face_metadata.index.npz) and are brought back in
+line with the metadata's face IDs on load.
+"""
+import os
+import base64
+import threading
+from contextlib import contextmanager
+import numpy as np
+from backend.journal import get_store
+
+FACE_TOLERANCE = 0.5  # Max Euclidean distance between encodings of the same person
+ENCODING_DIM = 128  # Length of a face_recognition encoding
+
+FACE_INDEX_KIND = "auto"  # "exact", "ivf", "hnsw" or "auto" (hnsw if hnswlib is installed, else ivf)
+IVF_MIN_TRAIN = 4096  # Below this many clusters IVF searches exhaustively
+IVF_NPROBE = 16  # Inverted lists scanned per query
+IVF_RETRAIN_GROWTH = 4  # Retrain the quantiser once the index is this many times its training size
+IVF_KMEANS_ITERATIONS = 10
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+EXEMPLAR_SEPARATOR = "\x1f"  # Joins a face ID and an exemplar number into a vector ID
+REINDEX_MIN_SHIFT = 0.01  # Indexed vectors that moved less than this are left in place
+
+
+def pack_encodings(encodings):
+    """Encode an (n, 128) array as base64 float32 bytes (about a quarter of a JSON list)."""
+    return base64.b64encode(np.asarray(encodings, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def unpack_encodings(packed):
+    return np.frombuffer(base64.b64decode(packed), dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+
+def cluster_vectors(face_id, data):
+    """Return [(vector_id, encoding)] indexed for one face group: its centroid, then its exemplars."""
+    if data.get("encoding") is None:
+        return []
+    vectors = [(face_id, data["encoding"])]
+    if data.get("exemplars"):
+        vectors += [
+            (f"{face_id}{EXEMPLAR_SEPARATOR}{i}", exemplar)
+            for i, exemplar in enumerate(unpack_encodings(data["exemplars"]))
+        ]
+    return vectors
+
+
+def cluster_of(vector_id):
+    """Return the face ID an indexed vector belongs to."""
+    return vector_id.split(EXEMPLAR_SEPARATOR, 1)[0]
+
+
+class FaceClusterIndex:
+    """
+    Cluster encodings held as one contiguous float32 matrix.
+
+    Rows are appended in place (capacity doubles when full), so adding a
+    cluster does not rebuild the matrix. Matching a face is a single
+    vectorised distance computation against every cluster, and the nearest
+    cluster within tolerance wins.
+    """
+
+    kind = "exact"
+
+    def __init__(self, dim=ENCODING_DIM, capacity=64):
+        self.dim = dim
+        self.ids = []
+        self._rows = {}  # face_id -> row in the matrix
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._norms = np.zeros(capacity, dtype=np.float32)  # Squared row norms
+
+    @classmethod
+    def from_metadata(cls, metadata, **kwargs):
+        """Build an index from face metadata ({face_id: {"encoding": [...], "exemplars": ..., ...}})."""
+        entries = [vector for face_id, data in metadata.items() for vector in cluster_vectors(face_id, data)]
+        index = cls(capacity=max(64, len(entries)), **kwargs)
+        index.add_many([face_id for face_id, _ in entries], [encoding for _, encoding in entries])
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, face_id):
+        return face_id in self._rows
+
+    def encoding(self, face_id):
+        return self._matrix[self._rows[face_id]].copy()
+
+    def add(self, face_id, encoding):
+        """Add a cluster, or replace its encoding if face_id is already indexed."""
+        if face_id in self._rows:
+            self.update(face_id, encoding)
+            return
+        if len(self.ids) == len(self._matrix):
+            self._grow()
+        row = len(self.ids)
+        self.ids.append(face_id)
+        self._rows[face_id] = row
+        self._set_row(row, encoding)
+
+    def add_many(self, face_ids, encodings):
+        for face_id, encoding in zip(face_ids, encodings):
+            self.add(face_id, encoding)
+
+    def update(self, face_id, encoding):
+        self._set_row(self._rows[face_id], encoding)
+
+    def remove(self, face_id):
+        """Drop a cluster by moving the last row into its slot."""
+        row = self._rows.pop(face_id)
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._norms[row] = self._norms[last]
+            self.ids[row] = moved
+            self._rows[moved] = row
+        self.ids.pop()
+        return row, last
+
+    def _set_row(self, row, encoding):
+        vector = np.asarray(encoding, dtype=np.float32)
+        self._matrix[row] = vector
+        self._norms[row] = vector @ vector
+
+    def _grow(self):
+        capacity = max(64, 2 * len(self._matrix))
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        matrix[:len(self.ids)] = self._matrix[:len(self.ids)]
+        norms[:len(self.ids)] = self._norms[:len(self.ids)]
+        self._matrix, self._norms = matrix, norms
+
+    def _distances(self, queries, rows=None):
+        """Euclidean distances from queries to all rows, or to the given row numbers."""
+        matrix = self._matrix[:len(self.ids)] if rows is None else self._matrix[rows]
+        norms = self._norms[:len(self.ids)] if rows is None else self._norms[rows]
+        # |q - c|^2 = |q|^2 + |c|^2 - 2 q.c, one matrix product for the whole batch
+        squared = (queries * queries).sum(axis=1)[:, None] + norms[None, :]
+        squared -= 2.0 * (queries @ matrix.T)
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def distances(self, encodings):
+        """Return the (queries x clusters) Euclidean distance matrix."""
+        return self._distances(np.atleast_2d(np.asarray(encodings, dtype=np.float32)))
+
+    def _top_k(self, dist, rows, k):
+        """Return ([ids], distances) of the k smallest entries of one distance row."""
+        k = min(k, len(dist))
+        best = np.argpartition(dist, k - 1)[:k] if k < len(dist) else np.arange(len(dist))
+        best = best[np.argsort(dist[best])]
+        picked = best if rows is None else rows[best]
+        return [self.ids[i] for i in picked], dist[best]
+
+    def search(self, encodings, k=1):
+        """
+        Find the k nearest clusters of each encoding.
+
+        Returns:
+            list: One ([face_ids], distances array) pair per encoding, nearest first
+        """
+        queries = np.atleast_2d(np.asarray(encodings, dtype=np.float32))
+        if not self.ids:
+            return [([], np.zeros(0, np.float32)) for _ in queries]
+        return [self._top_k(row, None, k) for row in self._distances(queries)]
+
+    def nearest(self, encodings):
+        """
+        Find the nearest cluster (centroid or exemplar) for each encoding.
+
+        Returns:
+            list: (face_id, distance) per encoding; (None, inf) when the index is empty
+        """
+        return [
+            (cluster_of(ids[0]), float(dist[0])) if ids else (None, float("inf"))
+            for ids, dist in self.search(encodings, k=1)
+        ]
+
+    def match(self, encoding, tolerance=FACE_TOLERANCE):
+        """Return the nearest cluster within tolerance, or None."""
+        face_id, distance = self.nearest(encoding)[0]
+        return face_id if distance <= tolerance else None
+
+    def face_ids(self):
+        return list(self._rows)
+
+    def sync(self, metadata):
+        """Add and drop vectors so the index holds exactly the face groups in metadata."""
+        wanted = dict(vector for face_id, data in metadata.items() for vector in cluster_vectors(face_id, data))
+        for vector_id in [vector_id for vector_id in self.face_ids() if vector_id not in wanted]:
+            self.remove(vector_id)
+        missing = [vector_id for vector_id in wanted if vector_id not in self]
+        self.add_many(missing, [wanted[vector_id] for vector_id in missing])
+
+    def remove_cluster(self, face_id):
+        """Drop a face group's centroid and exemplars."""
+        if face_id in self:
+            self.remove(face_id)
+        i = 0
+        while f"{face_id}{EXEMPLAR_SEPARATOR}{i}" in self:
+            self.remove(f"{face_id}{EXEMPLAR_SEPARATOR}{i}")
+            i += 1
+
+    def set_cluster(self, face_id, data):
+        """
+        Re-index one face group after its centroid or exemplars changed.
+
+        Vectors that barely moved are kept, so a centroid drifting by one
+        face's weight does not churn the index (HNSW never reuses labels).
+        """
+        vectors = dict(cluster_vectors(face_id, data))
+        i = 0
+        while f"{face_id}{EXEMPLAR_SEPARATOR}{i}" in self:
+            if f"{face_id}{EXEMPLAR_SEPARATOR}{i}" not in vectors:
+                self.remove(f"{face_id}{EXEMPLAR_SEPARATOR}{i}")
+            i += 1
+        if face_id in self and face_id not in vectors:
+            self.remove(face_id)
+        changed = [
+            vector_id for vector_id, encoding in vectors.items()
+            if vector_id not in self
+            or np.linalg.norm(self.encoding(vector_id) - np.asarray(encoding, dtype=np.float32)) > REINDEX_MIN_SHIFT
+        ]
+        self.add_many(changed, [vectors[vector_id] for vector_id in changed])
+
+    def _state(self):
+        count = len(self.ids)
+        return {"ids": np.array(self.ids, dtype=str), "matrix": self._matrix[:count]}
+
+    def _restore(self, state):
+        self.ids = []
+        self._rows = {}
+        self._matrix = np.zeros((max(64, len(state["ids"])), self.dim), dtype=np.float32)
+        self._norms = np.zeros(len(self._matrix), dtype=np.float32)
+        for face_id, vector in zip(state["ids"].tolist(), state["matrix"]):
+            FaceClusterIndex.add(self, face_id, vector)
+
+    def save(self, path):
+        """Write the index to path (.npz) atomically."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, kind=self.kind, **self._state())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with np.load(path, allow_pickle=False) as state:
+            if str(state["kind"]) != cls.kind:
+                raise ValueError(f"{path} holds a {state['kind']} index, not {cls.kind}")
+            index = cls(**kwargs)
+            index._restore(state)
+        return index
+
+
+class IVFFaceIndex(FaceClusterIndex):
+    """
+    Inverted-file index: k-means centroids partition the clusters into lists.
+
+    A query scans only the nprobe lists whose centroids are closest, so cost
+    grows with about sqrt(n) instead of n. New clusters go into the list of
+    their nearest centroid; the quantiser is retrained once the index has
+    grown IVF_RETRAIN_GROWTH times past its training size. Below
+    IVF_MIN_TRAIN clusters the index is untrained and searches exactly.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim=ENCODING_DIM, capacity=64, nprobe=IVF_NPROBE, min_train=IVF_MIN_TRAIN, seed=0):
+        super().__init__(dim, capacity)
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._lists = []  # Row numbers per centroid
+        self._arrays = {}  # Centroid -> cached numpy copy of its list
+        self._assign = np.zeros(capacity, dtype=np.int32)  # Row -> list
+
+    def add(self, face_id, encoding):
+        self.add_many([face_id], [encoding])
+
+    def add_many(self, face_ids, encodings):
+        first_new = len(self.ids)
+        for face_id, encoding in zip(face_ids, encodings):
+            if face_id in self._rows:
+                self.update(face_id, encoding)
+            else:
+                FaceClusterIndex.add(self, face_id, encoding)
+        if len(self._assign) < len(self._matrix):
+            assign = np.zeros(len(self._matrix), dtype=np.int32)
+            assign[:len(self._assign)] = self._assign
+            self._assign = assign
+
+        # Bulk loads train once at the end instead of at every threshold
+        if self.centroids is None:
+            if len(self.ids) >= self.min_train:
+                self.train()
+        elif len(self.ids) >= IVF_RETRAIN_GROWTH * self.trained_size:
+            self.train()
+        else:
+            for row in range(first_new, len(self.ids)):
+                self._place(row)
+
+    def update(self, face_id, encoding):
+        super().update(face_id, encoding)
+        if self.centroids is not None:
+            row = self._rows[face_id]
+            self._lists[self._assign[row]].remove(row)
+            self._arrays.pop(self._assign[row], None)
+            self._place(row)
+
+    def remove(self, face_id):
+        row, last = super().remove(face_id)
+        if self.centroids is not None:
+            self._lists[self._assign[row]].remove(row)
+            self._arrays.pop(self._assign[row], None)
+            if row != last:
+                # The last row moved into the freed slot
+                moved_list = self._lists[self._assign[last]]
+                moved_list[moved_list.index(last)] = row
+                self._arrays.pop(self._assign[last], None)
+                self._assign[row] = self._assign[last]
+        return row, last
+
+    def _place(self, row):
+        vector = self._matrix[row:row + 1]
+        centroid = int(self._centroid_distances(vector)[0].argmin())
+        self._assign[row] = centroid
+        self._lists[centroid].append(row)
+        self._arrays.pop(centroid, None)
+
+    def _list_rows(self, centroid):
+        rows = self._arrays.get(centroid)
+        if rows is None:
+            rows = self._arrays[centroid] = np.asarray(self._lists[centroid], dtype=np.int64)
+        return rows
+
+    def _centroid_distances(self, queries):
+        squared = (queries * queries).sum(axis=1)[:, None] + (self.centroids * self.centroids).sum(axis=1)[None, :]
+        squared -= 2.0 * (queries @ self.centroids.T)
+        return np.maximum(squared, 0.0)
+
+    def train(self):
+        """Fit the centroids with k-means and rebuild every inverted list."""
+        count = len(self.ids)
+        data = self._matrix[:count]
+        nlist = int(np.clip(np.sqrt(count), 16, 4096))
+        rng = np.random.default_rng(self.seed)
+        # k-means on a sample keeps training time bounded on huge libraries
+        sample = data[rng.choice(count, size=min(count, 64 * nlist), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(IVF_KMEANS_ITERATIONS):
+            labels = self._centroid_distances(sample).argmin(axis=1)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            filled = counts > 0
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+
+        self._assign = np.zeros(len(self._matrix), dtype=np.int32)
+        self._lists = [[] for _ in range(nlist)]
+        self._arrays = {}
+        for start in range(0, count, 65536):
+            labels = self._centroid_distances(data[start:start + 65536]).argmin(axis=1)
+            self._assign[start:start + len(labels)] = labels
+        for row in range(count):
+            self._lists[self._assign[row]].append(row)
+        self.trained_size = count
+
+    def search(self, encodings, k=1):
+        if self.centroids is None:
+            return super().search(encodings, k)
+        queries = np.atleast_2d(np.asarray(encodings, dtype=np.float32))
+        if not self.ids:
+            return [([], np.zeros(0, np.float32)) for _ in queries]
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(self._centroid_distances(queries), nprobe - 1, axis=1)[:, :nprobe]
+
+        results = []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([self._list_rows(centroid) for centroid in lists])
+            if not len(rows):
+                results.append(([], np.zeros(0, np.float32)))
+                continue
+            results.append(self._top_k(self._distances(query[None, :], rows)[0], rows, k))
+        return results
+
+    def _state(self):
+        state = super()._state()
+        if self.centroids is not None:
+            state["centroids"] = self.centroids
+            state["assign"] = self._assign[:len(self.ids)]
+            state["trained_size"] = np.int64(self.trained_size)
+        state["nprobe"] = np.int64(self.nprobe)
+        return state
+
+    def _restore(self, state):
+        super()._restore(state)
+        if "nprobe" in state:
+            self.nprobe = int(state["nprobe"])
+        self._assign = np.zeros(len(self._matrix), dtype=np.int32)
+        if "centroids" in state:
+            self.centroids = state["centroids"].astype(np.float32)
+            self.trained_size = int(state["trained_size"])
+            self._lists = [[] for _ in range(len(self.centroids))]
+            self._arrays = {}
+            self._assign[:len(self.ids)] = state["assign"]
+            for row in range(len(self.ids)):
+                self._lists[self._assign[row]].append(row)
+
+
+class HnswFaceIndex:
+    """HNSW graph index backed by the optional hnswlib package."""
+
+    kind = "hnsw"
+
+    def __init__(self, dim=ENCODING_DIM, capacity=1024, ef=HNSW_EF_SEARCH):
+        import hnswlib
+
+        self.dim = dim
+        self.ef = ef
+        self.ids = []  # Label -> face_id; labels are never reused
+        self._labels = {}  # face_id -> current label
+        self._graph = hnswlib.Index(space="l2", dim=dim)
+        self._graph.init_index(max_elements=max(1024, capacity), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        self._graph.set_ef(ef)
+
+    from_metadata = classmethod(FaceClusterIndex.from_metadata.__func__)
+    nearest = FaceClusterIndex.nearest
+    match = FaceClusterIndex.match
+    sync = FaceClusterIndex.sync
+    remove_cluster = FaceClusterIndex.remove_cluster
+    set_cluster = FaceClusterIndex.set_cluster
+
+    def face_ids(self):
+        return list(self._labels)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, face_id):
+        return face_id in self._labels
+
+    def encoding(self, face_id):
+        return np.asarray(self._graph.get_items([self._labels[face_id]])[0], dtype=np.float32)
+
+    def add(self, face_id, encoding):
+        self.add_many([face_id], [encoding])
+
+    def add_many(self, face_ids, encodings):
+        if not len(face_ids):
+            return
+        for face_id in face_ids:
+            if face_id in self._labels:
+                self._graph.mark_deleted(self._labels.pop(face_id))
+        labels = np.arange(len(self.ids), len(self.ids) + len(face_ids))
+        needed = len(self.ids) + len(face_ids)
+        if needed > self._graph.get_max_elements():
+            self._graph.resize_index(max(needed, 2 * self._graph.get_max_elements()))
+        self._graph.add_items(np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim), labels)
+        for face_id, label in zip(face_ids, labels.tolist()):
+            self.ids.append(face_id)
+            self._labels[face_id] = label
+
+    def update(self, face_id, encoding):
+        self.add(face_id, encoding)
+
+    def remove(self, face_id):
+        self._graph.mark_deleted(self._labels.pop(face_id))
+
+    def search(self, encodings, k=1):
+        queries = np.atleast_2d(np.asarray(encodings, dtype=np.float32))
+        k = min(k, len(self._labels))
+        if not k:
+            return [([], np.zeros(0, np.float32)) for _ in queries]
+        self._graph.set_ef(max(self.ef, k))
+        labels, squared = self._graph.knn_query(queries, k=k)
+        return [
+            ([self.ids[label] for label in row_labels], np.sqrt(np.maximum(row_squared, 0.0)))
+            for row_labels, row_squared in zip(labels, squared)
+        ]
+
+    def save(self, path):
+        graph_path = path + ".hnsw"
+        self._graph.save_index(graph_path + ".tmp")
+        os.replace(graph_path + ".tmp", graph_path)
+        live = np.array([face_id in self._labels and self._labels[face_id] == label for label, face_id in enumerate(self.ids)])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, kind=self.kind, ids=np.array(self.ids, dtype=str), live=live)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        import hnswlib
+
+        with np.load(path, allow_pickle=False) as state:
+            if str(state["kind"]) != cls.kind:
+                raise ValueError(f"{path} holds a {state['kind']} index, not {cls.kind}")
+            index = cls(**kwargs)
+            index.ids = state["ids"].tolist()
+            index._labels = {face_id: label for label, face_id in enumerate(index.ids) if state["live"][label]}
+        index._graph = hnswlib.Index(space="l2", dim=index.dim)
+        index._graph.load_index(path + ".hnsw")
+        index._graph.set_ef(index.ef)
+        return index
+
+
+def hnswlib_available():
+    try:
+        import hnswlib  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _index_class(kind=FACE_INDEX_KIND):
+    if kind == "auto":
+        kind = "hnsw" if hnswlib_available() else "ivf"
+    classes = {"exact": FaceClusterIndex, "ivf": IVFFaceIndex, "hnsw": HnswFaceIndex}
+    if kind not in classes:
+        raise ValueError(f"Unknown face index kind '{kind}' (expected one of {', '.join(classes)} or auto)")
+    return classes[kind]
+
+
+def create_face_index(metadata=None, kind=FACE_INDEX_KIND):
+    """Build a face index of the given kind, filled from metadata if given."""
+    cls = _index_class(kind)
+    return cls.from_metadata(metadata) if metadata else cls()
+
+
+def index_path_for(metadata_file):
+    """Where the index built from metadata_file is persisted."""
+    return os.path.splitext(metadata_file)[0] + ".index.npz"
+
+
+_indexes = {}
+_synced = {}  # Metadata store signature each shared index was last brought in line with
+_files = {}  # (mtime_ns, size) of each index file as this process last loaded or saved it
+_locks = {}  # One RLock per shared index, held while it is read or changed
+_writers = {}  # Thread ident of the ingestion changing a shared index ahead of the store
+_indexes_lock = threading.Lock()
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def face_index_lock(metadata_file):
+    """Return the lock to hold while matching against or changing the shared index for metadata_file."""
+    with _indexes_lock:
+        return _locks.setdefault(os.path.abspath(metadata_file), threading.RLock())
+
+
+@contextmanager
+def face_index_writer(metadata_file):
+    """
+    Mark the calling thread as ingesting into the shared index for metadata_file.
+
+    The ingestion adds groups to the index before it commits them to the
+    store, so while it runs other threads get the index as it is instead
+    of a sync against the store that would drop those groups.
+    """
+    key = os.path.abspath(metadata_file)
+    with face_index_lock(metadata_file):
+        _writers[key] = threading.get_ident()
+    try:
+        yield
+    finally:
+        with face_index_lock(metadata_file):
+            _writers.pop(key, None)
+
+
+def get_face_index(metadata_file, metadata, kind=FACE_INDEX_KIND):
+    """
+    Return the shared face index for metadata_file, in line with metadata.
+
+    The index is loaded from disk on first use (or built from metadata if
+    there is no usable file) and then kept in memory. It is synced against
+    metadata only when it is loaded or when the metadata store changed
+    since the last sync, since a sync walks every face group. If another
+    process rewrote the index file meanwhile (e.g. face_recluster --apply),
+    the file is loaded again, as a sync only checks which IDs are present.
+    While another thread ingests (see face_index_writer) the index is
+    returned as it is. Hold face_index_lock while using it, and call
+    save_face_index after changing it.
+    """
+    key = os.path.abspath(metadata_file)
+    path = index_path_for(metadata_file)
+    signature = get_store(metadata_file).signature
+    with face_index_lock(metadata_file):
+        index = _indexes.get(key)
+        if index is not None and _writers.get(key, threading.get_ident()) != threading.get_ident():
+            return index
+        if index is not None and _synced.get(key) != signature and _file_signature(path) != _files.get(key):
+            index = None
+        if index is None:
+            cls = _index_class(kind)
+            try:
+                index = cls.load(path) if os.path.exists(path) else None
+            except Exception as e:
+                print(f"Rebuilding face index, could not load {path}: {e}")
+                index = None
+            if index is None:
+                index = cls.from_metadata(metadata)
+            _indexes[key] = index
+            _files[key] = _file_signature(path)
+            _synced.pop(key, None)
+        if _synced.get(key) != signature:
+            index.sync(metadata)
+            _synced[key] = signature
+        return index
+
+
+def save_face_index(metadata_file):
+    """
+    Persist the shared face index for metadata_file, if one is loaded.
+
+    Callers save after updating the index for their own metadata writes,
+    so the index counts as in line with the store as it stands now.
+    """
+    key = os.path.abspath(metadata_file)
+    with face_index_lock(metadata_file):
+        index = _indexes.get(key)
+        if index is None:
+            return
+        path = index_path_for(metadata_file)
+        try:
+            index.save(path)
+        except Exception as e:
+            print(f"Error saving face index: {e}")
+        _files[key] = _file_signature(path)
+        _synced[key] = get_store(metadata_file).signature
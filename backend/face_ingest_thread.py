@@ -0,0 +1,53 @@
+import os
+from PyQt6.QtCore import QThread, pyqtSignal
+from backend.main_logic import detect_and_cluster_faces, get_images_missing_from_metadata, METADATA_PATH
+from backend.face_index import face_index_writer
+
+
+class FaceIngestThread(QThread):
+    """
+    Runs face detection and clustering for a folder off the GUI thread.
+
+    Call requestInterruption() to cancel: the run stops before the next
+    image and commits what it finished, so the next run resumes from there.
+    """
+    progress_update = pyqtSignal(int, int, str)  # examined, total, image path
+    clusters_updated = pyqtSignal(dict)  # {face_id: [paths]} touched so far, after every partial commit
+    ingest_complete = pyqtSignal(dict, str)  # face_id_map, status message
+    ingest_failed = pyqtSignal(str)
+
+    def __init__(self, folder, only_process=None, metadata_file=METADATA_PATH, **options):
+        super().__init__()
+        self.folder = folder
+        # None examines whatever the ledger has not seen yet
+        self.only_process = only_process
+        # Images the run was given to examine, known once it starts
+        self.images = []
+        self.metadata_file = metadata_file
+        # Passed through to detect_and_cluster_faces (workers, settings, album_mode, ...)
+        self.options = options
+
+    def run(self):
+        try:
+            only_process = self.only_process
+            if only_process is None:
+                only_process = get_images_missing_from_metadata(self.folder, self.metadata_file)
+            self.images = list(only_process)
+            if not only_process:
+                self.ingest_complete.emit({}, "No new images to process.")
+                return
+            # The GUI thread keeps reading the shared face index while this run adds to it
+            with face_index_writer(self.metadata_file):
+                face_id_map, msg = detect_and_cluster_faces(
+                    self.folder,
+                    metadata_file=self.metadata_file,
+                    only_process=only_process,
+                    progress_callback=self.progress_update.emit,
+                    should_cancel=self.isInterruptionRequested,
+                    commit_callback=self.clusters_updated.emit,
+                    **self.options
+                )
+            self.ingest_complete.emit(dict(face_id_map), msg)
+        except Exception as e:
+            print(f"Face ingestion failed in {os.path.basename(self.folder)}: {e}")
+            self.ingest_failed.emit(str(e))
@@ -0,0 +1,150 @@
+# backend/face_ledger.py
+import os
+import threading
+from backend.file_hash import content_hash
+from backend.journal import get_store
+
+
+def ledger_path_for(metadata_file):
+    """Where the processed-file ledger for metadata_file is kept."""
+    return os.path.splitext(metadata_file)[0] + ".ledger.json"
+
+
+class FaceLedger:
+    """
+    Persistent record of every image face detection has examined.
+
+    Entries are keyed by absolute path and hold the file's size, mtime,
+    content hash and face count, including images where no face was found.
+    A path whose size and mtime are unchanged is known without touching the
+    file. A new path is hashed once, so renamed files and byte-identical
+    copies are recognised and take over their original's faces without
+    running detection again. The ledger is a
+    journaled store, so recording an image appends one line.
+    """
+
+    def __init__(self, ledger_file):
+        self.store = get_store(ledger_file)
+        self._lock = threading.Lock()
+        # content hash -> a path that had those bytes
+        self._hashes = {entry["hash"]: path for path, entry in self.store.data.items() if entry.get("hash")}
+        # path -> (size, mtime, hash) of files hashed by find() but not recorded yet
+        self._digests = {}
+        # Folders holding at least one recorded image
+        self._folders = {os.path.dirname(path) for path in self.store.data}
+
+    def __len__(self):
+        return len(self.store.data)
+
+    @staticmethod
+    def key(path):
+        return os.path.normpath(os.path.abspath(path))
+
+    def find(self, path, stat=None):
+        """
+        Look up the examined file that has the same bytes as path.
+
+        Files whose stat no longer matches are re-hashed; if the bytes are
+        unchanged the entry is refreshed. A renamed file or a copy resolves
+        to the path its bytes were examined under, and is not recorded until
+        the caller has carried its faces over.
+
+        Returns:
+            tuple: (ledger key of the examined file or None, content hash or None if not hashed)
+        """
+        key = self.key(path)
+        stat = stat or os.stat(path)
+        entry = self.store.data.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return key, entry.get("hash")
+        # Legacy bootstrap entries have no size; skip hashing for an exact path hit
+        if entry and entry.get("size") is None:
+            return key, None
+
+        cached = self._digests.get(key)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            digest = cached[2]
+        else:
+            digest = content_hash(path)
+            self._digests[key] = (stat.st_size, stat.st_mtime_ns, digest)
+        if entry and entry.get("hash") == digest:
+            self.record(path, entry.get("faces"), digest=digest, stat=stat)
+            return key, digest
+        return self._hashes.get(digest), digest
+
+    def is_processed(self, path, stat=None):
+        """Return True if path itself has been examined (a renamed file or copy is not, yet)."""
+        return self.find(path, stat)[0] == self.key(path)
+
+    def missing(self, folder, filenames):
+        """Return the filenames in folder not recorded under their own path (new, renamed or copied files)."""
+        missing = []
+        for filename in filenames:
+            path = os.path.join(folder, filename)
+            try:
+                if not self.is_processed(path):
+                    missing.append(filename)
+            except OSError as e:
+                print(f"Ledger check failed for {path}: {e}")
+                missing.append(filename)
+        return missing
+
+    def entry(self, path, faces, digest=None, stat=None):
+        """Build the ledger entry for path without recording it."""
+        stat = stat or os.stat(path)
+        return self.key(path), {
+            "hash": digest or content_hash(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "faces": faces,
+        }
+
+    def record(self, path, faces, digest=None, stat=None):
+        self.record_many([self.entry(path, faces, digest, stat)])
+
+    def record_many(self, entries):
+        """Record (key, entry) pairs from entry() with one journal append."""
+        entries = dict(entries)
+        if not entries:
+            return
+        with self._lock:
+            self.store.update(entries)
+            for key, entry in entries.items():
+                self._digests.pop(key, None)
+                self._folders.add(os.path.dirname(key))
+                if entry.get("hash"):
+                    self._hashes[entry["hash"]] = key
+
+    def bootstrap(self, folder, filenames, metadata):
+        """
+        Seed the ledger for a folder from metadata written before the ledger existed.
+
+        The first time a folder is seen, its files whose basename already
+        appears in a face group are recorded as processed (with an unknown
+        face count) so they are not detected again; hashes are filled in
+        lazily. Folders the ledger already covers are left alone, so a photo
+        added later under an old photo's name is still examined.
+        """
+        if self.key(folder) in self._folders:
+            return 0
+        known = {os.path.basename(path) for data in metadata.values() for path in data.get("images", [])}
+        entries = {
+            self.key(os.path.join(folder, filename)): {"hash": None, "size": None, "mtime": None, "faces": None}
+            for filename in filenames if filename in known
+        }
+        self.record_many(entries)
+        return len(entries)
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_face_ledger(metadata_file):
+    """Return the shared ledger for the face metadata in metadata_file."""
+    path = ledger_path_for(metadata_file)
+    key = os.path.abspath(path)
+    with _ledgers_lock:
+        if key not in _ledgers:
+            _ledgers[key] = FaceLedger(path)
+        return _ledgers[key]
@@ -0,0 +1,188 @@
+# backend/face_pipeline.py
+import os
+import time
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_FACE_WORKERS = max(1, CPU_COUNT - 1)
+FACE_CHUNK_SIZE = 8  # Images per task sent to a worker
+
+FACE_DETECTION_MAX_SIDE = 1024  # Longest side faces are searched at; None searches at full resolution
+FACE_DETECTION_MODEL = "hog"  # "hog" (CPU friendly) or "cnn" (more accurate, much slower without a GPU)
+FACE_UPSAMPLE = 1  # number_of_times_to_upsample passed to face_locations
+
+
+class FaceDetectionSettings:
+    """
+    How faces are located before encoding.
+
+    Detection runs on a copy downscaled so its longest side is at most
+    max_side, and the boxes are mapped back to full resolution so the
+    encodings still see every pixel of the face.
+    """
+
+    def __init__(self, max_side=FACE_DETECTION_MAX_SIDE, model=FACE_DETECTION_MODEL, upsample=FACE_UPSAMPLE):
+        if model not in ("hog", "cnn"):
+            raise ValueError(f"Unknown face detection model '{model}' (expected hog or cnn)")
+        self.max_side = max_side
+        self.model = model
+        self.upsample = int(upsample)
+
+    def key(self):
+        return f"{self.model}-up{self.upsample}-max{self.max_side or 'full'}"
+
+
+def locate_faces(face_recognition, rgb_image, settings):
+    """Return full-resolution (top, right, bottom, left) boxes found on a downscaled copy."""
+    import cv2
+
+    height, width = rgb_image.shape[:2]
+    scale = 1.0
+    if settings.max_side and max(height, width) > settings.max_side:
+        scale = settings.max_side / max(height, width)
+    small = rgb_image if scale == 1.0 else cv2.resize(
+        rgb_image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA
+    )
+    boxes = face_recognition.face_locations(
+        small, number_of_times_to_upsample=settings.upsample, model=settings.model
+    )
+    if scale == 1.0:
+        return [tuple(box) for box in boxes]
+    # Map back to the full image, clipped to its bounds
+    return [
+        (
+            max(0, int(top / scale)),
+            min(width, int(round(right / scale))),
+            min(height, int(round(bottom / scale))),
+            max(0, int(left / scale)),
+        )
+        for top, right, bottom, left in boxes
+    ]
+
+
+def detect_faces_in_file(face_recognition, image_path, settings=None):
+    """
+    Detect and encode the faces in one image.
+
+    Returns:
+        tuple: (full-resolution boxes as [(top, right, bottom, left)], float32 encodings
+        of shape (n, 128)), or None if the image could not be read
+    """
+    import cv2
+
+    settings = settings or FaceDetectionSettings()
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    # Convert to RGB for face_recognition
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    boxes = locate_faces(face_recognition, rgb_image, settings)
+    encodings = face_recognition.face_encodings(rgb_image, boxes)
+    return boxes, np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+
+
+# Per-process state, set up once by _init_worker
+_worker_face_recognition = None
+_worker_settings = None
+
+
+def _init_worker(settings):
+    """Load the face models once per worker and keep dlib to one thread per process."""
+    global _worker_face_recognition, _worker_settings
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    from backend.model_loader import get_model
+    _worker_face_recognition = get_model("face")
+    _worker_settings = settings
+
+
+def _detect_chunk(image_paths):
+    """Detect one chunk inside a worker. Returns (records, timings)."""
+    start = time.perf_counter()
+    records = []
+    for image_path in image_paths:
+        try:
+            result = detect_faces_in_file(_worker_face_recognition, image_path, _worker_settings)
+        except Exception as e:
+            print(f"Face detection error on {image_path}: {e}")
+            result = None
+        records.append((image_path,) + (result if result is not None else (None, None)))
+    timings = {
+        "pid": os.getpid(),
+        "images": len(image_paths),
+        "faces": sum(len(r[2]) for r in records if r[2] is not None),
+        "seconds": time.perf_counter() - start,
+    }
+    return records, timings
+
+
+class FaceDetectionPool:
+    """
+    Face detection and encoding spread over worker processes.
+
+    Workers decode, detect and encode, and send back compact
+    (image_path, boxes, encodings) records; a record with boxes None marks
+    an unreadable file. Records come back in input order so the parent can
+    assign clusters deterministically. Per-worker throughput is collected
+    in worker_stats.
+    """
+
+    def __init__(self, workers=DEFAULT_FACE_WORKERS, chunk_size=FACE_CHUNK_SIZE, settings=None):
+        self.workers = max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self.settings = settings or FaceDetectionSettings()
+        self.worker_stats = {}
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.settings,),
+            )
+        return self._executor
+
+    def detect(self, image_paths):
+        """Yield (image_path, boxes, encodings) for every path, in order."""
+        image_paths = list(image_paths)
+        chunks = [image_paths[i:i + self.chunk_size] for i in range(0, len(image_paths), self.chunk_size)]
+        self.worker_stats = {}
+        for records, timings in self._pool().map(_detect_chunk, chunks):
+            stats = self.worker_stats.setdefault(timings["pid"], {"images": 0, "faces": 0, "seconds": 0.0})
+            for key in ("images", "faces", "seconds"):
+                stats[key] += timings[key]
+            yield from records
+
+    def report(self):
+        """Return {pid: {"images", "faces", "seconds", "images_per_second"}} for the last run."""
+        return {
+            pid: dict(stats, images_per_second=stats["images"] / stats["seconds"] if stats["seconds"] else 0.0)
+            for pid, stats in self.worker_stats.items()
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_pools = {}
+
+
+def get_face_pool(workers=DEFAULT_FACE_WORKERS, settings=None):
+    """Return a shared pool so warm workers survive between runs."""
+    settings = settings or FaceDetectionSettings()
+    key = (workers, settings.key())
+    if key not in _pools:
+        _pools[key] = FaceDetectionPool(workers, settings=settings)
+    return _pools[key]
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
@@ -0,0 +1,408 @@
+# backend/face_recluster.py
+"""
+Offline re-clustering of every stored face encoding.
+
+Ingestion assigns each face greedily to the first cluster within tolerance,
+so the groups depend on the order photos arrived in and drift as cluster
+encodings are averaged. This batch pass rebuilds them from all faces at once:
+
+1. Every encoding in the face table is loaded into one float32 matrix.
+2. A k-nearest-neighbour graph is built over it. Small libraries are
+   searched exactly; large ones are partitioned with k-means (the inverted
+   file idea behind IVFFaceIndex) and each partition is compared only with
+   its nearest partitions. Distances are computed in blocks of at most
+   KNN_SCRATCH entries, so memory stays near n * (512 + 8k) bytes, about
+   600 MB for a million faces at k=10.
+3. Chinese Whispers label propagation runs over the edges within
+   tolerance, taken in both directions.
+4. The new clusters are mapped onto the existing face IDs by overlap, so
+   names given to groups survive.
+
+Faces ingested before the face table existed have no stored encoding and
+keep their groups.
+
+Usage:
+    python -m backend.face_recluster [--metadata face_metadata.json] [--k 10] [--apply]
+
+Without --apply only the report is printed.
+"""
+import argparse
+import os
+import time
+import shutil
+import numpy as np
+from backend.journal import load_store, update_store
+from backend.face_index import FACE_TOLERANCE, ENCODING_DIM, IVF_KMEANS_ITERATIONS, unpack_encodings
+from backend.face_table import get_face_table
+from backend.face_clusters import new_cluster
+from backend.face_ids import fresh_face_ids, reserve_face_ids
+from backend.main_logic import album_path, refresh_face_index
+
+KNN_K = 10  # Neighbours per face in the graph
+KNN_SCRATCH = 1 << 24  # Max distance entries computed at once (64 MB of float32)
+EXACT_KNN_LIMIT = 20000  # Above this many faces the graph is built from k-means partitions
+KNN_NPROBE = 8  # Partitions (including its own) each partition is compared with
+WHISPERS_ITERATIONS = 20
+WHISPERS_BATCHES = 8  # Nodes in a batch update together; more batches converge more like sequential CW
+WHISPERS_CONVERGED = 0.001  # Stop once fewer than this fraction of labels change in an iteration
+SEED = 0
+
+
+def load_faces(table):
+    """
+    Collect every face stored in the face table.
+
+    Returns:
+        tuple: (float32 encodings (n, 128), [(source key, face position)], [current face ID])
+    """
+    data = table.store.data
+    count = sum(len(entry["faces"]) for entry in data.values())
+    encodings = np.empty((count, ENCODING_DIM), dtype=np.float32)
+    refs = []
+    clusters = []
+    row = 0
+    for key, entry in data.items():
+        faces = entry["faces"]
+        if not faces:
+            continue
+        encodings[row:row + len(faces)] = unpack_encodings(entry["encodings"])
+        for position, face in enumerate(faces):
+            refs.append((key, position))
+            clusters.append(face["cluster"])
+        row += len(faces)
+    return encodings, refs, clusters
+
+
+def _squared_distances(queries, query_norms, rows, row_norms):
+    squared = query_norms[:, None] + row_norms[None, :]
+    squared -= 2.0 * (queries @ rows.T)
+    return np.maximum(squared, 0.0)
+
+
+def _top_k(squared, candidates, k):
+    """Return (neighbour rows, distances) of the k smallest entries per row, nearest first; -1 pads."""
+    kk = min(k, squared.shape[1])
+    part = np.argpartition(squared, kk - 1, axis=1)[:, :kk]
+    dist = np.take_along_axis(squared, part, axis=1)
+    order = np.argsort(dist, axis=1)
+    part = np.take_along_axis(part, order, axis=1)
+    dist = np.take_along_axis(dist, order, axis=1)
+
+    neighbours = np.full((len(squared), k), -1, dtype=np.int32)
+    distances = np.full((len(squared), k), np.inf, dtype=np.float32)
+    found = np.isfinite(dist)
+    neighbours[:, :kk] = np.where(found, part if candidates is None else candidates[part], -1)
+    distances[:, :kk] = np.sqrt(dist)
+    return neighbours, distances
+
+
+def _kmeans(data, nlist, seed=SEED):
+    """Fit nlist centroids on a sample of data, as IVFFaceIndex.train does."""
+    rng = np.random.default_rng(seed)
+    sample = data[rng.choice(len(data), size=min(len(data), 64 * nlist), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    sample_norms = (sample * sample).sum(axis=1)
+    for _ in range(IVF_KMEANS_ITERATIONS):
+        labels = _squared_distances(sample, sample_norms, centroids, (centroids * centroids).sum(axis=1)).argmin(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def knn_graph(encodings, k=KNN_K, nprobe=KNN_NPROBE, exact_limit=EXACT_KNN_LIMIT):
+    """
+    Build the k-nearest-neighbour graph of encodings (self excluded).
+
+    Returns:
+        tuple: (int32 neighbour rows (n, k) with -1 for missing, float32 distances (n, k))
+    """
+    n = len(encodings)
+    norms = (encodings * encodings).sum(axis=1)
+    neighbours = np.full((n, k), -1, dtype=np.int32)
+    distances = np.full((n, k), np.inf, dtype=np.float32)
+    if n < 2:
+        return neighbours, distances
+
+    if n <= exact_limit:
+        block = max(1, KNN_SCRATCH // n)
+        for start in range(0, n, block):
+            stop = min(n, start + block)
+            squared = _squared_distances(encodings[start:stop], norms[start:stop], encodings, norms)
+            squared[np.arange(stop - start), np.arange(start, stop)] = np.inf
+            neighbours[start:stop], distances[start:stop] = _top_k(squared, None, k)
+        return neighbours, distances
+
+    nlist = int(np.clip(np.sqrt(n), 16, 4096))
+    centroids = _kmeans(encodings, nlist)
+    centroid_norms = (centroids * centroids).sum(axis=1)
+    assign = np.empty(n, dtype=np.int32)
+    for start in range(0, n, 65536):
+        block = encodings[start:start + 65536]
+        assign[start:start + len(block)] = _squared_distances(
+            block, norms[start:start + 65536], centroids, centroid_norms
+        ).argmin(axis=1)
+    order = np.argsort(assign, kind="stable")
+    bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+    # Each partition is searched together with the partitions whose centroids are nearest to its own
+    probes = np.argsort(_squared_distances(centroids, centroid_norms, centroids, centroid_norms), axis=1)
+    probes = probes[:, :min(nprobe, nlist)]
+
+    for centroid in range(nlist):
+        members = order[bounds[centroid]:bounds[centroid + 1]]
+        if not len(members):
+            continue
+        candidates = np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probes[centroid]])
+        candidate_matrix = encodings[candidates]
+        candidate_norms = norms[candidates]
+        block = max(1, KNN_SCRATCH // len(candidates))
+        for start in range(0, len(members), block):
+            rows = members[start:start + block]
+            squared = _squared_distances(encodings[rows], norms[rows], candidate_matrix, candidate_norms)
+            squared[rows[:, None] == candidates[None, :]] = np.inf
+            neighbours[rows], distances[rows] = _top_k(squared, candidates, k)
+    return neighbours, distances
+
+
+def undirected_edges(neighbours, distances, tolerance=FACE_TOLERANCE):
+    """
+    Turn a k-NN graph into undirected edges within tolerance.
+
+    A k-NN graph is directed: a face can be among another's nearest without
+    the reverse holding, which splits larger groups apart. Every edge is
+    therefore kept in both directions (once).
+
+    Returns:
+        tuple: (int32 source rows, int32 target rows, float32 distances), sorted by source
+    """
+    n, k = neighbours.shape
+    valid = (neighbours >= 0) & (distances <= tolerance)
+    source = np.repeat(np.arange(n, dtype=np.int64), k)[valid.ravel()]
+    target = neighbours[valid].astype(np.int64)
+    dist = distances[valid]
+    both = np.concatenate([source * n + target, target * n + source])
+    both_dist = np.concatenate([dist, dist])
+    keys, first = np.unique(both, return_index=True)
+    return (keys // n).astype(np.int32), (keys % n).astype(np.int32), both_dist[first]
+
+
+def chinese_whispers(neighbours, distances, tolerance=FACE_TOLERANCE, iterations=WHISPERS_ITERATIONS,
+                     batches=WHISPERS_BATCHES, seed=SEED):
+    """
+    Cluster a k-NN graph with Chinese Whispers.
+
+    Every face starts in its own cluster and repeatedly takes the label most
+    common among its neighbours within tolerance (ties go to the closer
+    neighbours). Nodes are visited in random batches; each batch counts its
+    votes with array operations rather than one node at a time.
+
+    Returns:
+        ndarray: Cluster number per face, 0..clusters-1
+    """
+    n = len(neighbours)
+    labels = np.arange(n, dtype=np.int64)
+    source, target, dist = undirected_edges(neighbours, distances, tolerance)
+    # One vote per edge, nudged up for closer neighbours to break ties
+    weights = 1.0 + 1e-3 * (1.0 - dist / tolerance)
+    in_batch = np.zeros(n, dtype=bool)
+    rng = np.random.default_rng(seed)
+
+    for _ in range(iterations):
+        changed = 0
+        for batch in np.array_split(rng.permutation(n), batches):
+            in_batch[batch] = True
+            picked = in_batch[source]
+            nodes = source[picked].astype(np.int64)
+            # Sum the weights per (node, neighbour label), then keep the best label per node
+            keys, inverse = np.unique(nodes * n + labels[target[picked]], return_inverse=True)
+            votes = np.bincount(inverse, weights=weights[picked])
+            order = np.lexsort((-votes, keys // n))
+            voters = keys[order] // n
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = voters[1:] != voters[:-1]
+            winners = voters[first]
+            new = keys[order][first] % n
+            changed += int((labels[winners] != new).sum())
+            labels[winners] = new
+            in_batch[batch] = False
+        if changed <= WHISPERS_CONVERGED * n:
+            break
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def map_to_face_ids(labels, old_clusters, taken_ids, metadata_file="face_metadata.json"):
+    """
+    Name the new clusters after the existing face IDs they overlap most.
+
+    Overlaps are matched greedily, largest first, so each existing ID (and
+    the name a user gave it) goes to at most one new cluster. Clusters left
+    over get Face_NNN IDs never used for metadata_file before.
+
+    Returns:
+        list: Face ID per face
+    """
+    old_names, old_codes = np.unique(np.asarray(old_clusters, dtype=str), return_inverse=True)
+    pairs, counts = np.unique(labels.astype(np.int64) * len(old_names) + old_codes, return_counts=True)
+    names = {}
+    used = set()
+    for pair in pairs[np.argsort(-counts, kind="stable")]:
+        label, old = divmod(int(pair), len(old_names))
+        if label not in names and old not in used:
+            names[label] = str(old_names[old])
+            used.add(old)
+    fresh = fresh_face_ids(metadata_file, set(taken_ids) | set(old_names.tolist()))
+    for label in range(int(labels.max()) + 1 if len(labels) else 0):
+        if label not in names:
+            names[label] = next(fresh)
+    return [names[int(label)] for label in labels]
+
+
+def compare_assignments(old_clusters, new_clusters):
+    """Return {"split", "merged", "moved", "before", "after"} counts for a re-clustering."""
+    old_to_new = {}
+    new_to_old = {}
+    moved = 0
+    for old, new in zip(old_clusters, new_clusters):
+        old_to_new.setdefault(old, set()).add(new)
+        new_to_old.setdefault(new, set()).add(old)
+        moved += old != new
+    return {
+        "before": len(old_to_new),
+        "after": len(new_to_old),
+        "split": sum(len(targets) > 1 for targets in old_to_new.values()),
+        "merged": sum(len(sources) > 1 for sources in new_to_old.values()),
+        "moved": moved,
+    }
+
+
+def apply_assignment(metadata_file, table, refs, encodings, new_clusters, output_folder="face_detected"):
+    """
+    Write a new face -> cluster assignment to the metadata, face table and face index.
+
+    Faces that sit in a group folder (copy, hardlink or symlink albums) are
+    moved to their new group's folder; virtual albums only change metadata.
+    Each changed group's centroid and exemplars are rebuilt from its faces.
+    """
+    metadata = load_store(metadata_file)
+    key = table.key
+    faces_by_image = {}
+    changed_ids = set()
+    # Source paths as the metadata spells them (often relative to the input folder)
+    spelled = {key(p): p for data in metadata.values() for p in data.get("images", [])}
+
+    for (source, position), new in zip(refs, new_clusters):
+        faces = faces_by_image.get(source) or [dict(face) for face in table.store.data[source]["faces"]]
+        face = faces[position]
+        old = face["cluster"]
+        if old == new:
+            continue
+        faces_by_image[source] = faces
+        album_entry = face.get("copy") or source
+        face["cluster"] = new
+        # Another face of this image can still keep the old entry in use
+        still_used = any(
+            other["cluster"] == old and key(other.get("copy") or source) == key(album_entry) for other in faces
+        )
+
+        new_entry = album_entry
+        if face.get("copy"):
+            face_dir = os.path.join(output_folder, new)
+            os.makedirs(face_dir, exist_ok=True)
+            new_entry = album_path(face_dir, os.path.basename(album_entry))
+            (shutil.copy if still_used else shutil.move)(album_entry, new_entry)
+            face["copy"] = new_entry
+
+        if old in metadata and not still_used:
+            metadata[old]["images"] = [p for p in metadata[old]["images"] if key(p) != key(album_entry)]
+        if face.get("copy") is None:
+            new_entry = spelled.get(key(source), source)
+        target = metadata.setdefault(new, {"images": [], "encoding": None})
+        if not any(key(p) == key(new_entry) for p in target["images"]):
+            target["images"].append(new_entry)
+        changed_ids.update((old, new))
+
+    # Centroid, count and exemplars of each changed group, rebuilt from its members
+    members = {}
+    for row, face_id in enumerate(new_clusters):
+        if face_id in changed_ids:
+            members.setdefault(face_id, []).append(row)
+    for face_id, rows in members.items():
+        metadata[face_id].update(new_cluster(encodings[rows]), images=metadata[face_id]["images"])
+
+    deletes = [face_id for face_id in changed_ids if face_id in metadata and not metadata[face_id]["images"]]
+    # New IDs and emptied ones alike stay out of later numbering
+    reserve_face_ids(metadata_file, changed_ids)
+    for face_id in deletes:
+        metadata.pop(face_id)
+        face_dir = os.path.join(output_folder, face_id)
+        if os.path.isdir(face_dir) and not os.listdir(face_dir):
+            os.rmdir(face_dir)
+    update_store(metadata_file, {face_id: metadata[face_id] for face_id in changed_ids if face_id in metadata}, deletes)
+    table.set_faces(faces_by_image)
+    refresh_face_index(members, metadata, metadata_file)
+    return changed_ids
+
+
+def recluster(metadata_file="face_metadata.json", k=KNN_K, tolerance=FACE_TOLERANCE, apply=False,
+              output_folder="face_detected"):
+    """
+    Re-cluster every stored face and report how the groups change.
+
+    Returns:
+        dict: Counts from compare_assignments plus "faces" and per-phase "seconds"
+    """
+    timings = {}
+    start = time.perf_counter()
+    table = get_face_table(metadata_file)
+    encodings, refs, old_clusters = load_faces(table)
+    timings["load"] = time.perf_counter() - start
+    if not refs:
+        print("No stored face encodings to re-cluster.")
+        return {"faces": 0, "seconds": timings}
+
+    start = time.perf_counter()
+    neighbours, distances = knn_graph(encodings, k)
+    timings["knn"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = chinese_whispers(neighbours, distances, tolerance)
+    timings["whispers"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_clusters = map_to_face_ids(labels, old_clusters, load_store(metadata_file).keys(), metadata_file)
+    report = compare_assignments(old_clusters, new_clusters)
+    timings["mapping"] = time.perf_counter() - start
+
+    if apply:
+        start = time.perf_counter()
+        apply_assignment(metadata_file, table, refs, encodings, new_clusters, output_folder)
+        timings["apply"] = time.perf_counter() - start
+
+    report["faces"] = len(refs)
+    report["seconds"] = timings
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-cluster every stored face encoding")
+    parser.add_argument("--metadata", default="face_metadata.json")
+    parser.add_argument("--output-folder", default="face_detected", help="Where copied or linked albums live")
+    parser.add_argument("--k", type=int, default=KNN_K, help="Neighbours per face in the graph")
+    parser.add_argument("--tolerance", type=float, default=FACE_TOLERANCE)
+    parser.add_argument("--apply", action="store_true", help="Write the new assignment (default: report only)")
+    args = parser.parse_args(argv)
+
+    report = recluster(args.metadata, args.k, args.tolerance, args.apply, args.output_folder)
+    if not report["faces"]:
+        return
+    print(f"{report['faces']} faces: {report['before']} clusters -> {report['after']}")
+    print(f"  split {report['split']}, merged {report['merged']}, faces moved {report['moved']}")
+    print("  " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in report["seconds"].items()))
+    if not args.apply:
+        print("Report only; run with --apply to write the new clusters.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# backend/face_search.py
+"""
+Search the library by example: which photos contain this person?
+
+Every face in the face table is indexed on its own, not per group, so a
+query face is compared with the stored faces themselves and no library
+image is run through detection again. The index is whatever kind the
+cluster index uses (HNSW with hnswlib, otherwise IVF). It is saved next to
+the metadata (face_metadata.json -> face_metadata.search.npz) and only
+resynced when the face table has changed since the last search. Images
+whose face encodings changed are found by a CRC of their packed encodings.
+"""
+import os
+import zlib
+import threading
+import numpy as np
+from backend.face_index import FACE_INDEX_KIND, unpack_encodings, _index_class
+from backend.face_table import get_face_table
+
+FACE_SEARCH_K = 50  # Faces fetched per query face (at most this many images come back)
+FACE_ROW_SEPARATOR = "#"  # Vector ID = "<source image key>#<face position>"
+
+
+def search_index_path_for(metadata_file):
+    """Where the per-face search index for metadata_file is kept."""
+    return os.path.splitext(metadata_file)[0] + ".search.npz"
+
+
+def _fingerprint(entry):
+    return zlib.crc32(entry["encodings"].encode("ascii"))
+
+
+class FaceSearchIndex:
+    """Nearest-neighbour index over every stored face, kept in line with the face table."""
+
+    def __init__(self, metadata_file, kind=FACE_INDEX_KIND):
+        self.table = get_face_table(metadata_file)
+        self.path = search_index_path_for(metadata_file)
+        self.cls = _index_class(kind)
+        self.index = None
+        self.fingerprints = {}  # Source key -> CRC of the encodings indexed for it
+        self._signature = None  # Face table signature the index was synced with
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path) and os.path.exists(self.path + ".sync.npz"):
+                index = self.cls.load(self.path)
+                with np.load(self.path + ".sync.npz", allow_pickle=False) as state:
+                    self.fingerprints = dict(zip(state["keys"].tolist(), state["crcs"].tolist()))
+                return index
+        except Exception as e:
+            print(f"Rebuilding face search index, could not load {self.path}: {e}")
+        self.fingerprints = {}
+        return self.cls()
+
+    def save(self):
+        self.index.save(self.path)
+        tmp_path = self.path + ".sync.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(list(self.fingerprints), dtype=str),
+                crcs=np.array(list(self.fingerprints.values()), dtype=np.uint32),
+            )
+        os.replace(tmp_path, self.path + ".sync.npz")
+
+    def _drop(self, key):
+        position = 0
+        while f"{key}{FACE_ROW_SEPARATOR}{position}" in self.index:
+            self.index.remove(f"{key}{FACE_ROW_SEPARATOR}{position}")
+            position += 1
+
+    def refresh(self):
+        """Bring the index in line with the face table; cheap when nothing changed."""
+        with self._lock:
+            store = self.table.store
+            store.refresh()
+            if self.index is not None and store.signature == self._signature:
+                return self.index
+            if self.index is None:
+                self.index = self._load()
+
+            # Ingestion and the GUI write the table from other threads
+            with store.lock:
+                current = {
+                    key: (_fingerprint(entry), entry["encodings"])
+                    for key, entry in store.data.items() if entry["faces"]
+                }
+                signature = store.signature
+            changed = False
+            for key, crc in list(self.fingerprints.items()):
+                if key not in current or current[key][0] != crc:
+                    self._drop(key)
+                    del self.fingerprints[key]
+                    changed = True
+            ids = []
+            encodings = []
+            for key, (crc, packed) in current.items():
+                if key not in self.fingerprints:
+                    rows = unpack_encodings(packed)
+                    ids += [f"{key}{FACE_ROW_SEPARATOR}{position}" for position in range(len(rows))]
+                    encodings.append(rows)
+                    self.fingerprints[key] = crc
+            if ids:
+                self.index.add_many(ids, np.vstack(encodings))
+                changed = True
+            if changed:
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"Error saving face search index: {e}")
+            self._signature = signature
+            return self.index
+
+    def search(self, encodings, k=FACE_SEARCH_K):
+        """
+        Find the library images whose faces are nearest to each query encoding.
+
+        Returns:
+            list: Per query, [(source_path, distance, face_id)] nearest first, one entry per image
+        """
+        index = self.refresh()
+        data = self.table.store.data
+        results = []
+        for vector_ids, distances in index.search(encodings, k):
+            hits = []
+            seen = set()
+            for vector_id, distance in zip(vector_ids, distances.tolist()):
+                key, position = vector_id.rsplit(FACE_ROW_SEPARATOR, 1)
+                if key in seen or key not in data:
+                    continue
+                seen.add(key)
+                faces = data[key]["faces"]
+                face_id = faces[int(position)]["cluster"] if int(position) < len(faces) else None
+                hits.append((key, distance, face_id))
+            results.append(hits)
+        return results
+
+
+_searches = {}
+_searches_lock = threading.Lock()
+
+
+def get_face_search(metadata_file, kind=FACE_INDEX_KIND):
+    """Return the shared face search index for the face metadata in metadata_file."""
+    key = os.path.abspath(metadata_file)
+    with _searches_lock:
+        if key not in _searches:
+            _searches[key] = FaceSearchIndex(metadata_file, kind)
+        return _searches[key]
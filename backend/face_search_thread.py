@@ -0,0 +1,28 @@
+import os
+from PyQt6.QtCore import QThread, pyqtSignal
+from backend.main_logic import search_faces_by_example, METADATA_PATH
+
+
+class FaceSearchThread(QThread):
+    """
+    Runs a search by example off the GUI thread.
+
+    Detecting the faces of the query image, and bringing the search index
+    in line with the face table, can take seconds on a large library.
+    """
+    search_complete = pyqtSignal(str, list)  # query image path, [(box, matches)] per face
+    search_failed = pyqtSignal(str, str)  # query image path, error
+
+    def __init__(self, image_path, metadata_file=METADATA_PATH):
+        super().__init__()
+        self.image_path = image_path
+        self.metadata_file = metadata_file
+
+    def run(self):
+        try:
+            results = search_faces_by_example(self.image_path, metadata_file=self.metadata_file)
+        except Exception as e:
+            print(f"Search by example failed for {os.path.basename(self.image_path)}: {e}")
+            self.search_failed.emit(self.image_path, str(e))
+            return
+        self.search_complete.emit(self.image_path, results)
@@ -0,0 +1,186 @@
+# backend/face_table.py
+import os
+import threading
+from backend.journal import get_store
+from backend.face_index import pack_encodings, unpack_encodings
+
+
+def table_path_for(metadata_file):
+    """Where the per-image face table for metadata_file is kept."""
+    return os.path.splitext(metadata_file)[0] + ".faces.json"
+
+
+class FaceTable:
+    """
+    Per-source-image record of the faces ingestion found.
+
+    Each entry is keyed by the source image's absolute path and holds, per
+    face, its full-resolution (top, right, bottom, left) box, the cluster it
+    was assigned to and the copy made for that cluster (None when the album
+    references the source directly), plus all encodings packed into one
+    base64 float32 blob. Copies made under face_detected/ resolve back to
+    their source, so the viewer can draw boxes for either path without
+    running detection.
+    """
+
+    def __init__(self, table_file):
+        self.store = get_store(table_file)
+        self._lock = threading.RLock()
+        self._aliases = None  # copy path -> source key, built on first lookup
+
+    @staticmethod
+    def key(path):
+        return os.path.normpath(os.path.abspath(path))
+
+    def _alias_map(self):
+        if self._aliases is None:
+            self._aliases = {
+                self.key(face["copy"]): source
+                for source, entry in self.store.data.items()
+                for face in entry["faces"] if face.get("copy")
+            }
+        return self._aliases
+
+    def entry(self, source_path, boxes, encodings, clusters, copies):
+        """Build the (key, entry) pair for one ingested image without writing it."""
+        return self.key(source_path), {
+            "faces": [
+                {"box": [int(v) for v in box], "cluster": cluster, "copy": copy}
+                for box, cluster, copy in zip(boxes, clusters, copies)
+            ],
+            "encodings": pack_encodings(encodings),
+        }
+
+    def put_many(self, entries):
+        """Write (key, entry) pairs from entry() with one journal append."""
+        entries = dict(entries)
+        if not entries:
+            return
+        with self._lock:
+            self.store.update(entries)
+            aliases = self._alias_map()
+            for source, entry in entries.items():
+                for face in entry["faces"]:
+                    if face.get("copy"):
+                        aliases[self.key(face["copy"])] = source
+
+    def lookup(self, path):
+        """
+        Return (source key, entry) for a source image or one of its copies.
+
+        Returns:
+            tuple: (key, {"faces": [...], "encodings": ndarray}) or (None, None) if not ingested
+        """
+        with self._lock:
+            signature = self.store.signature
+            self.store.refresh()
+            if self.store.signature != signature:
+                self._aliases = None  # Another process wrote the table
+            key = self.key(path)
+            if key not in self.store.data:
+                key = self._alias_map().get(key)
+            entry = self.store.data.get(key) if key else None
+            if entry is None:
+                return None, None
+            return key, {"faces": entry["faces"], "encodings": unpack_encodings(entry["encodings"])}
+
+    def faces(self, path):
+        """Return [(box, cluster)] for an image or a copy of it; None if it was never ingested."""
+        _, entry = self.lookup(path)
+        if entry is None:
+            return None
+        return [(tuple(face["box"]), face["cluster"]) for face in entry["faces"]]
+
+    def _rewrite(self, changed):
+        if changed:
+            self.store.update(changed)
+            self._aliases = None
+
+    def set_faces(self, changes):
+        """Replace the per-face records ({key: [face dicts]}) of whole images, keeping their encodings."""
+        with self._lock:
+            self._rewrite({key: dict(self.store.data[key], faces=faces) for key, faces in changes.items()})
+
+    def reassign(self, path, old_cluster, new_cluster, new_path=None):
+        """
+        Move the faces behind one album entry to another cluster.
+
+        path is either a copy (the face it was made for moves) or a source
+        image referenced directly by a virtual album (its faces in
+        old_cluster move). new_path is where a moved copy now lives.
+
+        Returns:
+            ndarray: Encodings of the faces that moved, or None if path was never ingested
+        """
+        with self._lock:
+            key, entry = self.lookup(path)
+            if key is None:
+                return None
+            path_key = self.key(path)
+            faces = []
+            moved_rows = []
+            for position, face in enumerate(self.store.data[key]["faces"]):
+                face = dict(face)
+                if face.get("copy"):
+                    moved = self.key(face["copy"]) == path_key
+                else:
+                    moved = key == path_key and face["cluster"] == old_cluster
+                if moved:
+                    moved_rows.append(position)
+                    face["cluster"] = new_cluster
+                    if face.get("copy") and new_path:
+                        face["copy"] = new_path
+                faces.append(face)
+            self._rewrite({key: dict(self.store.data[key], faces=faces)})
+            return entry["encodings"][moved_rows]
+
+    def rename_cluster(self, old_cluster, new_cluster, moved_paths=None):
+        """Relabel every face of old_cluster and remap copies that moved on disk."""
+        moved = {self.key(old): new for old, new in (moved_paths or {}).items()}
+        with self._lock:
+            changed = {}
+            for key, entry in self.store.data.items():
+                if not any(face["cluster"] == old_cluster for face in entry["faces"]):
+                    continue
+                faces = []
+                for face in entry["faces"]:
+                    face = dict(face)
+                    if face["cluster"] == old_cluster:
+                        face["cluster"] = new_cluster
+                        if face.get("copy"):
+                            face["copy"] = moved.get(self.key(face["copy"]), face["copy"])
+                    faces.append(face)
+                changed[key] = dict(entry, faces=faces)
+            self._rewrite(changed)
+
+    def rename_path(self, old_path, new_path):
+        """Follow a rename of a source image or of one of its copies."""
+        with self._lock:
+            old_key, new_key = self.key(old_path), self.key(new_path)
+            if old_key in self.store.data:
+                self.store.update({new_key: self.store.data[old_key]}, deletes=[old_key])
+                self._aliases = None
+                return
+            source, _ = self.lookup(old_path)
+            if source is None:
+                return
+            entry = dict(self.store.data[source])
+            entry["faces"] = [
+                dict(face, copy=new_path) if face.get("copy") and self.key(face["copy"]) == old_key else face
+                for face in entry["faces"]
+            ]
+            self._rewrite({source: entry})
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_face_table(metadata_file):
+    """Return the shared face table for the face metadata in metadata_file."""
+    path = table_path_for(metadata_file)
+    key = os.path.abspath(path)
+    with _tables_lock:
+        if key not in _tables:
+            _tables[key] = FaceTable(path)
+        return _tables[key]
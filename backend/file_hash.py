@@ -0,0 +1,13 @@
+# backend/file_hash.py
+import hashlib
+
+HASH_CHUNK_SIZE = 1 << 20  # Read files in 1 MiB chunks
+
+
+def content_hash(path, chunk_size=HASH_CHUNK_SIZE):
+    """Return a hex digest of the file's bytes, independent of its name or location."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
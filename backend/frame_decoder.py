@@ -0,0 +1,51 @@
+# backend/frame_decoder.py
+import numpy as np
+from PIL import Image, ImageOps
+
+MAX_DECODE_SIDE = 1920  # Longest side after decoding; None keeps full resolution
+
+
+def decode_frame(image_path, max_side=MAX_DECODE_SIDE):
+    """
+    Decode an image file once into an upright RGB pixel buffer.
+
+    Args:
+        image_path: Path to the image file
+        max_side: Optional bound on the longest side of the decoded frame
+
+    Returns:
+        numpy.ndarray: uint8 array of shape (height, width, 3) in RGB order
+    """
+    with Image.open(image_path) as image:
+        if max_side:
+            # JPEGs can be decoded directly at 1/2, 1/4 or 1/8 scale, which
+            # skips most of the IDCT work on large phone photos
+            image.draft("RGB", (max_side, max_side))
+            if max(image.size) > max_side:
+                image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+        # Phone photos are stored sideways with an EXIF orientation tag;
+        # cv2.imread applied it, so boxes must be found in the upright frame
+        image = ImageOps.exif_transpose(image)
+        return np.asarray(image.convert("RGB"))
+
+
+def decode_frames(image_paths, max_side=MAX_DECODE_SIDE):
+    """
+    Decode several files, skipping the ones that cannot be read.
+
+    Returns:
+        list: One frame per path, or None where decoding failed
+    """
+    frames = []
+    for image_path in image_paths:
+        try:
+            frames.append(decode_frame(image_path, max_side))
+        except Exception as e:
+            print(f"Decode error on {image_path}: {e}")
+            frames.append(None)
+    return frames
+
+
+def as_bgr(frame):
+    """Return a BGR view of an RGB frame without copying the pixels."""
+    return frame[..., ::-1]
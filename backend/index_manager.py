@@ -1,30 +1,312 @@
 import os
 import json
+import sqlite3
+import threading
+from types import MappingProxyType
+import numpy as np
 
-metadata_file = os.path.join("data", "object_metadata.json")
+metadata_file = os.path.join("data", "object_metadata.json")  # Legacy JSON index, migrated once
+index_db_file = os.path.join("data", "object_index.db")
 
 def load_index(force_reload=False):
     """
-    Load the object detection index from disk
-    
+    Load the whole object detection index as a dict.
+
+    Kept for compatibility; the search UI queries ObjectIndex directly and
+    never needs the full index in memory. The result is cached until the
+    database changes.
+
     Args:
-        force_reload (bool): If True, bypass any caching and reload directly from disk
+        force_reload (bool): If True, reopen the database instead of reusing the shared connection
         
     Returns:
-        dict: The loaded index data
+        Mapping: Read-only {filename: entry} view of every indexed image
     """
-    index_path = metadata_file
-    
     try:
-        if os.path.exists(index_path):
-            with open(index_path, 'r') as f:
-                return json.load(f)
+        return get_object_index(force_reload).as_dict()
     except Exception as e:
         print(f"Error loading index: {e}")
     
     return {}
 
+def entry_objects(entry):
+    """
+    Return the {label: score} dict of an index entry.
+
+    Entries written since cascade detection are {"objects": {...}, "tier": ...};
+    older entries are the bare {label: score} dict.
+    """
+    objects = entry.get("objects")
+    return objects if isinstance(objects, dict) else entry
+
+def entry_tier(entry):
+    """Return which detection tier produced an entry, or None for older entries."""
+    return entry.get("tier") if isinstance(entry.get("objects"), dict) else None
+
+def objects_above(entry, threshold):
+    """Return the labels of an entry whose best score reaches threshold."""
+    return {label: score for label, score in entry_objects(entry).items() if score >= threshold}
+
+def pack_detections(detections):
+    """
+    Pack detections into the compact array form stored in the index.
+
+    Args:
+        detections: List of (label, score, (x1, y1, x2, y2)) with boxes normalised to 0..1
+
+    Returns:
+        dict: {"labels": [...], "label_ids": [...], "scores": [...], "boxes": [x1, y1, x2, y2, ...]}
+    """
+    labels = sorted({label for label, _, _ in detections})
+    label_ids = {label: i for i, label in enumerate(labels)}
+    boxes = np.asarray([box for _, _, box in detections], dtype=np.float64).reshape(-1)
+    return {
+        "labels": labels,
+        "label_ids": [label_ids[label] for label, _, _ in detections],
+        "scores": np.round(np.asarray([score for _, score, _ in detections], dtype=np.float64), 4).tolist(),
+        "boxes": np.round(np.clip(boxes, 0.0, 1.0), 4).tolist(),
+    }
+
+def unpack_detections(entry):
+    """
+    Return the stored detections of an entry as arrays.
+
+    Returns:
+        tuple: (labels, label_ids int32[N], scores float32[N], boxes float32[N, 4]);
+        empty arrays for entries written before boxes were stored
+    """
+    packed = entry.get("detections") if isinstance(entry.get("objects"), dict) else None
+    if not packed:
+        return [], np.zeros(0, np.int32), np.zeros(0, np.float32), np.zeros((0, 4), np.float32)
+    return (
+        packed["labels"],
+        np.asarray(packed["label_ids"], dtype=np.int32),
+        np.asarray(packed["scores"], dtype=np.float32),
+        np.asarray(packed["boxes"], dtype=np.float32).reshape(-1, 4),
+    )
+
 def save_index(index_data):
-    os.makedirs(os.path.dirname(metadata_file), exist_ok=True)
-    with open(metadata_file, "w") as f:
-        json.dump(index_data, f, indent=4)
+    """Replace the stored index with index_data (compatibility wrapper around ObjectIndex)."""
+    get_object_index().replace_all(index_data)
+
+
+class ObjectIndex:
+    """
+    SQLite store for the object index with an inverted label table.
+
+    images holds one row per file with its full entry as JSON. labels maps
+    each label name to an id and postings holds one (label, image, best score)
+    row per detected label, so a search touches only the matching labels'
+    postings instead of every image.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY,
+            filename TEXT NOT NULL UNIQUE,
+            tier TEXT,
+            entry TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS labels (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            label_id INTEGER NOT NULL REFERENCES labels(id),
+            image_id INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
+            score REAL NOT NULL,
+            PRIMARY KEY (label_id, image_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_by_label_score ON postings (label_id, score);
+        CREATE INDEX IF NOT EXISTS postings_by_image ON postings (image_id);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_file=index_db_file):
+        self.db_file = db_file
+        if os.path.dirname(db_file):
+            os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        # The detection thread and the UI share one connection, serialised by the lock
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(self.SCHEMA)
+        self._label_ids = dict(self._conn.execute("SELECT name, id FROM labels"))
+        self._dict_cache = None  # (version, read-only {filename: entry}) from as_dict
+
+    def __contains__(self, filename):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM images WHERE filename = ?", (filename,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def _label_id(self, name):
+        label_id = self._label_ids.get(name)
+        if label_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO labels (name) VALUES (?)", (name,))
+            label_id = self._conn.execute("SELECT id FROM labels WHERE name = ?", (name,)).fetchone()[0]
+            self._label_ids[name] = label_id
+        return label_id
+
+    def _write(self, filename, entry):
+        self._conn.execute(
+            "INSERT INTO images (filename, tier, entry) VALUES (?, ?, ?) "
+            "ON CONFLICT(filename) DO UPDATE SET tier = excluded.tier, entry = excluded.entry",
+            (filename, entry_tier(entry), json.dumps(entry)),
+        )
+        image_id = self._conn.execute("SELECT id FROM images WHERE filename = ?", (filename,)).fetchone()[0]
+        self._conn.execute("DELETE FROM postings WHERE image_id = ?", (image_id,))
+        self._conn.executemany(
+            "INSERT INTO postings (label_id, image_id, score) VALUES (?, ?, ?)",
+            [(self._label_id(label), image_id, float(score)) for label, score in entry_objects(entry).items()],
+        )
+
+    def put_many(self, entries):
+        """Insert or replace {filename: entry} in one transaction."""
+        with self._lock, self._conn:
+            for filename, entry in entries.items():
+                self._write(filename, entry)
+
+    def put(self, filename, entry):
+        self.put_many({filename: entry})
+
+    def get(self, filename, default=None):
+        """Return the stored entry for filename, or default."""
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM images WHERE filename = ?", (filename,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def delete(self, filename):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM images WHERE filename = ?", (filename,))
+
+    def rename(self, old_filename, new_filename):
+        """
+        Move an entry to a new filename, replacing any entry already stored there.
+
+        Returns:
+            bool: False if old_filename is not indexed or the rename failed
+        """
+        if old_filename == new_filename:
+            return old_filename in self
+        try:
+            with self._lock, self._conn:
+                if self._conn.execute("SELECT 1 FROM images WHERE filename = ?", (old_filename,)).fetchone() is None:
+                    return False
+                # The file on disk was overwritten, so its old entry goes (postings cascade)
+                self._conn.execute("DELETE FROM images WHERE filename = ?", (new_filename,))
+                self._conn.execute(
+                    "UPDATE images SET filename = ? WHERE filename = ?", (new_filename, old_filename)
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"Error renaming {old_filename} to {new_filename} in the object index: {e}")
+            return False
+
+    def filenames(self):
+        """Return the set of indexed filenames."""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT filename FROM images")}
+
+    def search(self, query, threshold=0.0, limit=None):
+        """
+        Find images with a label containing query (case-insensitive) scored at least threshold.
+
+        Args:
+            query (str): Substring to match against label names
+            threshold (float): Minimum best score of the matching label
+            limit (int): Optional cap on the number of filenames returned
+
+        Returns:
+            list: Matching filenames, sorted
+        """
+        # The label table is small, so the substring test runs there and
+        # only the matching labels' postings are read
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sql = (
+            "SELECT DISTINCT images.filename FROM postings "
+            "JOIN images ON images.id = postings.image_id "
+            "WHERE postings.label_id IN (SELECT id FROM labels WHERE name LIKE ? ESCAPE '\\') "
+            "AND postings.score >= ? ORDER BY images.filename"
+        )
+        params = [pattern, threshold]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def _version(self):
+        # data_version moves on commits from other connections, total_changes on ours
+        return self._conn.execute("PRAGMA data_version").fetchone()[0], self._conn.total_changes
+
+    def as_dict(self):
+        """Return the whole index as a read-only {filename: entry} view, parsed once per change."""
+        with self._lock:
+            version = self._version()
+            if self._dict_cache is None or self._dict_cache[0] != version:
+                rows = self._conn.execute("SELECT filename, entry FROM images")
+                self._dict_cache = (version, MappingProxyType({filename: json.loads(entry) for filename, entry in rows}))
+            return self._dict_cache[1]
+
+    def replace_all(self, index_data):
+        """Make the stored index equal to index_data, rewriting only entries that changed."""
+        with self._lock, self._conn:
+            stored = dict(self._conn.execute("SELECT filename, entry FROM images"))
+            for filename in stored.keys() - index_data.keys():
+                self._conn.execute("DELETE FROM images WHERE filename = ?", (filename,))
+            for filename, entry in index_data.items():
+                if stored.get(filename) != json.dumps(entry):
+                    self._write(filename, entry)
+
+    def migrate_json(self, json_file=metadata_file):
+        """
+        Import the legacy JSON index once.
+
+        The JSON file is left in place; a marker in the meta table stops
+        it from being imported again.
+        """
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done or not os.path.exists(json_file):
+            return 0
+        try:
+            with open(json_file, "r") as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"Error migrating {json_file}: {e}")
+            return 0
+        with self._lock, self._conn:
+            for filename, entry in legacy.items():
+                if isinstance(entry, dict):
+                    self._write(filename, entry)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (json_file,)
+            )
+        print(f"Migrated {len(legacy)} entries from {json_file} to {self.db_file}")
+        return len(legacy)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_object_index = None
+
+def get_object_index(force_reload=False):
+    """Return the shared ObjectIndex, migrating the legacy JSON index on first use."""
+    global _object_index
+    if _object_index is None or force_reload:
+        if _object_index is not None:
+            _object_index.close()
+        _object_index = ObjectIndex(index_db_file)
+        _object_index.migrate_json(metadata_file)
+    return _object_index
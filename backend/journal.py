@@ -0,0 +1,231 @@
+# backend/journal.py
+"""
+Append-only journal for the JSON metadata files.
+
+A store is the usual JSON snapshot (e.g. face_metadata.json) plus a sibling
+"<snapshot>.journal" file with one JSON record per changed key. Saving
+appends records for the keys that changed, so its cost follows the size of
+the change rather than the size of the library. Loading reads the snapshot
+and replays the journal. Once COMPACT_EVERY records have accumulated, the
+current state is written to a temporary file and swapped in with os.replace.
+After that the journal is truncated.
+
+Records only ever set or delete a whole key, so replaying a journal over a
+snapshot that already contains it gives the same result. A crash between
+the snapshot swap and the truncation therefore loses nothing. A record torn
+by a crash mid-append has no trailing newline; it is dropped and truncated
+away on the next load, and an append never joins a line that lacks one.
+
+Stores are shared per path and double as the in-process metadata cache.
+Each file is parsed once, and the store is reloaded only when the snapshot's
+or journal's mtime or size changes behind its back. read_store hands out
+read-only views, so readers never pay for a parse or a copy.
+"""
+import os
+import copy
+import json
+import threading
+from types import MappingProxyType
+
+COMPACT_EVERY = 500  # Journal records before the snapshot is rewritten
+FSYNC = True  # Flush appended records to disk before save returns
+
+
+class JournaledStore:
+    """A {key: value} JSON store backed by a snapshot plus an append-only journal."""
+
+    def __init__(self, path, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self.data = {}
+        self.records = 0  # Records in the journal since the last compaction
+        self.signature = None  # (mtime_ns, size) of snapshot and journal as last seen
+        self._lock = threading.RLock()
+        self.load()
+
+    @property
+    def lock(self):
+        """Held while data changes; hold it to iterate data from another thread."""
+        return self._lock
+
+    def _stat(self):
+        signature = []
+        for path in (self.path, self.journal_path):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def refresh(self, force=False):
+        """Reload if forced or if either file changed since this store last read or wrote it."""
+        with self._lock:
+            if force or self._stat() != self.signature:
+                self.load()
+
+    def load(self):
+        """Read the snapshot and replay the journal on top of it."""
+        with self._lock:
+            self.data = {}
+            self.records = 0
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as f:
+                        self.data = json.load(f)
+                except Exception as e:
+                    print(f"Error loading {self.path}: {e}")
+            if os.path.exists(self.journal_path):
+                self._replay()
+            self.signature = self._stat()
+            return self.data
+
+    def _replay(self):
+        good_bytes = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                # A record is only complete with its newline; accepting one without
+                # it would let the next append land on the same line
+                if not line.endswith(b"\n"):
+                    # Torn final record from a crash mid-append
+                    print(f"Dropping incomplete record at the end of {self.journal_path}")
+                    break
+                good_bytes += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn record that a later append sealed with a newline
+                    print(f"Skipping unreadable record in {self.journal_path}")
+                    continue
+                self._apply(record)
+                self.records += 1
+        if good_bytes != os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_bytes)
+
+    def _apply(self, record):
+        if record["op"] == "set":
+            self.data[record["key"]] = record["value"]
+        elif record["op"] == "del":
+            self.data.pop(record["key"], None)
+
+    def snapshot(self):
+        """Return a private copy of the current state that callers may mutate."""
+        with self._lock:
+            return copy.deepcopy(self.data)
+
+    def view(self):
+        """
+        Return a read-only view of the current state without copying it.
+
+        The view is shallow: nested values belong to the store and must not be modified.
+        """
+        return MappingProxyType(self.data)
+
+    def update(self, changes=None, deletes=()):
+        """
+        Set and delete keys with one journal append.
+
+        Args:
+            changes: {key: value} to set
+            deletes: Keys to remove
+        """
+        records = [{"op": "set", "key": key, "value": value} for key, value in (changes or {}).items()]
+        records += [{"op": "del", "key": key} for key in deletes]
+        if not records:
+            return
+        # Serialise first so an unserialisable value changes nothing
+        payload = "".join(json.dumps(record) + "\n" for record in records)
+
+        with self._lock:
+            if not os.path.exists(self.path):
+                # First write creates the snapshot so plain existence checks keep working
+                for record in records:
+                    self._apply(copy.deepcopy(record))
+                self.compact()
+                return
+            with open(self.journal_path, "a+b") as f:
+                # A torn tail written by another process after our load must not absorb this record
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    f.seek(size - 1)
+                    if f.read(1) != b"\n":
+                        payload = "\n" + payload
+                f.write(payload.encode("utf-8"))
+                f.flush()
+                if FSYNC:
+                    os.fsync(f.fileno())
+            for record in records:
+                self._apply(copy.deepcopy(record))
+            self.records += len(records)
+            if self.records >= self.compact_every:
+                self.compact()
+            else:
+                self.signature = self._stat()
+
+    def save(self, data):
+        """
+        Journal whatever differs between data and the stored state.
+
+        This compares every key, so it costs O(store); callers that know
+        what changed should use update() instead.
+        """
+        with self._lock:
+            changes = {key: value for key, value in data.items() if self.data.get(key, object()) != value}
+            deletes = [key for key in self.data if key not in data]
+            self.update(changes, deletes)
+
+    def compact(self):
+        """Write the current state as the new snapshot and empty the journal."""
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # Replaying the old journal over the new snapshot would be harmless,
+            # so a crash before this truncation is safe
+            open(self.journal_path, "w").close()
+            self.records = 0
+            self.signature = self._stat()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path, force_reload=False):
+    """Return the shared JournaledStore for path, revalidated against the files on disk."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = JournaledStore(path)
+            return _stores[key]
+        store = _stores[key]
+    store.refresh(force_reload)
+    return store
+
+
+def read_store(path, force_reload=False):
+    """Return a read-only view of the data stored at path, parsed at most once per change on disk."""
+    return get_store(path, force_reload).view()
+
+
+def load_store(path, force_reload=False):
+    """Return a mutable copy of the data stored at path ({} if there is none)."""
+    return get_store(path, force_reload).snapshot()
+
+
+def save_store(path, data):
+    """Persist data to path, journalling only the keys that changed."""
+    get_store(path).save(data)
+
+
+def update_store(path, changes=None, deletes=()):
+    """Set and delete specific keys of the store at path."""
+    get_store(path).update(changes, deletes)
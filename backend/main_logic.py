@@ -1,168 +1,422 @@
 import os
-import cv2
-import face_recognition
+import time
 import shutil
-import json
 from collections import defaultdict
-import numpy as np
+from backend.model_loader import registry
+from backend.journal import load_store, read_store, update_store
+from backend.face_index import get_face_index, save_face_index, face_index_lock, FACE_TOLERANCE
+from backend.face_ledger import get_face_ledger
+from backend.face_table import get_face_table
+from backend.face_clusters import new_cluster, add_faces, merge_clusters
+from backend.face_ids import fresh_face_ids, reserve_face_ids
+from backend.face_search import get_face_search, FACE_SEARCH_K
+from backend.face_pipeline import detect_faces_in_file, get_face_pool, DEFAULT_FACE_WORKERS
 
 # Metadata file path
 METADATA_PATH = "face_metadata.json"
+# Processes used for face detection and encoding; 1 runs them in this process
+FACE_WORKERS = DEFAULT_FACE_WORKERS
+# How face groups reference their images:
+#   "virtual"  - metadata points at the source images; nothing is written to output_folder
+#   "copy"     - every image is copied into output_folder/<face_id>/ (the original behaviour)
+#   "hardlink" - hard links into output_folder/<face_id>/ (falls back to a copy across filesystems)
+#   "symlink"  - symbolic links into output_folder/<face_id>/
+ALBUM_MODES = ("virtual", "copy", "hardlink", "symlink")
+ALBUM_MODE = "virtual"
+# Images ingested between partial commits of metadata, index, face table and ledger
+FACE_COMMIT_EVERY = 50
 
 def get_images_missing_from_metadata(input_folder, metadata_file=METADATA_PATH):
     """
-    Returns a list of image filenames in input_folder that are missing from metadata.
+    Returns a list of image filenames in input_folder that face detection has not examined yet.
+
+    Checked against the processed-file ledger, so images without faces are
+    not reported again and unchanged files cost one stat each. Renamed files
+    and copies are reported too; ingesting them only carries their
+    original's faces over.
     """
     # Get all image files in the input folder
     image_files = [
         f for f in os.listdir(input_folder) 
         if f.lower().endswith(('.jpg', '.jpeg', '.png'))
     ]
-    
-    if not os.path.exists(metadata_file):
-        return image_files
 
     try:
-        with open(metadata_file, "r") as f:
-            metadata = json.load(f)
-
-        # Get all image paths from metadata
-        known_images = set()
-        for face_data in metadata.values():
-            for img_path in face_data.get("images", []):
-                known_images.add(os.path.basename(img_path))
-
-        # Find images not in metadata
-        missing = [f for f in image_files if f not in known_images]
-        return missing
+        ledger = get_face_ledger(metadata_file)
+        # Libraries clustered before the ledger existed are seeded from the metadata once
+        ledger.bootstrap(input_folder, image_files, read_store(metadata_file))
+        return ledger.missing(input_folder, image_files)
         
     except Exception as e:
         print(f"Error checking missing images: {e}")
         return image_files
 
-def detect_and_cluster_faces(input_folder, output_folder="face_detected", metadata_file=METADATA_PATH, only_process=None):
+def _carry_over_faces(filepath, source, metadata, face_table, renamed):
+    """
+    Give a renamed image or a copy the faces found in its original.
+
+    A rename takes the original's place in the virtual groups that reference
+    it. A copy joins them, and its faces are added to their groups' count,
+    centroid and exemplars like any other member's. Album copies made for
+    the original stay as they are; a rename's face table row is moved by
+    the caller.
+
+    Returns:
+        tuple: (face IDs whose image lists changed, face table entry for a copy or None)
+    """
+    key, entry = face_table.lookup(source)
+    if key is None:
+        return set(), None
+    changed = set()
+    for position, face in enumerate(entry["faces"]):
+        face_id = face["cluster"]
+        if face.get("copy") or face_id not in metadata:
+            continue
+        images = metadata[face_id].setdefault("images", [])
+        if renamed:
+            images[:] = [path for path in images if face_table.key(path) != key]
+        else:
+            add_faces(metadata[face_id], entry["encodings"][position:position + 1])
+        if filepath not in images:
+            images.append(filepath)
+        changed.add(face_id)
+    if renamed:
+        return changed, None
+    faces = entry["faces"]
+    return changed, face_table.entry(
+        filepath, [face["box"] for face in faces], entry["encodings"],
+        [face["cluster"] for face in faces], [None] * len(faces),
+    )
+
+def _detect_faces(image_paths, workers=FACE_WORKERS, settings=None):
+    """Yield (image_path, boxes, encodings) in input order; boxes is None for unreadable files."""
+    if workers > 1 and len(image_paths) > 1:
+        pool = get_face_pool(workers, settings)
+        yield from pool.detect(image_paths)
+        for pid, stats in sorted(pool.report().items()):
+            print(
+                f"  face worker {pid}: {stats['images']} images, {stats['faces']} faces, "
+                f"{stats['images_per_second']:.2f} images/s"
+            )
+        return
+
+    with registry.borrow("face") as face_recognition:
+        for image_path in image_paths:
+            result = detect_faces_in_file(face_recognition, image_path, settings)
+            yield (image_path,) + (result if result is not None else (None, None))
+
+def album_path(face_dir, filename):
+    """Return a path for filename inside face_dir that does not exist yet."""
+    saved_path = os.path.join(face_dir, filename)
+    if os.path.exists(saved_path) or os.path.islink(saved_path):
+        base, ext = os.path.splitext(filename)
+        counter = 1
+        while os.path.exists(saved_path) or os.path.islink(saved_path):
+            saved_path = os.path.join(face_dir, f"{base}_{counter}{ext}")
+            counter += 1
+    return saved_path
+
+def place_in_album(source_path, output_folder, face_id, mode=ALBUM_MODE):
+    """
+    Put source_path into the album for face_id.
+
+    Returns:
+        str: The path recorded in the metadata (the source itself in virtual mode)
+    """
+    if mode not in ALBUM_MODES:
+        raise ValueError(f"Unknown album mode '{mode}' (expected one of {', '.join(ALBUM_MODES)})")
+    if mode == "virtual":
+        return source_path
+
+    face_dir = os.path.join(output_folder, face_id)
+    os.makedirs(face_dir, exist_ok=True)
+    saved_path = album_path(face_dir, os.path.basename(source_path))
+    if mode == "symlink":
+        os.symlink(os.path.abspath(source_path), saved_path)
+    elif mode == "hardlink":
+        try:
+            os.link(source_path, saved_path)
+        except OSError:
+            # Different filesystem or no hard link support
+            shutil.copy(source_path, saved_path)
+    else:
+        shutil.copy(source_path, saved_path)
+    return saved_path
+
+def is_album_file(path, output_folder, face_id):
+    """True if path is a file stored in the output_folder/<face_id>/ folder rather than a source reference."""
+    face_dir = os.path.abspath(os.path.join(output_folder, face_id))
+    return os.path.dirname(os.path.abspath(path)) == face_dir
+
+def materialize_album(face_id, output_folder="face_detected", mode="symlink", metadata_file=METADATA_PATH):
+    """
+    Create a folder view of a face group for tools that need real files.
+
+    Every image the group references is linked (or copied) into
+    output_folder/<face_id>/. The metadata keeps pointing at the sources, so
+    the folder can be deleted or rebuilt at any time.
+
+    Returns:
+        list: Paths created in the folder
+    """
+    if mode == "virtual":
+        raise ValueError("materialize_album needs a copy, hardlink or symlink mode")
+    metadata = read_store(metadata_file)
+    if face_id not in metadata:
+        return []
+
+    created = []
+    for image_path in metadata[face_id].get("images", []):
+        if is_album_file(image_path, output_folder, face_id) or not os.path.exists(image_path):
+            continue
+        try:
+            created.append(place_in_album(image_path, output_folder, face_id, mode))
+        except OSError as e:
+            print(f"Could not add {image_path} to {face_id}: {e}")
+    return created
+
+def detect_and_cluster_faces(input_folder, output_folder="face_detected", metadata_file=METADATA_PATH, only_process=None,
+                             workers=FACE_WORKERS, settings=None, album_mode=ALBUM_MODE,
+                             progress_callback=None, should_cancel=None, commit_callback=None,
+                             commit_every=FACE_COMMIT_EVERY):
     """
     Detect faces in images and cluster them by similarity.
+
+    Detection and encoding can run in a worker pool; cluster assignment stays
+    in this process and follows input order, so face IDs are deterministic.
+    Work is committed every commit_every images, so a cancelled or crashed
+    run keeps what it finished and the next run only examines the rest.
     
     Args:
         input_folder: Path to folder containing images
         output_folder: Path to save organized images
         metadata_file: Path to save face metadata
         only_process: Optional list of specific image filenames to process
+        workers: Face detection processes (1 keeps everything in this process)
+        settings: FaceDetectionSettings (detection size, hog/cnn, upsampling); defaults from face_pipeline
+        album_mode: One of ALBUM_MODES; "virtual" references the source images instead of copying them
+        progress_callback: Optional callable(done, total, filepath) called after each image is examined
+        should_cancel: Optional callable; when it returns True the run stops before the next image
+        commit_callback: Optional callable(face_id_map) called after every partial commit
+        commit_every: Images examined between partial commits
         
     Returns:
         Tuple of (face_id_map, status_message)
     """
-    if not os.path.exists(output_folder):
+    if album_mode not in ALBUM_MODES:
+        raise ValueError(f"Unknown album mode '{album_mode}' (expected one of {', '.join(ALBUM_MODES)})")
+    if album_mode != "virtual" and not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
     face_id_map = defaultdict(list)
 
-    # Load existing metadata if it exists
-    metadata = {}
-    if os.path.exists(metadata_file):
-        try:
-            with open(metadata_file, "r") as f:
-                metadata = json.load(f)
-        except Exception as e:
-            print(f"Error loading metadata: {e}")
+    # Load existing metadata (snapshot plus journal)
+    metadata = load_store(metadata_file)
+    # Face IDs whose entries changed and need journalling
+    changed_ids = set()
+    # IDs for new groups, past every ID ever used (checked against metadata as it grows)
+    fresh_ids = fresh_face_ids(metadata_file, metadata)
+    # Persistent nearest-neighbour index over the cluster encodings
+    cluster_index = get_face_index(metadata_file, metadata)
+    # Held per face, so the image viewer can match against the index between writes
+    index_lock = face_index_lock(metadata_file)
+    # Every examined image is recorded, including those without faces
+    ledger = get_face_ledger(metadata_file)
+    ledger_entries = []
+    # Boxes, encodings and clusters of every face, per source image
+    face_table = get_face_table(metadata_file)
+    table_entries = []
 
     # Process only specified files or all files
     files_to_process = only_process if only_process else [
         f for f in os.listdir(input_folder) 
         if f.lower().endswith(('.jpg', '.jpeg', '.png'))
     ]
+    ledger.bootstrap(input_folder, files_to_process, metadata)
 
-    # Track processed files to avoid duplication
-    processed_count = 0
-    
+    # Skip files we've already processed (O(1) for unchanged files)
+    pending = {}  # filepath -> (stat, content hash if the ledger computed one)
+    duplicates = {}  # Renamed files and copies: filepath -> (ledger key of the original, hash, stat)
     for filename in files_to_process:
         filepath = os.path.join(input_folder, filename)
-        if not os.path.exists(filepath):
-            continue
-            
-        # Skip files we've already processed
-        is_processed = False
-        for face_info in metadata.values():
-            if any(os.path.basename(img) == filename for img in face_info.get("images", [])):
-                is_processed = True
-                break
-                
-        if is_processed:
+        try:
+            stat = os.stat(filepath)
+            source, digest = ledger.find(filepath, stat)
+        except OSError:
             continue
+        if source is None:
+            pending[filepath] = (stat, digest)
+        elif source != ledger.key(filepath):
+            duplicates[filepath] = (source, digest, stat)
+    # Sources that were renamed; their face table rows move at the next commit
+    table_renames = {}
 
-        # Load and process the image
-        image = cv2.imread(filepath)
-        if image is None:
-            continue
+    def commit():
+        # Reserved first, so a written group's ID is never handed out again
+        reserve_face_ids(metadata_file, changed_ids)
+        # Journal only the face groups that changed
+        update_store(metadata_file, {face_id: metadata[face_id] for face_id in changed_ids})
+        if changed_ids:
+            save_face_index(metadata_file)
+        face_table.put_many(table_entries)
+        for old_path, new_path in table_renames.items():
+            face_table.rename_path(old_path, new_path)
+        # Recorded after the metadata so a crash never marks unsaved faces as done
+        ledger.record_many(ledger_entries)
+        changed_ids.clear()
+        del table_entries[:]
+        table_renames.clear()
+        del ledger_entries[:]
+        if commit_callback:
+            commit_callback({face_id: list(paths) for face_id, paths in face_id_map.items()})
 
-        # Convert to RGB for face_recognition
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        # Detect faces
-        face_locations = face_recognition.face_locations(rgb_image)
-        face_encodings = face_recognition.face_encodings(rgb_image, face_locations)
-        
+    # Track processed files to avoid duplication
+    processed_count = 0
+    examined = 0
+    cancelled = False
+    start_time = time.perf_counter()
+    
+    # Renamed files and copies take over their original's faces without detection
+    for filepath, (source, digest, stat) in duplicates.items():
+        # The first file found for a vanished original is its rename, later ones are copies
+        renamed = not os.path.exists(source) and source not in table_renames
+        changed, table_entry = _carry_over_faces(filepath, source, metadata, face_table, renamed)
+        changed_ids.update(changed)
+        if not renamed:
+            # A copy's faces moved its groups' centroids and exemplars
+            with index_lock:
+                for face_id in changed:
+                    cluster_index.set_cluster(face_id, metadata[face_id])
+        for face_id in changed:
+            if filepath not in face_id_map[face_id]:
+                face_id_map[face_id].append(filepath)
+        if renamed:
+            table_renames[source] = filepath
+        elif table_entry is not None:
+            table_entries.append(table_entry)
+        faces = ledger.store.data.get(source, {}).get("faces")
+        ledger_entries.append(ledger.entry(filepath, faces, digest=digest, stat=stat))
+
+    detections = _detect_faces(list(pending), workers, settings)
+    for filepath, face_locations, face_encodings in detections:
+        # An image yielded after cancellation stays unrecorded and is examined next run
+        if should_cancel and should_cancel():
+            cancelled = True
+            break
+        if len(ledger_entries) >= commit_every:
+            commit()
+        examined += 1
+        if progress_callback:
+            progress_callback(examined, len(pending), filepath)
+
+        # Unreadable files stay unrecorded and are retried
+        if face_locations is None:
+            continue
+        stat, digest = pending[filepath]
+        ledger_entries.append(ledger.entry(filepath, len(face_encodings), digest=digest, stat=stat))
+    
         # Skip if no faces detected
-        if not face_encodings:
+        if not len(face_encodings):
             continue
 
         processed_count += 1
-            
+        face_clusters = []
+        face_copies = []
+        
         # Process each detected face
         for encoding in face_encodings:
-            # Check if face matches any existing clusters
-            match = None
-            for face_id, data in metadata.items():
-                if "encoding" not in data:
-                    continue
-                    
-                known_encoding = np.array(data["encoding"])
-                if face_recognition.compare_faces([known_encoding], encoding, tolerance=0.5)[0]:
-                    match = face_id
-                    break
-
-            # Create new face ID if no match
-            if match is None:
-                match = f"Face_{len(metadata):03d}"
-                metadata[match] = {
-                    "images": [],
-                    "encoding": encoding.tolist()
-                }
-
-            # Create directory for face if it doesn't exist
-            face_dir = os.path.join(output_folder, match)
-            os.makedirs(face_dir, exist_ok=True)
-            
-            # Copy image to face directory
-            saved_path = os.path.join(face_dir, filename)
-            
-            # Handle filename conflicts
-            if os.path.exists(saved_path):
-                base, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(saved_path):
-                    saved_path = os.path.join(face_dir, f"{base}_{counter}{ext}")
-                    counter += 1
-                    
-            shutil.copy(filepath, saved_path)
-            
+            with index_lock:
+                # Nearest existing cluster within tolerance
+                match = cluster_index.match(encoding, FACE_TOLERANCE)
+
+                # Create new face ID if no match
+                if match is None:
+                    match = next(fresh_ids)
+                    metadata[match] = new_cluster([encoding])
+                else:
+                    # Running centroid and exemplars follow every face the group gains
+                    add_faces(metadata[match], [encoding])
+                cluster_index.set_cluster(match, metadata[match])
+            changed_ids.add(match)
+
+            # Two faces of one photo in the same group share its album entry
+            if album_mode == "virtual" or match not in face_clusters:
+                saved_path = place_in_album(filepath, output_folder, match, album_mode)
+            else:
+                saved_path = face_copies[face_clusters.index(match)]
+        
             # Update tracking data
-            face_id_map[match].append(saved_path)
-            
+            if saved_path not in face_id_map[match]:
+                face_id_map[match].append(saved_path)
+            face_clusters.append(match)
+            # Virtual entries are the source itself, so there is no copy to track
+            face_copies.append(None if album_mode == "virtual" else saved_path)
+        
             # Update metadata
             if saved_path not in metadata[match]["images"]:
                 metadata[match]["images"].append(saved_path)
+                changed_ids.add(match)
+
+        table_entries.append(face_table.entry(filepath, face_locations, face_encodings, face_clusters, face_copies))
+
+    # Closing the generator stops the worker pool from starting chunks nobody will read
+    detections.close()
+    if examined:
+        elapsed = time.perf_counter() - start_time
+        print(f"Face detection: {examined} images in {elapsed:.1f}s ({examined / elapsed:.2f} images/s)")
 
-    # Save updated metadata
-    with open(metadata_file, "w") as f:
-        json.dump(metadata, f, indent=4)
+    commit()
 
-    return face_id_map, f"Processed {processed_count} images. Found {len(face_id_map)} distinct faces."
+    message = f"Processed {processed_count} images. Found {len(face_id_map)} distinct faces."
+    if cancelled:
+        message = f"Cancelled after {examined} of {len(pending)} images. " + message
+    return face_id_map, message
 
-def load_face_metadata(metadata_file=METADATA_PATH):
+def refresh_face_index(face_ids, metadata, metadata_file=METADATA_PATH):
+    """Re-index the given face groups after their centroids or exemplars changed, and drop deleted ones."""
+    with face_index_lock(metadata_file):
+        face_index = get_face_index(metadata_file, metadata)
+        for face_id in face_ids:
+            if face_id in metadata:
+                face_index.set_cluster(face_id, metadata[face_id])
+        save_face_index(metadata_file)
+
+def search_faces_by_example(image_path, k=FACE_SEARCH_K, tolerance=FACE_TOLERANCE, metadata_file=METADATA_PATH,
+                            settings=None):
+    """
+    Find the library photos that contain the people in image_path.
+
+    Only the query image goes through detection; its faces are looked up in
+    the per-face search index built from the face table.
+
+    Args:
+        image_path: Photo to take the query faces from
+        k: Most images returned per query face
+        tolerance: Matches farther than this are left out
+        
+    Returns:
+        list: One (box, [(source_path, distance, face_id), ...]) per face in the query image, nearest first
+    """
+    with registry.borrow("face") as face_recognition:
+        result = detect_faces_in_file(face_recognition, image_path, settings)
+    if result is None:
+        raise ValueError(f"Unable to read {image_path}")
+    boxes, encodings = result
+    if not len(encodings):
+        return []
+
+    matches = get_face_search(metadata_file).search(encodings, k)
+    return [
+        (box, [match for match in hits if match[1] <= tolerance])
+        for box, hits in zip(boxes, matches)
+    ]
+
+def load_face_metadata(metadata_file=METADATA_PATH, force_reload=False):
     """
     Load face metadata from file.
+
+    The parsed file is cached in-process and only re-read when it changes on
+    disk or force_reload is set.
     
     Returns:
         Tuple of (face_id_map, status_message)
@@ -171,8 +425,7 @@ def load_face_metadata(metadata_file=METADATA_PATH):
         return {}, "Metadata file not found."
 
     try:
-        with open(metadata_file, "r") as f:
-            metadata = json.load(f)
+        metadata = read_store(metadata_file, force_reload)
 
         face_id_map = {}
         for face_id, info in metadata.items():
@@ -190,6 +443,9 @@ def load_face_metadata(metadata_file=METADATA_PATH):
 def rename_face_id(base_path, old_face_id, new_face_name, metadata_file=METADATA_PATH):
     """
     Renames a face group. If the new name exists, merge images.
+
+    Virtual groups are renamed in the metadata alone. Files only move when
+    the group has a folder under base_path (copied, linked or materialized).
     
     Returns:
         bool: Success or failure
@@ -197,32 +453,33 @@ def rename_face_id(base_path, old_face_id, new_face_name, metadata_file=METADATA
     old_folder = os.path.join(base_path, old_face_id)
     new_folder = os.path.join(base_path, new_face_name)
 
-    if not os.path.exists(old_folder):
-        print(f"Source folder {old_folder} does not exist.")
-        return False
-
     try:
         # Load metadata
         if not os.path.exists(metadata_file):
             return False
             
-        with open(metadata_file, "r") as f:
-            metadata = json.load(f)
+        metadata = load_store(metadata_file)
 
         if new_face_name == old_face_id:
             return False  # Nothing to do
 
-        # Create target directory
-        os.makedirs(new_folder, exist_ok=True)
-        
-        # Track existing files to avoid conflicts
-        existing_files = set(os.listdir(new_folder)) if os.path.exists(new_folder) else set()
+        if old_face_id not in metadata and not os.path.exists(old_folder):
+            print(f"Face group {old_face_id} does not exist.")
+            return False
         
         # Track new paths for metadata update
         old_to_new_paths = {}
+        album_files = os.listdir(old_folder) if os.path.exists(old_folder) else []
+        
+        # Create target directory only when there are files to move into it
+        if album_files:
+            os.makedirs(new_folder, exist_ok=True)
+        
+        # Track existing files to avoid conflicts
+        existing_files = set(os.listdir(new_folder)) if os.path.exists(new_folder) else set()
         
         # Move files from old to new directory
-        for i, file_name in enumerate(os.listdir(old_folder)):
+        for i, file_name in enumerate(album_files):
             src_file = os.path.join(old_folder, file_name)
             
             # Generate new filename to avoid conflicts
@@ -261,31 +518,28 @@ def rename_face_id(base_path, old_face_id, new_face_name, metadata_file=METADATA
             
             # If merging with existing entry
             if new_face_name in metadata:
-                # Average the encodings for better recognition
-                if "encoding" in old_entry and "encoding" in metadata[new_face_name]:
-                    old_encoding = np.array(old_entry["encoding"])
-                    new_encoding = np.array(metadata[new_face_name]["encoding"])
-                    avg_encoding = ((old_encoding + new_encoding) / 2).tolist()
-                    metadata[new_face_name]["encoding"] = avg_encoding
+                # Centroids weighted by face count; exemplars re-picked from both groups
+                merge_clusters(metadata[new_face_name], old_entry)
                     
                 # Merge images lists
                 metadata[new_face_name]["images"].extend(updated_paths)
                 
                 # Remove duplicates
-                metadata[new_face_name]["images"] = list(set(metadata[new_face_name]["images"]))
+                metadata[new_face_name]["images"] = list(dict.fromkeys(metadata[new_face_name]["images"]))
             else:
                 # Create new entry with updated paths
-                metadata[new_face_name] = {
-                    "encoding": old_entry.get("encoding"),
-                    "images": updated_paths
-                }
+                metadata[new_face_name] = dict(old_entry, images=updated_paths)
                 
             # Remove old entry
             metadata.pop(old_face_id)
             
-            # Save updated metadata
-            with open(metadata_file, "w") as f:
-                json.dump(metadata, f, indent=4)
+            # Journal the merged entry and the removal of the old one; the old ID is retired
+            reserve_face_ids(metadata_file, (old_face_id, new_face_name))
+            update_store(metadata_file, {new_face_name: metadata[new_face_name]}, deletes=[old_face_id])
+
+            # Keep the face index in line: drop the old ID, pick up the merged centroid and exemplars
+            refresh_face_index([new_face_name], metadata, metadata_file)
+            get_face_table(metadata_file).rename_cluster(old_face_id, new_face_name, old_to_new_paths)
                 
             return True
         
@@ -1,27 +1,112 @@
-import torch
-from ultralytics import YOLO
-from transformers import DetrForObjectDetection, DetrImageProcessor
+from backend.model_registry import ModelRegistry
 
 device = "cpu"  # Force CPU usage
+DETECTION_BACKEND = "torch"  # "torch" (reference), "onnx" or "onnx-int8"
+
+MODEL_IDLE_TIMEOUT = 600  # Seconds before an unused model is unloaded
+CHEAP_YOLO_WEIGHTS = "yolov8n.pt"  # First tier of cascade detection
+AYA_VISION_MODEL_ID = "CohereForAI/aya-vision-8b"
+YOLO_WEIGHTS = ("yolov8x.pt", "yolov8x-oiv7.pt")  # YOLOv8x and YOLOv8x trained on Open Images
+DETR_MODEL_ID = "facebook/detr-resnet-50"
 
 def load_yolo_models():
     """Load YOLO models from Ultralytics hub"""
     try:
+        from ultralytics import YOLO
+
         # Load models directly from hub
-        yolo8 = YOLO('yolov8x.pt')  # Load YOLOv8x
-        yolo_oi = YOLO('yolov8x-oiv7.pt')  # Load YOLOv8x trained on Open Images
-        
-        return [yolo8, yolo_oi]
+        return [YOLO(weights) for weights in YOLO_WEIGHTS]
     except Exception as e:
         raise RuntimeError(f"Failed to load YOLO models: {e}")
 
+def load_cheap_yolo_model():
+    """Load the small YOLO model used as the first tier of cascade detection"""
+    try:
+        from ultralytics import YOLO
+        return YOLO(CHEAP_YOLO_WEIGHTS)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load cheap YOLO model: {e}")
+
 def load_detr_model():
     """Load DETR model from Hugging Face hub"""
     try:
+        from transformers import DetrForObjectDetection, DetrImageProcessor
+
         # Load the DETR model and processor
-        model = DetrForObjectDetection.from_pretrained("facebook/detr-resnet-50", ignore_mismatched_sizes=True).to(device)
-        processor = DetrImageProcessor.from_pretrained("facebook/detr-resnet-50")
+        model = DetrForObjectDetection.from_pretrained(DETR_MODEL_ID, ignore_mismatched_sizes=True).to(device)
+        processor = DetrImageProcessor.from_pretrained(DETR_MODEL_ID)
         model.eval()
         return model, processor
     except Exception as e:
-        raise RuntimeError(f"Failed to load DETR model: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Failed to load DETR model: {e}")
+
+def load_onnx_yolo_models(quantize=False):
+    """Load the YOLO models through ONNX Runtime; PyTorch weights are only loaded to export"""
+    from backend.onnx_backend import export_yolo
+
+    def load_torch(weights):
+        from ultralytics import YOLO
+        return lambda: YOLO(weights)
+
+    try:
+        return [export_yolo(weights, load_torch(weights), quantize) for weights in YOLO_WEIGHTS]
+    except Exception as e:
+        raise RuntimeError(f"Failed to load ONNX YOLO models: {e}")
+
+def load_onnx_detr_model(quantize=False):
+    """Load DETR through ONNX Runtime; PyTorch weights are only loaded to export"""
+    from backend.onnx_backend import export_detr
+    try:
+        from transformers import DetrConfig, DetrImageProcessor
+
+        # Config and processor are small JSON files; the weights stay on disk
+        config = DetrConfig.from_pretrained(DETR_MODEL_ID)
+        processor = DetrImageProcessor.from_pretrained(DETR_MODEL_ID)
+        return export_detr(lambda: load_detr_model()[0], config, processor, quantize=quantize)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load ONNX DETR model: {e}")
+
+def detection_model_names(backend=DETECTION_BACKEND):
+    """Registry names of the (YOLO, DETR) entries for an inference backend."""
+    if backend == "torch":
+        return "yolo", "detr"
+    return f"yolo-{backend}", f"detr-{backend}"
+
+def load_aya_vision_model():
+    """Load the Aya Vision processor and model from Hugging Face hub"""
+    try:
+        from transformers import AutoProcessor, AutoModelForImageTextToText
+
+        processor = AutoProcessor.from_pretrained(AYA_VISION_MODEL_ID)
+        model = AutoModelForImageTextToText.from_pretrained(AYA_VISION_MODEL_ID).to(device)
+        model.eval()
+        return model, processor
+    except Exception as e:
+        raise RuntimeError(f"Failed to load Aya Vision model: {e}")
+
+def load_face_models():
+    """Load the dlib face detector and encoder used by face_recognition"""
+    try:
+        # face_recognition loads its dlib weights when the module is imported,
+        # so the registry entry is the module itself. Unloading drops our
+        # reference but the weights stay cached in sys.modules.
+        import face_recognition
+        return face_recognition
+    except Exception as e:
+        raise RuntimeError(f"Failed to load face recognition models: {e}")
+
+# Shared, lazily loaded model instances for the whole process
+registry = ModelRegistry(idle_timeout=MODEL_IDLE_TIMEOUT)
+registry.register("yolo", load_yolo_models)
+registry.register("detr", load_detr_model)
+registry.register("yolo-cheap", load_cheap_yolo_model)
+registry.register("yolo-onnx", load_onnx_yolo_models)
+registry.register("detr-onnx", load_onnx_detr_model)
+registry.register("yolo-onnx-int8", lambda: load_onnx_yolo_models(quantize=True))
+registry.register("detr-onnx-int8", lambda: load_onnx_detr_model(quantize=True))
+registry.register("aya_vision", load_aya_vision_model)
+registry.register("face", load_face_models)
+
+def get_model(name):
+    """Return the shared instance of a registered model, loading it on first use."""
+    return registry.get(name)
@@ -0,0 +1,140 @@
+# backend/model_registry.py
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_IDLE_TIMEOUT = 600  # Seconds a model may sit unused before it is unloaded
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models.
+
+    Each model is registered under a name together with a loader function.
+    The first get() calls the loader and every later caller receives the same
+    instance. Models that nobody has used for idle_timeout seconds are dropped
+    by a background reaper so their memory can be reclaimed.
+
+    Loads take a lock per name, so a slow load only blocks callers waiting
+    for that same model; the registry lock guards the dictionaries alone.
+    """
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._loaders = {}
+        self._entries = {}
+        self._load_seconds = {}
+        self._load_counts = {}
+        self._lock = threading.RLock()
+        self._load_locks = {}  # name -> Lock held while that model loads
+        self._reaper = None
+
+    def register(self, name, loader):
+        """Register a zero-argument loader under name."""
+        with self._lock:
+            self._loaders[name] = loader
+
+    def _touch(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry["last_used"] = time.monotonic()
+            return entry
+
+    def get(self, name):
+        """Return the shared instance for name, loading it on first use."""
+        entry = self._touch(name)
+        if entry is not None:
+            return entry["model"]
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"No model registered under '{name}'")
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+            loader = self._loaders[name]
+
+        with load_lock:
+            # Another caller may have finished loading while this one waited
+            entry = self._touch(name)
+            if entry is not None:
+                return entry["model"]
+            start = time.perf_counter()
+            model = loader()
+            with self._lock:
+                self._load_seconds[name] = time.perf_counter() - start
+                self._load_counts[name] = self._load_counts.get(name, 0) + 1
+                entry = {"model": model, "last_used": time.monotonic(), "in_use": 0}
+                self._entries[name] = entry
+                self._start_reaper()
+            return model
+
+    @contextmanager
+    def borrow(self, name):
+        """Context manager that keeps name loaded while the block runs."""
+        while True:
+            model = self.get(name)
+            with self._lock:
+                entry = self._entries.get(name)
+                # The reaper may have unloaded it since get(); load again if so
+                if entry is not None:
+                    entry["in_use"] += 1
+                    model = entry["model"]
+                    break
+        try:
+            yield model
+        finally:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    entry["in_use"] -= 1
+                    entry["last_used"] = time.monotonic()
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def unload(self, name):
+        """Drop the registry's reference to name. Returns True if it was loaded."""
+        with self._lock:
+            return self._entries.pop(name, None) is not None
+
+    def unload_idle(self):
+        """Unload every model idle for longer than idle_timeout. Returns their names."""
+        if not self.idle_timeout:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                name for name, entry in self._entries.items()
+                if not entry["in_use"] and now - entry["last_used"] > self.idle_timeout
+            ]
+            for name in idle:
+                self._entries.pop(name)
+        return idle
+
+    def stats(self):
+        """Return {name: {"loaded", "loads", "load_seconds"}} for every registered model."""
+        with self._lock:
+            return {
+                name: {
+                    "loaded": name in self._entries,
+                    "loads": self._load_counts.get(name, 0),
+                    "load_seconds": self._load_seconds.get(name),
+                }
+                for name in self._loaders
+            }
+
+    def _start_reaper(self):
+        if not self.idle_timeout or (self._reaper and self._reaper.is_alive()):
+            return
+        self._reaper = threading.Thread(target=self._reap, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(max(1.0, self.idle_timeout / 4))
+            for name in self.unload_idle():
+                print(f"Unloaded idle model: {name}")
+            with self._lock:
+                if not self._entries:
+                    self._reaper = None
+                    return
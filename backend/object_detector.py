@@ -0,0 +1,187 @@
+import torch
+from backend.frame_decoder import as_bgr
+from backend.index_manager import pack_detections
+
+YOLO_CONFIDENCE = 0.7  # Confidence the cascade treats as certain for YOLO
+DETR_CONFIDENCE = 0.7  # Default query-time threshold for DETR results
+DETECTION_FLOOR = 0.25  # Detections below this score are not stored at all
+DEFAULT_QUERY_THRESHOLD = 0.7  # Threshold the search applies unless the user changes it
+
+# Identifies the models and post-processing behind a result; bump the
+# version whenever a change would alter what detect_batch returns
+MODEL_SET = "yolov8x+yolov8x-oiv7+detr-resnet-50"
+RESULT_VERSION = 3
+
+TIER_CHEAP = "cheap"  # Result came from the small YOLO model alone
+TIER_FULL = "full"  # Result came from yolov8x, yolov8x-oiv7 and DETR
+
+
+def model_set_key(max_decode_side=None, backend="torch", cascade=None):
+    """Key under which results from this detector configuration are cached."""
+    mode = cascade.key() if cascade else "full"
+    return f"{MODEL_SET}@v{RESULT_VERSION}/{backend}/{mode}/max{max_decode_side or 'full'}"
+
+
+class CascadePolicy:
+    """
+    Rules for escalating an image from the cheap YOLO pass to the full model set.
+
+    An image is escalated when the cheap pass finds nothing confident
+    (escalate_on_empty), when it returns more than max_uncertain detections
+    scoring between uncertain_floor and the YOLO confidence threshold, or
+    always when Open Images coverage is requested.
+    """
+
+    def __init__(self, escalate_on_empty=True, uncertain_floor=0.3, max_uncertain=0, open_images=False):
+        self.escalate_on_empty = escalate_on_empty
+        self.uncertain_floor = uncertain_floor
+        self.max_uncertain = max_uncertain
+        self.open_images = open_images
+
+    def key(self):
+        return (
+            f"cascade-e{int(self.escalate_on_empty)}-f{self.uncertain_floor}"
+            f"-u{self.max_uncertain}-oi{int(self.open_images)}"
+        )
+
+    def should_escalate(self, scores):
+        """Decide from the cheap pass's scores (all above uncertain_floor) whether to run the full set."""
+        if self.open_images:
+            return True
+        confident = sum(1 for score in scores if score >= YOLO_CONFIDENCE)
+        if self.escalate_on_empty and not confident:
+            return True
+        return len(scores) - confident > self.max_uncertain
+
+
+class ObjectDetector:
+    """
+    Runs the YOLO models and DETR over mini-batches of decoded frames.
+
+    With a cheap_model and a CascadePolicy the detector works in cascade
+    mode: the cheap model runs on every frame and only frames the policy
+    escalates go through the full model set.
+    """
+
+    def __init__(self, yolo_models, detr_model, detr_processor, cheap_model=None, cascade=None):
+        self.yolo_models = yolo_models
+        self.detr_model = detr_model
+        self.detr_processor = detr_processor
+        self.cheap_model = cheap_model
+        self.cascade = cascade if cheap_model is not None else None
+
+    def detect_batch(self, frames, names=None):
+        """
+        Detect objects in a batch of frames with one forward pass per model.
+
+        Args:
+            frames: List of RGB uint8 arrays from frame_decoder; None entries are skipped
+            names: Optional labels for error messages (usually the filenames)
+
+        Returns:
+            list: One index entry per input frame, in order:
+            {"objects": {label: best score}, "tier": str, "detections": packed boxes and scores}.
+            Everything above DETECTION_FLOOR is kept; thresholds are applied at query time.
+        """
+        names = names or [f"image {i}" for i in range(len(frames))]
+        results = [{"objects": {}, "tier": TIER_FULL, "detections": []} for _ in frames]
+        positions = [i for i, frame in enumerate(frames) if frame is not None]
+
+        if positions and self.cascade:
+            positions = self._run_cheap(frames, positions, names, results)
+
+        if positions:
+            valid = [frames[i] for i in positions]
+            for model in self.yolo_models:
+                self._collect(self._predict_yolo(model, valid, positions, names), positions, results)
+            self._collect(self._predict_detr(valid, positions, names), positions, results)
+
+        for result in results:
+            result["detections"] = pack_detections(result["detections"])
+        return results
+
+    def _run_cheap(self, frames, positions, names, results):
+        """Run the cheap pass, settle the frames it is sure about and return the rest."""
+        valid = [frames[i] for i in positions]
+        floor = min(DETECTION_FLOOR, self.cascade.uncertain_floor)
+        predictions = self._predict_yolo(self.cheap_model, valid, positions, names, floor)
+
+        escalate = []
+        for pos, predicted in zip(positions, predictions):
+            scores = [score for _, score, _ in predicted or [] if score >= self.cascade.uncertain_floor]
+            if predicted is None or self.cascade.should_escalate(scores):
+                escalate.append(pos)
+                continue
+            results[pos]["tier"] = TIER_CHEAP
+            self._collect([predicted], [pos], results)
+        return escalate
+
+    def _collect(self, predictions, positions, results):
+        """Store per-frame predictions above the floor, tracking the best score per label."""
+        for pos, predicted in zip(positions, predictions):
+            objects = results[pos]["objects"]
+            for label, score, box in predicted or []:
+                if score >= DETECTION_FLOOR:
+                    objects[label] = max(objects.get(label, 0), round(score, 4))
+                    results[pos]["detections"].append((label, score, box))
+
+    def _predict_yolo(self, model, frames, positions, names, floor=DETECTION_FLOOR):
+        """Return one [(label, score, xyxy box), ...] list per frame, or None where inference failed."""
+        # Ultralytics expects BGR arrays; the reversed view shares the decoded pixels
+        sources = [as_bgr(frame) for frame in frames]
+        try:
+            # A list source makes Ultralytics run the whole batch in one call
+            results = model(sources, conf=floor)
+        except Exception as e:
+            # One bad frame fails the whole batch, so retry image by image
+            print(f"YOLO batch error, retrying per image: {e}")
+            results = []
+            for pos, source in zip(positions, sources):
+                try:
+                    results.append(model(source, conf=floor)[0])
+                except Exception as e:
+                    print(f"YOLO error on {names[pos]}: {e}")
+                    results.append(None)
+
+        predictions = []
+        for result in results:
+            if result is None:
+                predictions.append(None)
+                continue
+            # xyxyn boxes are normalised to the frame, so they survive any decode scaling
+            predictions.append([
+                (result.names[int(cls_idx)], float(conf), tuple(box))
+                for cls_idx, conf, box in zip(
+                    result.boxes.cls.tolist(), result.boxes.conf.tolist(), result.boxes.xyxyn.tolist()
+                )
+            ])
+        return predictions
+
+    def _predict_detr(self, frames, positions, names):
+        """Return one [(label, score, xyxy box), ...] list per frame, or None entries on failure."""
+        try:
+            # The processor reads the shared RGB arrays, pads the batch and builds the pixel_mask
+            encoding = self.detr_processor(images=frames, return_tensors="pt").to("cpu")
+            with torch.no_grad():
+                outputs = self.detr_model(**encoding)
+        except Exception as e:
+            print(f"DETR error on {', '.join(names[pos] for pos in positions)}: {e}")
+            return [None] * len(frames)
+
+        # Drop the trailing "no object" class before taking the best label per query
+        scores, labels = outputs.logits.softmax(-1)[..., :-1].max(-1)
+        # DETR predicts normalised (cx, cy, w, h); convert to normalised corners
+        cx, cy, w, h = outputs.pred_boxes.unbind(-1)
+        boxes = torch.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dim=-1)
+        id2label = self.detr_model.config.id2label
+
+        predictions = []
+        for image_scores, image_labels, image_boxes in zip(scores, labels, boxes):
+            keep = image_scores >= DETECTION_FLOOR
+            predictions.append([
+                (id2label[label], score, tuple(box))
+                for score, label, box in zip(
+                    image_scores[keep].tolist(), image_labels[keep].tolist(), image_boxes[keep].tolist()
+                )
+            ])
+        return predictions
@@ -1,11 +1,18 @@
 import pytesseract
 from pytesseract import image_to_string
-from transformers import AutoProcessor, AutoModelForImageTextToText
 from PIL import Image
+from backend.model_loader import registry
+from backend.ocr_pipeline import get_ocr_pool, DEFAULT_OCR_WORKERS
 
 # Set the path to the installed Tesseract executable
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
+AYA_PROMPT = "Extract all of the text in this image. Reply with the text only."
+AYA_MAX_NEW_TOKENS = 512
+AYA_BATCH_SIZE = 4
+# Tesseract workers used by stream_text_tesseract
+OCR_WORKERS = DEFAULT_OCR_WORKERS
+
 def extract_text_tesseract(image_path):
     """Extract text from an image using Tesseract OCR."""
     try:
@@ -15,18 +22,100 @@ def extract_text_tesseract(image_path):
     except Exception as e:
         return f"[Tesseract Error] {e}"
 
-def extract_text_aya_vision(image_path):
-    """Extract text from an image using the Aya Vision transformer model."""
-    try:
-        model_id = "CohereForAI/aya-vision-8b"
-        processor = AutoProcessor.from_pretrained(model_id)
-        model = AutoModelForImageTextToText.from_pretrained(model_id)
+def stream_text_tesseract(image_paths, workers=OCR_WORKERS):
+    """
+    Extract text from many images on the shared Tesseract pool.
 
-        image = Image.open(image_path)
-        inputs = processor(images=image, return_tensors="pt")
-        outputs = model.generate(**inputs)
-        text = processor.decode(outputs[0], skip_special_tokens=True)
+    Yields:
+        tuple: (image_path, text) as each image finishes, not in input order
+    """
+    return get_ocr_pool(workers).extract(image_paths)
 
-        return text
-    except Exception as e:
-        return f"[Aya Vision Error] {e}"
\ No newline at end of file
+class AyaVisionEngine:
+    """Aya Vision OCR engine that loads the model once and generates in padded batches."""
+
+    def __init__(self, max_new_tokens=AYA_MAX_NEW_TOKENS, batch_size=AYA_BATCH_SIZE,
+                 num_threads=None, prompt=AYA_PROMPT):
+        self.max_new_tokens = max_new_tokens
+        self.batch_size = max(1, int(batch_size))
+        self.num_threads = num_threads
+        self.prompt = prompt
+
+    def _load(self):
+        """Fetch the shared model lazily; the registry only loads it on first use."""
+        import torch
+
+        if self.num_threads:
+            # torch's intra-op pool is process-wide, so this affects every model
+            torch.set_num_threads(int(self.num_threads))
+        model, processor = registry.get("aya_vision")
+        # Decoder-only generation needs left padding so every prompt ends at the same position
+        processor.tokenizer.padding_side = "left"
+        return model, processor
+
+    def extract_text(self, images):
+        """
+        Extract text from several images.
+
+        Args:
+            images: List of image paths or PIL images
+
+        Returns:
+            list: One string per input image, in the same order
+        """
+        if not images:
+            return []
+        try:
+            model, processor = self._load()
+        except Exception as e:
+            return [f"[Aya Vision Error] {e}"] * len(images)
+
+        texts = []
+        for start in range(0, len(images), self.batch_size):
+            batch = images[start:start + self.batch_size]
+            try:
+                texts.extend(self._generate(model, processor, batch))
+            except Exception as e:
+                print(f"Aya Vision batch error, retrying per image: {e}")
+                for image in batch:
+                    try:
+                        texts.extend(self._generate(model, processor, [image]))
+                    except Exception as e:
+                        texts.append(f"[Aya Vision Error] {e}")
+        return texts
+
+    def _generate(self, model, processor, batch):
+        import torch
+
+        pil_images = [
+            Image.open(image).convert("RGB") if isinstance(image, str) else image
+            for image in batch
+        ]
+        messages = [{"role": "user", "content": [{"type": "image"}, {"type": "text", "text": self.prompt}]}]
+        prompt = processor.apply_chat_template(messages, add_generation_prompt=True, tokenize=False)
+
+        inputs = processor(
+            text=[prompt] * len(pil_images),
+            images=pil_images,
+            padding=True,
+            return_tensors="pt",
+        ).to(model.device)
+        with torch.no_grad():
+            outputs = model.generate(**inputs, max_new_tokens=self.max_new_tokens, do_sample=False)
+
+        # Strip the prompt tokens so only the generated text is decoded
+        generated = outputs[:, inputs["input_ids"].shape[1]:]
+        return [text.strip() for text in processor.batch_decode(generated, skip_special_tokens=True)]
+
+_aya_engine = None
+
+def get_aya_engine():
+    """Return the shared AyaVisionEngine, creating it on first use."""
+    global _aya_engine
+    if _aya_engine is None:
+        _aya_engine = AyaVisionEngine()
+    return _aya_engine
+
+def extract_text_aya_vision(image_path):
+    """Extract text from an image using the Aya Vision transformer model."""
+    return get_aya_engine().extract_text([image_path])[0]
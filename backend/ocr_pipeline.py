@@ -0,0 +1,182 @@
+# backend/ocr_pipeline.py
+"""
+Tesseract OCR spread over a pool of workers.
+
+pytesseract.image_to_string writes a temporary PNG and starts a new
+tesseract process for every image, and each process loads the language
+data again. TesseractPool avoids both, with one of two engines:
+
+    "tesserocr": each worker thread keeps one tesserocr.PyTessBaseAPI loaded
+                 and recognises images in-process (tesserocr releases the GIL
+                 while it works)
+    "cli":       each task hands tesseract a list file of up to chunk_size
+                 images, so one process and one language-data load cover the
+                 whole chunk; its text comes back as pages separated by form feeds
+
+Workers are threads in both cases since the work happens inside tesseract.
+Every tesseract is held to one OpenMP thread so the pool does not
+oversubscribe the CPU. Results are yielded as tasks finish, not in input order.
+"""
+import os
+import atexit
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_OCR_WORKERS = max(1, CPU_COUNT - 1)
+OCR_CHUNK_SIZE = 8  # Images per task; in cli mode one tesseract process reads the whole chunk
+OCR_LANG = "eng"
+OCR_ENGINE = "auto"  # "tesserocr", "cli" or "auto" (tesserocr if it is installed, else cli)
+PAGE_SEPARATOR = "\f"  # Tesseract ends the text of every page with a form feed
+
+
+def tesserocr_available():
+    try:
+        import tesserocr  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _error_text(error):
+    # Same shape as extract_text_tesseract's errors, so callers store either alike
+    return f"[Tesseract Error] {error}"
+
+
+class TesseractPool:
+    """
+    Tesseract OCR over worker threads that keep their engine warm.
+
+    extract(image_paths) yields (image_path, text) as results come in.
+    Unreadable images yield an "[Tesseract Error] ..." text instead of
+    failing the rest of their chunk.
+    """
+
+    def __init__(self, workers=DEFAULT_OCR_WORKERS, chunk_size=OCR_CHUNK_SIZE, lang=OCR_LANG,
+                 engine=OCR_ENGINE, tesseract_cmd=None):
+        if engine == "auto":
+            engine = "tesserocr" if tesserocr_available() else "cli"
+        if engine not in ("tesserocr", "cli"):
+            raise ValueError(f"Unknown OCR engine '{engine}' (expected tesserocr, cli or auto)")
+        self.workers = max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self.lang = lang
+        self.engine = engine
+        # None uses the executable configured for pytesseract (see ocr_logic)
+        self.tesseract_cmd = tesseract_cmd
+        self._executor = None
+        self._local = threading.local()  # Per-thread tesserocr API
+        self._apis = []  # Every API created, so shutdown can release them
+        self._apis_lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+        return self._executor
+
+    def _command(self):
+        if self.tesseract_cmd:
+            return self.tesseract_cmd
+        import pytesseract
+        return pytesseract.pytesseract.tesseract_cmd
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            import tesserocr
+            api = tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._local.api = api
+            with self._apis_lock:
+                self._apis.append(api)
+        return api
+
+    def _read_tesserocr(self, image_paths):
+        api = self._api()
+        records = []
+        for image_path in image_paths:
+            try:
+                api.SetImageFile(image_path)
+                records.append((image_path, api.GetUTF8Text()))
+            except Exception as e:
+                records.append((image_path, _error_text(e)))
+        return records
+
+    def _run_tesseract(self, source):
+        env = dict(os.environ, OMP_THREAD_LIMIT="1")
+        result = subprocess.run(
+            [self._command(), source, "stdout", "-l", self.lang],
+            capture_output=True, env=env,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or f"exit code {result.returncode}")
+        return result.stdout.decode("utf-8", "replace")
+
+    def _read_cli(self, image_paths):
+        if len(image_paths) > 1:
+            fd, list_file = tempfile.mkstemp(suffix=".txt", prefix="ocr_")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write("\n".join(image_paths) + "\n")
+                pages = self._run_tesseract(list_file).split(PAGE_SEPARATOR)
+                # A trailing separator leaves one empty piece after the last page
+                if len(pages) == len(image_paths) + 1 and not pages[-1].strip():
+                    return list(zip(image_paths, pages))
+                print(f"OCR chunk returned {len(pages) - 1} pages for {len(image_paths)} images, retrying per image")
+            except Exception as e:
+                print(f"OCR chunk of {len(image_paths)} images failed, retrying per image: {e}")
+            finally:
+                os.remove(list_file)
+
+        # One image per process, so a bad file only costs its own result
+        records = []
+        for image_path in image_paths:
+            try:
+                records.append((image_path, self._run_tesseract(image_path).split(PAGE_SEPARATOR)[0]))
+            except Exception as e:
+                records.append((image_path, _error_text(e)))
+        return records
+
+    def extract(self, image_paths):
+        """Yield (image_path, text) for every path, in completion order."""
+        image_paths = list(image_paths)
+        read = self._read_tesserocr if self.engine == "tesserocr" else self._read_cli
+        chunks = [image_paths[i:i + self.chunk_size] for i in range(0, len(image_paths), self.chunk_size)]
+        futures = [self._pool().submit(read, chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # Runs when the caller stops early; queued chunks are dropped
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        with self._apis_lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+        self._local = threading.local()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_ocr_pool(workers=DEFAULT_OCR_WORKERS, chunk_size=OCR_CHUNK_SIZE, lang=OCR_LANG, engine=OCR_ENGINE):
+    """Return a shared pool so warm engines survive between runs."""
+    key = (max(1, int(workers)), max(1, int(chunk_size)), lang, engine)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = TesseractPool(*key)
+        return _pools[key]
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
@@ -0,0 +1,78 @@
+import os
+from PyQt6.QtCore import QThread, pyqtSignal
+from PIL import Image
+from backend.ocr_logic import stream_text_tesseract, get_aya_engine, OCR_WORKERS
+
+THUMB_SIZE = (220, 160)
+
+
+class OCRThread(QThread):
+    """
+    Runs OCR over a list of images off the GUI thread.
+
+    Tesseract results stream back per image from the worker pool; Aya
+    Vision results arrive one generation batch at a time. Thumbnails are
+    written here as well so the GUI only has to show the text.
+    Call requestInterruption() to stop early; results holds every text
+    extracted, for callers that stop it without an event loop to deliver
+    the signals.
+    """
+    text_ready = pyqtSignal(str, str)  # image path, extracted text
+    progress_update = pyqtSignal(int, int)
+    ocr_complete = pyqtSignal()
+
+    def __init__(self, image_paths, model="Tesseract", thumb_dir=None, workers=OCR_WORKERS):
+        super().__init__()
+        self.image_paths = list(image_paths)
+        self.model = model
+        self.thumb_dir = thumb_dir
+        self.workers = workers
+        # {image path: text} extracted so far; complete once the thread has finished
+        self.results = {}
+
+    def run(self):
+        done = 0
+        try:
+            for image_path, text in self._results():
+                self._save_thumbnail(image_path)
+                done += 1
+                self.results[image_path] = text
+                self.text_ready.emit(image_path, text)
+                self.progress_update.emit(done, len(self.image_paths))
+                if self.isInterruptionRequested():
+                    break
+        except Exception as e:
+            print(f"OCR stopped after {done} of {len(self.image_paths)} images: {e}")
+        # Always sent, so the window unlocks and keeps what finished
+        self.ocr_complete.emit()
+
+    def _results(self):
+        if self.model == "Tesseract":
+            results = stream_text_tesseract(self.image_paths, self.workers)
+            try:
+                yield from results
+            finally:
+                # Drops the chunks still queued when the run is interrupted
+                results.close()
+            return
+
+        # One model load, then batched generation; each batch is shown as it finishes
+        engine = get_aya_engine()
+        for start in range(0, len(self.image_paths), engine.batch_size):
+            if self.isInterruptionRequested():
+                return
+            batch = self.image_paths[start:start + engine.batch_size]
+            yield from zip(batch, engine.extract_text(batch))
+
+    def _save_thumbnail(self, image_path):
+        if not self.thumb_dir:
+            return
+        thumb_path = os.path.join(self.thumb_dir, os.path.basename(image_path))
+        if os.path.exists(thumb_path):
+            return
+        try:
+            img = Image.open(image_path)
+            img.thumbnail(THUMB_SIZE)
+            img.save(thumb_path)
+        except Exception as e:
+            print(f"Thumbnail error on {image_path}: {e}")
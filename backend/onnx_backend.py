@@ -0,0 +1,172 @@
+# backend/onnx_backend.py
+"""
+ONNX Runtime inference backend for the detection models.
+
+The PyTorch models from model_loader are exported to ONNX once and the files
+are cached under ONNX_CACHE_DIR; once a file is cached the PyTorch model is
+not loaded at all. The "onnx-int8" backend additionally applies
+dynamic INT8 quantization to the weights. PyTorch ("torch") stays the
+reference backend; use `python -m backend.benchmark accuracy` to measure the
+difference before switching.
+"""
+import os
+import shutil
+from types import SimpleNamespace
+
+ONNX_CACHE_DIR = os.path.join("data", "onnx_cache")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_OPSET = 17
+
+
+def _require_onnxruntime():
+    try:
+        import onnxruntime
+        return onnxruntime
+    except ImportError as e:
+        raise RuntimeError("The ONNX backends need the 'onnxruntime' package (pip install onnxruntime)") from e
+
+
+def _int8_path(fp32_path):
+    return fp32_path.replace(".onnx", ".int8.onnx")
+
+
+def _write_atomically(path, write):
+    """Run write(tmp_path) and move the result to path, so an interrupted write leaves no partial file."""
+    tmp_path = path + ".tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _quantized(fp32_path):
+    """Return the INT8 copy of fp32_path, creating it on first use."""
+    int8_path = _int8_path(fp32_path)
+    if not os.path.exists(int8_path):
+        _require_onnxruntime()
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        _write_atomically(int8_path, lambda tmp_path: quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QUInt8))
+    return int8_path
+
+
+def _cached_export(onnx_path, export, quantize=False):
+    """
+    Return the ONNX file to load, calling export(path) only when nothing usable is cached.
+
+    Files only appear in the cache complete (see _write_atomically), and
+    exporting happens under a lock file, so detection workers starting
+    together export and quantize each model once.
+    """
+    target = _int8_path(onnx_path) if quantize else onnx_path
+    if os.path.exists(target):
+        return target
+    from filelock import FileLock
+
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    with FileLock(onnx_path + ".lock"):
+        # Another process may have finished the export while this one waited
+        if not os.path.exists(onnx_path):
+            _write_atomically(onnx_path, export)
+        return _quantized(onnx_path) if quantize else onnx_path
+
+
+def export_yolo(weights, load_model, quantize=False):
+    """
+    Load an Ultralytics YOLO model through ONNX Runtime, exporting it on first use.
+
+    Args:
+        weights: Weights file name (e.g. "yolov8x.pt"); names the cached export
+        load_model: Zero-argument callable returning the PyTorch YOLO model; only called to export
+
+    Returns:
+        YOLO: An Ultralytics model backed by the exported file, with the same call API
+    """
+    from ultralytics import YOLO
+
+    def export(onnx_path):
+        # dynamic=True keeps the batch and image size axes free for batched calls
+        exported = load_model().export(format="onnx", dynamic=True, opset=ONNX_OPSET)
+        shutil.move(exported, onnx_path)
+
+    _require_onnxruntime()
+    name = os.path.splitext(os.path.basename(weights))[0]
+    onnx_path = _cached_export(os.path.join(ONNX_CACHE_DIR, f"{name}.onnx"), export, quantize)
+    return YOLO(onnx_path, task="detect")
+
+
+def _detr_export_module(model):
+    """Wrap DETR so forward returns plain tensors, which torch.onnx.export needs."""
+    import torch
+
+    class DetrExportModule(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values, pixel_mask):
+            outputs = self.model(pixel_values=pixel_values, pixel_mask=pixel_mask)
+            return outputs.logits, outputs.pred_boxes
+
+    return DetrExportModule().eval()
+
+
+class OnnxDetrModel:
+    """ONNX Runtime stand-in for DetrForObjectDetection with the same call signature."""
+
+    def __init__(self, onnx_path, config, num_threads=None):
+        onnxruntime = _require_onnxruntime()
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.config = config
+
+    def __call__(self, pixel_values, pixel_mask=None, **kwargs):
+        import torch
+
+        if pixel_mask is None:
+            pixel_mask = torch.ones(pixel_values.shape[0], *pixel_values.shape[2:], dtype=torch.int64)
+        logits, pred_boxes = self.session.run(
+            ["logits", "pred_boxes"],
+            {"pixel_values": pixel_values.numpy(), "pixel_mask": pixel_mask.to(torch.int64).numpy()},
+        )
+        return SimpleNamespace(logits=torch.from_numpy(logits), pred_boxes=torch.from_numpy(pred_boxes))
+
+
+def export_detr(load_model, config, processor, quantize=False, num_threads=None):
+    """
+    Load DETR through ONNX Runtime, exporting it on first use.
+
+    Args:
+        load_model: Zero-argument callable returning the PyTorch DETR model; only called to export
+        config: The model's DetrConfig (label names for post-processing)
+        processor: DetrImageProcessor returned alongside the model
+
+    Returns:
+        tuple: (OnnxDetrModel, processor)
+    """
+    def export(onnx_path):
+        import torch
+
+        pixel_values = torch.zeros(1, 3, 800, 800)
+        pixel_mask = torch.ones(1, 800, 800, dtype=torch.int64)
+        torch.onnx.export(
+            _detr_export_module(load_model()),
+            (pixel_values, pixel_mask),
+            onnx_path,
+            input_names=["pixel_values", "pixel_mask"],
+            output_names=["logits", "pred_boxes"],
+            dynamic_axes={
+                "pixel_values": {0: "batch", 2: "height", 3: "width"},
+                "pixel_mask": {0: "batch", 1: "height", 2: "width"},
+                "logits": {0: "batch"},
+                "pred_boxes": {0: "batch"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+
+    _require_onnxruntime()
+    onnx_path = _cached_export(os.path.join(ONNX_CACHE_DIR, "detr-resnet-50.onnx"), export, quantize)
+    return OnnxDetrModel(onnx_path, config, num_threads), processor
@@ -0,0 +1,156 @@
+# backend/parallel_detection.py
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from backend.frame_decoder import decode_frames, MAX_DECODE_SIDE
+
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_WORKERS = max(1, CPU_COUNT // 4)
+
+# Per-process state, set up once by _init_worker
+_worker_detector = None
+_worker_load_seconds = 0.0
+
+
+def _init_worker(num_threads, backend, cascade):
+    """Bound torch's thread pools and load warm models once per worker process."""
+    global _worker_detector, _worker_load_seconds
+    import torch
+    from backend.model_loader import get_model, detection_model_names
+    from backend.object_detector import ObjectDetector
+
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+
+    start = time.perf_counter()
+    yolo_name, detr_name = detection_model_names(backend)
+    cheap_model = get_model("yolo-cheap") if cascade else None
+    _worker_detector = ObjectDetector(get_model(yolo_name), *get_model(detr_name), cheap_model, cascade)
+    _worker_load_seconds = time.perf_counter() - start
+
+
+def _warm():
+    return os.getpid()
+
+
+def _detect_shard(image_paths, max_decode_side):
+    """Detect one shard inside a worker. Returns (results, decoded flags, timings)."""
+    global _worker_load_seconds
+    start = time.perf_counter()
+    frames = decode_frames(image_paths, max_decode_side)
+    results = _worker_detector.detect_batch(frames, [os.path.basename(p) for p in image_paths])
+    timings = {
+        "pid": os.getpid(),
+        "load_seconds": _worker_load_seconds,
+        "inference_seconds": time.perf_counter() - start,
+    }
+    # Report the model load time only with the first shard of each worker
+    _worker_load_seconds = 0.0
+    return results, [frame is not None for frame in frames], timings
+
+
+class ParallelDetectionEngine:
+    """
+    Object detection sharded across a pool of worker processes.
+
+    Each worker loads its own copy of the models once and keeps them warm
+    between shards. Torch's intra-op pool in each worker is capped so the
+    workers together do not oversubscribe the CPU.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, threads_per_worker=None, max_decode_side=MAX_DECODE_SIDE,
+                 backend="torch", cascade=None):
+        self.workers = max(1, int(workers))
+        self.backend = backend
+        self.cascade = cascade
+        self.threads_per_worker = threads_per_worker or max(1, CPU_COUNT // self.workers)
+        self.max_decode_side = max_decode_side
+        self.errors = []  # Worker exceptions from the last detect()
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn keeps Qt and torch thread state out of the children
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.threads_per_worker, self.backend, self.cascade),
+            )
+        return self._executor
+
+    def warm_up(self):
+        """Start every worker and wait until all of them have loaded their models."""
+        pool = self._pool()
+        return sorted({f.result() for f in [pool.submit(_warm) for _ in range(self.workers)]})
+
+    def detect(self, shards):
+        """
+        Run detection over shards of image paths.
+
+        Args:
+            shards: Iterable of (key, [image paths]) pairs
+
+        Yields:
+            (key, results, decoded flags, timings) as each shard finishes.
+            Shards whose worker failed are reported and left out, so their
+            images are retried on the next run; errors lists the failures.
+        """
+        self.errors = []
+        pool = self._pool()
+        futures = {
+            pool.submit(_detect_shard, list(paths), self.max_decode_side): key
+            for key, paths in shards
+        }
+        for future in as_completed(futures):
+            try:
+                results, decoded, timings = future.result()
+            except Exception as e:
+                print(f"Parallel detection error in a worker: {e}")
+                self.errors.append(e)
+                if isinstance(e, BrokenProcessPool):
+                    # A dead worker breaks the whole pool; start a fresh one next run
+                    self._executor = None
+                continue
+            yield futures[future], results, decoded, timings
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_engine = None
+_engine_key = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(workers=DEFAULT_WORKERS, max_decode_side=MAX_DECODE_SIDE, backend="torch", cascade=None):
+    """
+    Return the shared engine so warm workers survive between detection runs.
+
+    Only one engine is kept: each holds full model copies in every worker,
+    so asking for different settings shuts the previous engine down first.
+    """
+    global _engine, _engine_key
+    key = (workers, max_decode_side, backend, cascade.key() if cascade else None)
+    with _engine_lock:
+        if _engine is not None and _engine_key != key:
+            _engine.shutdown()
+            _engine = None
+        if _engine is None:
+            _engine = ParallelDetectionEngine(
+                workers, max_decode_side=max_decode_side, backend=backend, cascade=cascade
+            )
+            _engine_key = key
+        return _engine
+
+
+@atexit.register
+def _shutdown_engines():
+    if _engine is not None:
+        _engine.shutdown()
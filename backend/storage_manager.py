@@ -1,17 +1,24 @@
 # backend/storage_manager.py
-import json
 import os
+from backend.journal import load_store, save_store, update_store
 
 # Function to load metadata from JSON file
 def load_metadata(metadata_file='data/metadata.json'):
-    """Load metadata from the JSON file."""
-    if os.path.exists(metadata_file):
-        with open(metadata_file, 'r') as f:
-            return json.load(f)
-    return {}
+    """Load metadata from the JSON snapshot and its journal."""
+    return load_store(metadata_file)
 
 # Function to save metadata to JSON file
 def save_metadata(metadata, metadata_file='data/metadata.json'):
-    """Save metadata to a JSON file."""
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f, indent=4)
+    """Save metadata, appending only the entries that changed to the journal."""
+    directory = os.path.dirname(metadata_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    save_store(metadata_file, metadata)
+
+# Function to write only the entries that changed
+def update_metadata(changes, deletes=(), metadata_file='data/metadata.json'):
+    """Journal changed and removed entries without comparing the rest of the metadata."""
+    directory = os.path.dirname(metadata_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    update_store(metadata_file, changes, deletes)
@@ -0,0 +1,48 @@
+import os
+from PyQt6.QtWidgets import QLabel
+from PyQt6.QtCore import Qt, pyqtSignal
+from frontend.style import get_style
+
+class ExampleDropZone(QLabel):
+    """Drop target that takes a photo and asks for the library photos of the same people"""
+    
+    image_dropped = pyqtSignal(str)  # Path of the dropped image
+    
+    def __init__(self, parent=None, text="Drop a photo here to find that person"):
+        super().__init__(text, parent)
+        self.setAcceptDrops(True)
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setStyleSheet(get_style("drop_zone"))
+        self.setToolTip("Photos containing the faces in the dropped image are shown below")
+        
+    def _image_path(self, event):
+        """Return the first local image file in a drag, or None"""
+        if not event.mimeData().hasUrls():
+            return None
+        for url in event.mimeData().urls():
+            path = url.toLocalFile()
+            if os.path.isfile(path) and path.lower().endswith(('.jpg', '.jpeg', '.png')):
+                return path
+        return None
+        
+    def _set_dragging(self, dragging):
+        self.setProperty("dragging", "true" if dragging else "false")
+        self.style().unpolish(self)
+        self.style().polish(self)
+        
+    def dragEnterEvent(self, event):
+        if self._image_path(event):
+            self._set_dragging(True)
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+            
+    def dragLeaveEvent(self, event):
+        self._set_dragging(False)
+        
+    def dropEvent(self, event):
+        self._set_dragging(False)
+        path = self._image_path(event)
+        if path:
+            event.acceptProposedAction()
+            self.image_dropped.emit(path)
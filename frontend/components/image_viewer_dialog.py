@@ -1,27 +1,29 @@
 import os
-import json
 import cv2
-import numpy as np
-import face_recognition
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QScrollArea, QComboBox, QDialogButtonBox, QFrame, QInputDialog
 )
 from PyQt6.QtGui import QImage, QPixmap, QIcon
 from PyQt6.QtCore import Qt, QSize, pyqtSignal
-from backend.main_logic import METADATA_PATH, load_face_metadata
+from backend.main_logic import METADATA_PATH, load_face_metadata, is_album_file
+from backend.journal import load_store, read_store, update_store
+from backend.model_loader import get_model
+from backend.face_index import get_face_index, face_index_lock
+from backend.face_table import get_face_table
 
 class ImageViewerDialog(QDialog):
     """Dialog for viewing full-size images with face recognition highlighting"""
     
     rename_requested = pyqtSignal(str, str)  # image_path, new_face_id
     
-    def __init__(self, image_path, parent=None):
+    def __init__(self, image_path, parent=None, face_id=None):
         super().__init__(parent)
         self.image_path = image_path
         self.is_fit_mode = True
         self.face_locations = []
-        self.current_face_id = self.get_current_face_id()
+        # A source image can belong to several virtual groups; prefer the one it was opened from
+        self.current_face_id = face_id or self.get_current_face_id()
         self.available_face_ids = self.get_available_face_ids()
         
         self.setup_ui()
@@ -124,8 +126,7 @@ class ImageViewerDialog(QDialog):
     def get_current_face_id(self):
         """Get the current face ID for this image"""
         try:
-            with open(METADATA_PATH, "r") as f:
-                metadata = json.load(f)
+            metadata = read_store(METADATA_PATH)
                 
             for face_id, data in metadata.items():
                 if self.image_path in data.get("images", []):
@@ -141,9 +142,7 @@ class ImageViewerDialog(QDialog):
         face_ids = []
         
         try:
-            with open(METADATA_PATH, "r") as f:
-                metadata = json.load(f)
-                face_ids = list(metadata.keys())
+            face_ids = list(read_store(METADATA_PATH).keys())
         except Exception:
             pass
             
@@ -163,27 +162,39 @@ class ImageViewerDialog(QDialog):
         # Detect faces if requested
         if highlight_faces:
             try:
-                # Load current face data
-                with open(METADATA_PATH, "r") as f:
-                    metadata = json.load(f)
-                    
-                current_face_id = self.get_current_face_id()
-                if current_face_id and current_face_id in metadata:
-                    # Get the encoding for this face ID
-                    target_encoding = np.array(metadata[current_face_id]["encoding"])
+                # Cached read-only view; no re-parse unless the file changed
+                metadata = read_store(METADATA_PATH)
                     
+                current_face_id = self.current_face_id or self.get_current_face_id()
+                # Boxes and clusters stored at ingestion; no detection needed
+                faces = get_face_table(METADATA_PATH).faces(self.image_path)
+                if faces is not None:
+                    self.face_locations = [box for box, _ in faces]
+                    for (top, right, bottom, left), cluster in faces:
+                        # Green for faces in this group, red for the others
+                        color = (0, 255, 0) if cluster == current_face_id else (0, 0, 255)
+                        cv2.rectangle(image, (left, top), (right, bottom), color, 2)
+                elif current_face_id and current_face_id in metadata:
+                    # Images ingested before the face table existed are detected on the spot
+                    # Shared face_recognition models from the registry
+                    face_recognition = get_model("face")
+
                     # Convert to RGB for face_recognition
                     rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
                     
                     # Detect faces in the image
                     self.face_locations = face_recognition.face_locations(rgb_image)
                     face_encodings = face_recognition.face_encodings(rgb_image, self.face_locations)
+
+                    # Shared nearest-neighbour index over all cluster encodings; a running
+                    # ingestion writes to it too, so it is only read under its lock
+                    with face_index_lock(METADATA_PATH):
+                        face_index = get_face_index(METADATA_PATH, metadata)
+                        # A face matches when this group is its nearest cluster within tolerance
+                        matches = [face_index.match(encoding) == current_face_id for encoding in face_encodings]
                     
                     # Draw rectangles around faces
-                    for i, (encoding, location) in enumerate(zip(face_encodings, self.face_locations)):
-                        # Compare with target encoding
-                        match = face_recognition.compare_faces([target_encoding], encoding, tolerance=0.5)[0]
-                        
+                    for match, location in zip(matches, self.face_locations):
                         # Draw rectangle with color based on match
                         top, right, bottom, left = location
                         if match:
@@ -234,7 +245,7 @@ class ImageViewerDialog(QDialog):
             if not new_name.lower().endswith(('.jpg', '.jpeg', '.png')):
                 new_name += os.path.splitext(current_name)[1]  # Keep original extension
 
-            # Path in the face_detected folder
+            # Path next to the viewed file (a face_detected copy or, in a virtual album, the source)
             new_path = os.path.join(os.path.dirname(self.image_path), new_name)
 
             if os.path.exists(new_path):
@@ -245,30 +256,32 @@ class ImageViewerDialog(QDialog):
                 # Find the original source file path from metadata
                 original_path = None
                 original_new_path = None
+                changed_face_ids = []
                 
-                with open(METADATA_PATH, "r") as f:
-                    metadata = json.load(f)
+                metadata = load_store(METADATA_PATH)
                     
-                    # Find the current face ID and update the path in metadata
-                    for face_id, data in metadata.items():
-                        if self.image_path in data.get("images", []):
-                            # Get the index of the current path
-                            idx = data["images"].index(self.image_path)
-                            
-                            # Try to find the original source file
+                # Update the path in every group that references it (several, for a virtual source)
+                for face_id, data in metadata.items():
+                    if self.image_path in data.get("images", []):
+                        # Get the index of the current path
+                        idx = data["images"].index(self.image_path)
+                        
+                        # Copies in a group folder have an original source file to rename too
+                        if original_path is None and is_album_file(self.image_path, "face_detected", face_id):
                             base_name = os.path.basename(self.image_path)
                             for root, _, files in os.walk(self.parent().folder_path):
                                 if base_name in files:
                                     original_path = os.path.join(root, base_name)
                                     original_new_path = os.path.join(root, new_name)
                                     break
-                            
-                            # Update the path in metadata
-                            data["images"][idx] = new_path
-                            break
+                        
+                        # Update the path in metadata
+                        data["images"][idx] = new_path
+                        changed_face_ids.append(face_id)
                 
-                # Rename the file in the face_detected folder
+                # Rename the viewed file
                 os.rename(self.image_path, new_path)
+                get_face_table(METADATA_PATH).rename_path(self.image_path, new_path)
                 self.image_path = new_path
                 
                 # Rename the original file if found
@@ -277,10 +290,11 @@ class ImageViewerDialog(QDialog):
                         print(f"Warning: Original destination file already exists: {original_new_path}")
                     else:
                         os.rename(original_path, original_new_path)
+                        get_face_table(METADATA_PATH).rename_path(original_path, original_new_path)
                 
-                # Save updated metadata
-                with open(METADATA_PATH, "w") as f:
-                    json.dump(metadata, f, indent=4)
+                # Journal only the face groups that changed
+                if changed_face_ids:
+                    update_store(METADATA_PATH, {face_id: metadata[face_id] for face_id in changed_face_ids})
                     
                 self.filename_label.setText(new_name)
                 self.load_image(highlight_faces=True)
@@ -13,18 +13,21 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QDialogButtonBox,
 )
-from PyQt6.QtGui import QPixmap, QIcon
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QPixmap, QIcon, QPainter, QPen, QColor
+from PyQt6.QtCore import Qt, QTimer, QRectF, QPointF, pyqtSignal
+from backend.index_manager import unpack_detections
 
 METADATA_PATH = r"D:/Projects/project1/data/object_metadata.json"
 
 class ObjectViewerDialog(QDialog):
     image_renamed = pyqtSignal(str, str)
 
-    def __init__(self, image_path, parent=None):
+    def __init__(self, image_path, entry=None, threshold=0.7, parent=None):
         super().__init__(parent)
         self.image_path = image_path
         self.original_path = image_path
+        self.entry = entry or {}  # Index entry whose stored boxes are drawn over the image
+        self.threshold = threshold
         self.rename_debounce_timer = QTimer(self)
         self.rename_debounce_timer.setSingleShot(True)
         self.rename_debounce_timer.timeout.connect(self._apply_metadata_update)
@@ -74,14 +77,34 @@ class ObjectViewerDialog(QDialog):
         close_box.rejected.connect(self.reject)
         layout.addWidget(close_box)
 
-    def _load_image(self):
+    def _base_pixmap(self):
+        """Load the image and draw the stored detections that reach the threshold."""
         pix = QPixmap(self.image_path)
+        labels, label_ids, scores, boxes = unpack_detections(self.entry)
+        if pix.isNull() or not len(scores):
+            return pix
+
+        painter = QPainter(pix)
+        painter.setPen(QPen(QColor("#EF4444"), max(2, pix.width() // 400)))
+        width, height = pix.width(), pix.height()
+        for label_id, score, (x1, y1, x2, y2) in zip(label_ids, scores, boxes):
+            if score < self.threshold:
+                continue
+            # Boxes are stored normalised, so they scale to any decode size
+            rect = QRectF(x1 * width, y1 * height, (x2 - x1) * width, (y2 - y1) * height)
+            painter.drawRect(rect)
+            painter.drawText(QPointF(rect.left() + 4, rect.top() + 14), f"{labels[label_id]} {score:.2f}")
+        painter.end()
+        return pix
+
+    def _load_image(self):
+        pix = self._base_pixmap()
         self.image_label.setPixmap(pix)
         if self.fit_btn.isChecked():
             self._toggle_fit()
 
     def _toggle_fit(self, force=False):
-        pix = QPixmap(self.image_path)
+        pix = self._base_pixmap()
         if force or not self.fit_btn.isChecked():
             # actual size
             self.image_label.setPixmap(pix)
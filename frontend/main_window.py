@@ -2,7 +2,6 @@ import os
 import csv
 import datetime
 import shutil
-import json
 from PyQt6.QtGui import QImage, QPixmap, QIcon
 from PyQt6.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout, QFileDialog,
@@ -11,16 +10,23 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QSize, QTimer, QPropertyAnimation, QEasingCurve
 from backend.main_logic import (
-    detect_and_cluster_faces,
     rename_face_id,
     load_face_metadata,
-    get_images_missing_from_metadata,
+    is_album_file,
+    refresh_face_index,
     METADATA_PATH
 )
+from backend.face_clusters import new_cluster, add_faces, remove_faces
+from backend.face_ids import reserve_face_ids
+from backend.journal import load_store, update_store
+from backend.face_table import get_face_table
+from backend.face_ingest_thread import FaceIngestThread
+from backend.face_search_thread import FaceSearchThread
 from frontend.style import get_style, COLORS
 from frontend.components.thumbnail_widget import ThumbnailWidget
 from frontend.components.image_viewer_dialog import ImageViewerDialog
 from frontend.components.search_widget import SearchWidget
+from frontend.components.example_drop_zone import ExampleDropZone
 
 CSV_METADATA_FILE = "face_metadata.csv"
 
@@ -35,6 +41,10 @@ class MainWindow(QWidget):
         
         self.folder_path = ""
         self.thumbnail_paths = {}
+        # Background face ingestion; None when no run is active
+        self.face_thread = None
+        # Background search by example; None when no search is active
+        self.search_thread = None
         self.setup_ui()
         
         # Fade in animation on startup
@@ -100,6 +110,11 @@ class MainWindow(QWidget):
         self.search_widget.search_changed.connect(lambda text: self.search_faces(text))
         search_layout.addWidget(self.search_widget)
         
+        # Search by example: drop a photo to find the same people in the library
+        self.example_drop_zone = ExampleDropZone(self)
+        self.example_drop_zone.image_dropped.connect(self.search_by_example)
+        search_layout.addWidget(self.example_drop_zone)
+        
         # Refresh button
         self.refresh_button = QPushButton()
         self.refresh_button.setIcon(QIcon("frontend/assets/refresh.svg"))
@@ -143,10 +158,17 @@ class MainWindow(QWidget):
         self.detect_button.setStyleSheet(get_style("button"))
         self.detect_button.clicked.connect(self.detect_and_show)
         
+        # Only shown while face ingestion runs
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setStyleSheet(get_style("button"))
+        self.cancel_button.clicked.connect(self.cancel_face_ingest)
+        self.cancel_button.hide()
+        
         # Add buttons to layout
         button_layout.addStretch()
         button_layout.addWidget(self.select_button)
         button_layout.addWidget(self.detect_button)
+        button_layout.addWidget(self.cancel_button)
         
         self.layout.addLayout(button_layout)
     
@@ -229,25 +251,87 @@ class MainWindow(QWidget):
         
         return len(new_entries)
     
+    def start_face_ingest(self, on_complete):
+        """
+        Detect and cluster the folder's new images in a background thread.
+
+        The grid follows the groups as they form; on_complete(face_id_map, msg, examined)
+        runs on the GUI thread once the run finishes or is cancelled.
+        """
+        self.face_thread = FaceIngestThread(self.folder_path)
+        self.face_thread.progress_update.connect(self.update_ingest_status)
+        self.face_thread.clusters_updated.connect(self.show_forming_clusters)
+        self.face_thread.ingest_complete.connect(
+            lambda face_id_map, msg: self.on_face_ingest_finished(on_complete, face_id_map, msg)
+        )
+        self.face_thread.ingest_failed.connect(self.on_face_ingest_failed)
+        self.set_ingest_running(True)
+        self.face_thread.start()
+
+    def set_ingest_running(self, running):
+        """Swap the footer to a Cancel button and lock actions that would race the ingestion"""
+        for button in (self.select_button, self.detect_button, self.refresh_button):
+            button.setEnabled(not running)
+        self.example_drop_zone.setEnabled(not running and self.search_thread is None)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.setVisible(running)
+
+    def ingest_running(self):
+        """Tell the user and return True if a face ingestion run is active"""
+        if self.face_thread is not None:
+            self.status_label.setText("Face detection is still running. Wait for it to finish or cancel it.")
+            return True
+        return False
+
+    def update_ingest_status(self, done, total, image_path):
+        self.status_label.setText(f"Processing faces: {done}/{total} images… ({os.path.basename(image_path)})")
+
+    def show_forming_clusters(self, face_id_map):
+        """Redraw the grid with the groups committed so far"""
+        self.thumbnail_paths = face_id_map
+        self.clear_grid()
+        self.populate_grid(self.thumbnail_paths)
+
+    def cancel_face_ingest(self):
+        if self.face_thread is not None:
+            self.face_thread.requestInterruption()
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Cancelling… finished images are kept.")
+
+    def stop_face_ingest(self):
+        """Cancel a running ingestion and wait for it to commit (used when the app closes)"""
+        if self.face_thread is not None:
+            self.face_thread.requestInterruption()
+            self.face_thread.wait()
+
+    def on_face_ingest_finished(self, on_complete, face_id_map, msg):
+        examined = len(self.face_thread.images)
+        self.face_thread = None
+        self.set_ingest_running(False)
+        on_complete(face_id_map, msg, examined)
+
+    def on_face_ingest_failed(self, error):
+        self.face_thread = None
+        self.set_ingest_running(False)
+        self.status_label.setText(f"Face detection failed: {error}")
+
     def detect_and_show(self):
         """Process images and display face clusters"""
         if not self.folder_path:
             self.status_label.setText("No folder selected.")
             return
+        if self.ingest_running():
+            return
 
         self.status_label.setText("Processing images... This may take a moment.")
-        self.repaint()  # Force UI update
-        
-        missing_images = get_images_missing_from_metadata(self.folder_path)
+        self.start_face_ingest(self.show_ingest_result)
 
-        if missing_images:
-            self.thumbnail_paths, msg = detect_and_cluster_faces(
-                self.folder_path,
-                only_process=missing_images
-            )
-            self.status_label.setText(f"Processed {len(missing_images)} new image(s). Face groups updated.")
+    def show_ingest_result(self, face_id_map, msg, examined):
+        if examined:
+            self.thumbnail_paths = face_id_map
+            self.status_label.setText(msg)
         else:
-            self.thumbnail_paths, msg = load_face_metadata()
+            self.thumbnail_paths, _ = load_face_metadata()
             self.status_label.setText("All images already processed. Showing current face groups.")
 
         self.clear_grid()
@@ -258,9 +342,10 @@ class MainWindow(QWidget):
         if not self.folder_path:
             self.status_label.setText("No folder selected.")
             return
+        if self.ingest_running():
+            return
 
         self.status_label.setText("Refreshing data from disk...")
-        self.repaint()  # Force UI update
         
         changes_detected = False
         
@@ -275,25 +360,26 @@ class MainWindow(QWidget):
             self.status_label.setText(f"Error refreshing CSV metadata: {str(e)}")
             return
         
-        # 2. Check for new images that need processing
-        missing_images = get_images_missing_from_metadata(self.folder_path)
-        
-        # 3. Process new images if any
-        if missing_images:
-            self.thumbnail_paths, msg = detect_and_cluster_faces(
-                self.folder_path,
-                only_process=missing_images
-            )
+        # 2. and 3. New images are found and processed in the background; the rest follows
+        self.start_face_ingest(
+            lambda face_id_map, msg, examined: self.finish_refresh(changes_detected, face_id_map, msg, examined)
+        )
+
+    def finish_refresh(self, changes_detected, face_id_map, msg, examined):
+        """Steps of refresh_metadata that run once new images have been processed"""
+        if examined:
+            self.thumbnail_paths = face_id_map
             changes_detected = True
-            self.status_label.setText(f"Processed {len(missing_images)} new image(s). Face groups updated.")
+            self.status_label.setText(msg)
         else:
             # 4. Re-read face_metadata.json even if no new images
             try:
                 # Check if metadata file exists before loading
                 if os.path.exists(METADATA_PATH):
                     old_metadata = self.thumbnail_paths.copy() if hasattr(self, 'thumbnail_paths') else {}
-                    self.thumbnail_paths, _ = load_face_metadata()
-                    
+                    # An explicit refresh bypasses the in-process metadata cache
+                    self.thumbnail_paths, _ = load_face_metadata(force_reload=True)
+
                     # Check if metadata has changed
                     if old_metadata != self.thumbnail_paths:
                         changes_detected = True
@@ -303,15 +389,16 @@ class MainWindow(QWidget):
             except Exception as e:
                 self.status_label.setText(f"Error loading face metadata: {str(e)}")
                 return
-        
+
         # 5. Check face_detected directory structure for changes
         try:
             face_dir = "face_detected"
             if os.path.exists(face_dir):
-                # Verify all face directories in metadata actually exist
-                for face_id in list(self.thumbnail_paths.keys()):
+                # Verify the folders of groups stored as files still exist (virtual groups have none)
+                for face_id, paths in list(self.thumbnail_paths.items()):
                     face_path = os.path.join(face_dir, face_id)
-                    if not os.path.exists(face_path):
+                    stored_in_folder = paths and all(is_album_file(p, face_dir, face_id) for p in paths)
+                    if stored_in_folder and not os.path.exists(face_path):
                         # Face directory was deleted, remove from metadata
                         self.thumbnail_paths.pop(face_id, None)
                         changes_detected = True
@@ -354,8 +441,8 @@ class MainWindow(QWidget):
         else:
             self.status_label.setText("UI refreshed. No changes detected.")
 
-    def populate_grid(self, data):
-        """Populate the grid layout with face clusters"""
+    def populate_grid(self, data, renamable=True):
+        """Populate the grid layout with face clusters (or search results, which cannot be renamed)"""
         row = 0
         
         if not data:
@@ -380,14 +467,15 @@ class MainWindow(QWidget):
             header_layout.addWidget(face_label)
             
             # Rename button
-            rename_button = QPushButton()
-            rename_button.setIcon(QIcon("frontend/assets/edit.svg"))
-            rename_button.setIconSize(QSize(18, 18))
-            rename_button.setFixedSize(32, 32)
-            rename_button.setToolTip("Rename Face Group")
-            rename_button.setStyleSheet(get_style("icon_button"))
-            rename_button.clicked.connect(lambda _, fid=face_id: self.rename_face_dialog(fid))
-            header_layout.addWidget(rename_button)
+            if renamable:
+                rename_button = QPushButton()
+                rename_button.setIcon(QIcon("frontend/assets/edit.svg"))
+                rename_button.setIconSize(QSize(18, 18))
+                rename_button.setFixedSize(32, 32)
+                rename_button.setToolTip("Rename Face Group")
+                rename_button.setStyleSheet(get_style("icon_button"))
+                rename_button.clicked.connect(lambda _, fid=face_id: self.rename_face_dialog(fid))
+                header_layout.addWidget(rename_button)
             
             header_layout.addStretch(1)
             
@@ -409,7 +497,10 @@ class MainWindow(QWidget):
                     continue
                     
                 thumb_widget = ThumbnailWidget(path)
-                thumb_widget.thumbnail_clicked.connect(self.show_full_size_image)
+                # Virtual groups share source images, so the viewer is told which group it came from
+                thumb_widget.thumbnail_clicked.connect(
+                    lambda image_path, fid=face_id if renamable else None: self.show_full_size_image(image_path, fid)
+                )
                 
                 self.grid_layout.addWidget(thumb_widget, row, col)
                 
@@ -435,6 +526,8 @@ class MainWindow(QWidget):
         
         if not ok or not new_face_name or new_face_name == old_face_id:
             return
+        if self.ingest_running():
+            return
 
         # Check for duplication before renaming
         if new_face_name in self.thumbnail_paths:
@@ -489,33 +582,42 @@ class MainWindow(QWidget):
             if widget:
                 widget.deleteLater()
 
-    def show_full_size_image(self, path):
+    def show_full_size_image(self, path, face_id=None):
         """Show full size image in a dialog"""
         if not os.path.exists(path):
             self.status_label.setText("Image not found.")
             return
             
-        dialog = ImageViewerDialog(path, self)
-        dialog.rename_requested.connect(self.rename_single_image)
+        dialog = ImageViewerDialog(path, self, face_id=face_id)
+        dialog.rename_requested.connect(
+            lambda image_path, target, fid=dialog.current_face_id: self.rename_single_image(image_path, target, fid)
+        )
         dialog.exec()
 
-    def rename_single_image(self, image_path, target_face_id):
-        """Move a single image to a different face group"""
+    def rename_single_image(self, image_path, target_face_id, current_face_id=None):
+        """
+        Move a single image to a different face group.
+
+        Images a group references directly (virtual albums) move in the
+        metadata only; files in a group folder are moved on disk as well.
+        """
+        if self.ingest_running():
+            return False
         if not os.path.exists(image_path):
             self.status_label.setText(f"Image not found: {image_path}")
             return False
             
         try:
             # Load metadata
-            with open(METADATA_PATH, "r") as f:
-                metadata = json.load(f)
+            metadata = load_store(METADATA_PATH)
                 
             # Find current face ID for the image
-            current_face_id = None
-            for face_id, data in metadata.items():
-                if image_path in data.get("images", []):
-                    current_face_id = face_id
-                    break
+            if current_face_id not in metadata or image_path not in metadata[current_face_id].get("images", []):
+                current_face_id = None
+                for face_id, data in metadata.items():
+                    if image_path in data.get("images", []):
+                        current_face_id = face_id
+                        break
                     
             if not current_face_id:
                 self.status_label.setText("Image not found in metadata.")
@@ -525,31 +627,43 @@ class MainWindow(QWidget):
                 self.status_label.setText("Image is already in that face group.")
                 return False
                 
-            # Create target directory if needed
-            target_dir = os.path.join("face_detected", target_face_id)
-            os.makedirs(target_dir, exist_ok=True)
-            
-            # Move the file to the new location
-            filename = os.path.basename(image_path)
-            new_path = os.path.join(target_dir, filename)
+            new_path = image_path
+            if is_album_file(image_path, "face_detected", current_face_id):
+                # Create target directory if needed
+                target_dir = os.path.join("face_detected", target_face_id)
+                os.makedirs(target_dir, exist_ok=True)
+                
+                # Move the file to the new location
+                filename = os.path.basename(image_path)
+                new_path = os.path.join(target_dir, filename)
+                
+                # Handle filename conflicts
+                if os.path.exists(new_path):
+                    base, ext = os.path.splitext(filename)
+                    counter = 1
+                    while os.path.exists(new_path):
+                        new_path = os.path.join(target_dir, f"{base}_{counter}{ext}")
+                        counter += 1
+                        
+                # Move file and update metadata
+                shutil.move(image_path, new_path)
             
-            # Handle filename conflicts
-            if os.path.exists(new_path):
-                base, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(new_path):
-                    new_path = os.path.join(target_dir, f"{base}_{counter}{ext}")
-                    counter += 1
-                    
-            # Move file and update metadata
-            shutil.move(image_path, new_path)
+            # Encodings of the faces that move (empty for images ingested before the face table)
+            moved = get_face_table(METADATA_PATH).reassign(image_path, current_face_id, target_face_id, new_path)
+            if moved is None:
+                moved = []
             
             # Update metadata
             metadata[current_face_id]["images"].remove(image_path)
+            remove_faces(metadata[current_face_id], moved)
             
             # If target face ID already exists, add to it
             if target_face_id in metadata:
-                metadata[target_face_id]["images"].append(new_path)
+                if new_path not in metadata[target_face_id]["images"]:
+                    metadata[target_face_id]["images"].append(new_path)
+                add_faces(metadata[target_face_id], moved)
+            elif len(moved):
+                metadata[target_face_id] = new_cluster(moved, [new_path])
             else:
                 # Create new face ID entry with current encoding
                 metadata[target_face_id] = {
@@ -557,13 +671,15 @@ class MainWindow(QWidget):
                     "encoding": metadata[current_face_id].get("encoding")
                 }
                 
-            # Remove empty face groups
+            # Remove empty face groups, then journal just the two groups involved
+            deletes = []
             if not metadata[current_face_id]["images"]:
                 metadata.pop(current_face_id)
-                
-            # Save metadata
-            with open(METADATA_PATH, "w") as f:
-                json.dump(metadata, f, indent=4)
+                deletes.append(current_face_id)
+            changes = {face_id: metadata[face_id] for face_id in (current_face_id, target_face_id) if face_id in metadata}
+            reserve_face_ids(METADATA_PATH, (current_face_id, target_face_id))
+            update_store(METADATA_PATH, changes, deletes)
+            refresh_face_index((current_face_id, target_face_id), metadata)
                 
             # Refresh UI
             self.thumbnail_paths, _ = load_face_metadata()
@@ -577,6 +693,63 @@ class MainWindow(QWidget):
             self.status_label.setText(f"Error moving image: {str(e)}")
             return False
 
+    def search_by_example(self, image_path):
+        """Search in a background thread for the library photos that contain the faces in image_path"""
+        if self.ingest_running():
+            return
+        if self.search_thread is not None:
+            self.status_label.setText("A search is still running.")
+            return
+
+        self.status_label.setText(f"Searching for the faces in {os.path.basename(image_path)}...")
+        self.search_thread = FaceSearchThread(image_path)
+        self.search_thread.search_complete.connect(self.on_search_finished)
+        self.search_thread.search_failed.connect(self.on_search_failed)
+        self.example_drop_zone.setEnabled(False)
+        self.search_thread.start()
+
+    def stop_search(self):
+        """Wait for a running search by example (used when the app closes)"""
+        if self.search_thread is not None:
+            self.search_thread.wait()
+
+    def end_search(self):
+        self.search_thread = None
+        self.example_drop_zone.setEnabled(self.face_thread is None)
+
+    def on_search_failed(self, image_path, error):
+        self.end_search()
+        self.status_label.setText(f"Error searching by example: {error}")
+
+    def on_search_finished(self, image_path, results):
+        """Show the library photos that matched the faces in image_path"""
+        self.end_search()
+        if not results:
+            self.status_label.setText("No faces found in the dropped image.")
+            return
+            
+        data = {}
+        found = 0
+        for i, (box, matches) in enumerate(results, start=1):
+            if not matches:
+                continue
+            # Group name shows the closest match and the group it sits in
+            _, best_distance, best_face_id = matches[0]
+            title = f"Face {i} of {len(results)} - best match {best_distance:.2f}"
+            if best_face_id:
+                title += f" in {best_face_id}"
+            data[title] = [path for path, _, _ in matches]
+            found += len(matches)
+            
+        self.clear_grid()
+        self.populate_grid(data, renamable=False)
+        if data:
+            self.status_label.setText(
+                f"{found} photo(s) match {len(data)} of {len(results)} face(s) in {os.path.basename(image_path)}."
+            )
+        else:
+            self.status_label.setText(f"No library photos match the faces in {os.path.basename(image_path)}.")
+
     def search_faces(self, text=""):
         """Filter face clusters by search text"""
         if not self.thumbnail_paths:
@@ -2,13 +2,20 @@
 
 import os
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel, QFileDialog, QScrollArea
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel, QFileDialog, QScrollArea, QCheckBox,
+    QDoubleSpinBox
 )
 from PyQt6.QtCore import QTimer
 from frontend.components.image_grid import ImageGrid
 from frontend.components.object_viewer_dialog import ObjectViewerDialog
 from backend.detection_thread import ObjectDetectionThread
-from backend.index_manager import load_index, save_index
+from backend.index_manager import get_object_index
+from backend.object_detector import CascadePolicy, DEFAULT_QUERY_THRESHOLD, DETECTION_FLOOR
+
+# Worker processes used for object detection. 1 runs the decode / infer / write
+# pipeline in the detection thread, where torch already uses every core; more
+# shard folders across processes that each hold their own model copies
+DETECTION_WORKERS = 1
 
 class ObjectSearchApp(QWidget):
     def __init__(self):
@@ -17,7 +24,7 @@ class ObjectSearchApp(QWidget):
         self.resize(900, 700)
 
         self.image_folder = "images"
-        self.index_data = load_index()
+        self.index = get_object_index()
         self.auto_scan_active = False
         self.auto_scan_timer = QTimer(self)
         self.auto_scan_timer.timeout.connect(self.auto_scan)
@@ -37,7 +44,17 @@ class ObjectSearchApp(QWidget):
         self.refresh_btn.setFixedSize(30, 30)
         self.refresh_btn.clicked.connect(self.search_images)
 
+        # Stored detections keep every score above DETECTION_FLOOR, so the
+        # threshold is applied here and changing it needs no re-detection
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setPrefix("Min confidence ")
+        self.threshold_spin.setRange(DETECTION_FLOOR, 1.0)
+        self.threshold_spin.setSingleStep(0.05)
+        self.threshold_spin.setValue(DEFAULT_QUERY_THRESHOLD)
+        self.threshold_spin.valueChanged.connect(self.search_images)
+
         search_layout.addWidget(self.search_bar)
+        search_layout.addWidget(self.threshold_spin)
         search_layout.addWidget(self.refresh_btn)
         layout.addLayout(search_layout)
 
@@ -53,6 +70,17 @@ class ObjectSearchApp(QWidget):
         self.scroll_area.setWidget(self.image_grid)
         layout.addWidget(self.scroll_area)
 
+        # Detection options
+        options_layout = QHBoxLayout()
+        self.cascade_checkbox = QCheckBox("Fast cascade (small model first)")
+        self.cascade_checkbox.setChecked(True)
+        self.open_images_checkbox = QCheckBox("Open Images coverage")
+        self.open_images_checkbox.setToolTip("Always run the full model set, including yolov8x-oiv7")
+        options_layout.addWidget(self.cascade_checkbox)
+        options_layout.addWidget(self.open_images_checkbox)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+
         # Buttons
         self.load_button = QPushButton("Load Images and Detect Objects")
         self.load_button.clicked.connect(self.load_and_detect)
@@ -73,7 +101,15 @@ class ObjectSearchApp(QWidget):
             return
 
         self.image_folder = folder
-        self.thread = ObjectDetectionThread(self.image_folder, self.index_data)
+        self._start_detection()
+
+    def _start_detection(self):
+        cascade = None
+        if self.cascade_checkbox.isChecked():
+            cascade = CascadePolicy(open_images=self.open_images_checkbox.isChecked())
+        self.thread = ObjectDetectionThread(
+            self.image_folder, self.index.filenames(), workers=DETECTION_WORKERS, cascade=cascade
+        )
         self.thread.progress_update.connect(self.update_status)
         self.thread.detection_complete.connect(self.on_detection_complete)
         self.thread.start()
@@ -81,25 +117,25 @@ class ObjectSearchApp(QWidget):
     def update_status(self, processed, total):
         self.status_label.setText(f"Processing: {processed}/{total} images…")
 
-    def on_detection_complete(self, updated_index):
-        self.index_data = updated_index
-        save_index(self.index_data)
+    def on_detection_complete(self, new_entries):
+        self.index.put_many(new_entries)
         self.search_images()
-        self.status_label.setText("Detection complete.")
+        timings = self.thread.timings
+        self.status_label.setText(
+            f"Detection complete (model load {timings['load_seconds']:.1f}s, "
+            f"inference {timings['inference_seconds']:.1f}s)."
+        )
 
     def search_images(self):
         query = self.search_bar.text().lower().strip()
-        filtered_index = {}
+        threshold = self.threshold_spin.value()
         
         if not query:
             # Show all images if no search query
-            filtered_index = self.index_data
+            filtered_index = dict.fromkeys(sorted(self.index.filenames()))
         else:
-            # Filter images based on detected objects
-            for img_path, objects in self.index_data.items():
-                # Check if any detected object matches the search query
-                if any(query in obj.lower() for obj in objects.keys()):
-                    filtered_index[img_path] = objects
+            # The label postings answer the query without loading any entries
+            filtered_index = dict.fromkeys(self.index.search(query, threshold))
         
         if not filtered_index and query:
             self.status_label.setText(f"No objects found matching '{query}'")
@@ -125,36 +161,25 @@ class ObjectSearchApp(QWidget):
             f for f in os.listdir(self.image_folder)
             if f.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
         }
-        indexed = set(self.index_data.keys())
-        new_images = current_images - indexed
+        new_images = current_images - self.index.filenames()
         if new_images:
-            self.thread = ObjectDetectionThread(self.image_folder, self.index_data)
-            self.thread.progress_update.connect(self.update_status)
-            self.thread.detection_complete.connect(self.on_detection_complete)
-            self.thread.start()
+            self._start_detection()
         else:
             self.status_label.setText("No new images found for auto-scan.")
 
     def _open_object_viewer(self, image_path):
         from frontend.components.object_viewer_dialog import ObjectViewerDialog
 
-        dlg = ObjectViewerDialog(image_path, parent=self)
+        entry = self.index.get(os.path.basename(image_path)) or self.index.get(image_path)
+        dlg = ObjectViewerDialog(image_path, entry=entry, threshold=self.threshold_spin.value(), parent=self)
         dlg.image_renamed.connect(self._handle_image_renamed)
         dlg.exec()
 
     def _handle_image_renamed(self, old_path, new_path):
-        # Update index_data keys
-        if old_path in self.index_data:
-            self.index_data[new_path] = self.index_data.pop(old_path)
-        else:
-            # Update nested image lists
-            for entry in self.index_data.values():
-                images = entry.get("images") or entry.get("image_paths") or []
-                for i, p in enumerate(images):
-                    if p == old_path:
-                        images[i] = new_path
-
-        # Persist changes and refresh UI
-        save_index(self.index_data)
+        # Index rows are keyed by filename; fall back to the full path for older rows
+        if not self.index.rename(os.path.basename(old_path), os.path.basename(new_path)):
+            self.index.rename(old_path, new_path)
+
+        # Refresh UI
         self.search_images()
         self.status_label.setText(f"Renamed image: {os.path.basename(old_path)} → {os.path.basename(new_path)}")
\ No newline at end of file
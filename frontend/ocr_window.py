@@ -3,10 +3,9 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit,
     QFileDialog, QScrollArea, QComboBox, QGridLayout, QToolButton
 )
-from backend.ocr_logic import extract_text_tesseract, extract_text_aya_vision
-from backend.storage_manager import load_metadata, save_metadata
+from backend.ocr_thread import OCRThread
+from backend.storage_manager import load_metadata, update_metadata
 from frontend.components.image_widget import ImageWidget
-from PIL import Image
 
 # Paths
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -23,7 +22,12 @@ class OCRWindow(QWidget):
         os.makedirs(THUMB_DIR, exist_ok=True)
 
         self.metadata = load_metadata(METADATA_FILE)
+        # Entries changed or dropped since the last save, so saving journals only those
+        self.unsaved = {}
+        self.removed = set()
         self.image_widgets = []
+        # Background OCR run; None when idle
+        self.ocr_thread = None
 
         # --- Top bar: model dropdown + search + clear ---
         self.model_selector = QComboBox()
@@ -89,6 +93,8 @@ class OCRWindow(QWidget):
         for w in self.image_widgets:
             w.setParent(None)
         self.image_widgets.clear()
+        self.removed.update(self.metadata)
+        self.unsaved.clear()
         self.metadata.clear()
 
         # Load all images from folder
@@ -107,23 +113,62 @@ class OCRWindow(QWidget):
                     row += 1
 
     def run_ocr(self):
-        model = self.model_selector.currentText()
-        for widget in self.image_widgets:
-            img_path = widget.image_path
-            text = (extract_text_tesseract(img_path)
-                    if model == "Tesseract"
-                    else extract_text_aya_vision(img_path))
-            widget.set_text(text)
-            self.metadata[img_path] = text
+        if self.ocr_thread is not None:
+            # A second click stops the run; finished images are kept
+            self.ocr_thread.requestInterruption()
+            self.ocr_button.setEnabled(False)
+            return
+        if not self.image_widgets:
+            return
 
-            # Save thumbnail
-            thumb_path = os.path.join(THUMB_DIR, os.path.basename(img_path))
-            if not os.path.exists(thumb_path):
-                img = Image.open(img_path)
-                img.thumbnail((220, 160))
-                img.save(thumb_path)
+        self.widgets_by_path = {widget.image_path: widget for widget in self.image_widgets}
+        self.ocr_thread = OCRThread(
+            list(self.widgets_by_path), self.model_selector.currentText(), thumb_dir=THUMB_DIR
+        )
+        self.ocr_thread.text_ready.connect(self.on_text_ready)
+        self.ocr_thread.progress_update.connect(self.update_ocr_progress)
+        self.ocr_thread.ocr_complete.connect(self.on_ocr_complete)
+        for control in (self.folder_button, self.refresh_button, self.model_selector):
+            control.setEnabled(False)
+        self.ocr_button.setText("Stop OCR")
+        self.ocr_thread.start()
+
+    def on_text_ready(self, img_path, text):
+        widget = self.widgets_by_path.get(img_path)
+        if widget is not None:
+            widget.set_text(text)
+        self.metadata[img_path] = text
+        self.unsaved[img_path] = text
+        self.removed.discard(img_path)
+
+    def update_ocr_progress(self, done, total):
+        self.ocr_button.setText(f"Stop OCR ({done}/{total})")
+
+    def on_ocr_complete(self):
+        self.ocr_thread = None
+        for control in (self.folder_button, self.refresh_button, self.model_selector, self.ocr_button):
+            control.setEnabled(True)
+        self.ocr_button.setText("Run OCR")
+        self.save_ocr_results()
+        self.perform_search()
 
-        save_metadata(self.metadata, METADATA_FILE)
+    def save_ocr_results(self):
+        """Journal the texts extracted (and entries dropped) since the last save"""
+        if self.unsaved or self.removed:
+            update_metadata(self.unsaved, self.removed, METADATA_FILE)
+            self.unsaved = {}
+            self.removed = set()
+
+    def stop_ocr(self):
+        """Stop a running OCR pass, wait for it and save what it finished (used when the app closes)"""
+        if self.ocr_thread is not None:
+            self.ocr_thread.requestInterruption()
+            self.ocr_thread.wait()
+            # Texts still queued as signals are never delivered once the app closes
+            for img_path, text in self.ocr_thread.results.items():
+                self.on_text_ready(img_path, text)
+            self.ocr_thread = None
+        self.save_ocr_results()
 
     def perform_search(self):
         query = self.search_bar.text().lower()
@@ -162,5 +207,7 @@ class OCRWindow(QWidget):
     def refresh_from_metadata(self):
         """Reload metadata and refresh the grid and thumbnails."""
         self.metadata = load_metadata(METADATA_FILE)
+        self.unsaved = {}
+        self.removed = set()
         self.load_from_metadata()
         self.perform_search()
\ No newline at end of file
@@ -188,6 +188,22 @@ STYLE_SHEETS = {
             border-radius: 4px;
             background-color: rgba(0, 0, 0, 0.03);
         }}
+    """,
+    
+    "drop_zone": f"""
+        QLabel {{
+            font-size: 13px;
+            color: {COLORS['text']['secondary']};
+            border: 2px dashed #D1D5DB;
+            border-radius: 6px;
+            padding: 6px 12px;
+            background-color: white;
+        }}
+        
+        QLabel[dragging="true"] {{
+            border: 2px dashed {COLORS['primary']};
+            color: {COLORS['primary']};
+        }}
     """
 }
 
@@ -24,6 +24,13 @@ class MainApp(QMainWindow):
         self.tabs.addTab(self.object_detection, "Object Detection")
         self.tabs.addTab(self.ocr_window, "OCR Search")
 
+    def closeEvent(self, event):
+        # Let background face ingestion, search and OCR finish their current work before Qt tears their threads down
+        self.face_recognition.stop_face_ingest()
+        self.face_recognition.stop_search()
+        self.ocr_window.stop_ocr()
+        super().closeEvent(event)
+
 def main():
     app = QApplication(sys.argv)
     window = MainApp()
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from PIL import Image
+from backend import main_logic
+from backend.journal import read_store
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """
+    A photo folder with stubbed face detection.
+
+    add(name, seed) writes an image holding one face whose encoding comes
+    from seed; ingest() runs detect_and_cluster_faces over the folder and
+    returns the sorted face IDs.
+    """
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    metadata_file = str(tmp_path / "face_metadata.json")
+    faces = {}
+
+    def add(name, seed):
+        path = folder / name
+        # Distinct bytes, so the ledger does not take one photo for a copy of another
+        Image.new("RGB", (8, 8), (seed, 0, 0)).save(path)
+        faces[str(path)] = np.random.default_rng(seed).normal(size=(1, 128))
+        return str(path)
+
+    def detect(image_paths, workers=1, settings=None):
+        for path in image_paths:
+            yield path, [(0, 4, 4, 0)], faces[str(path)]
+
+    def ingest():
+        main_logic.detect_and_cluster_faces(str(folder), metadata_file=metadata_file, workers=1)
+        return sorted(read_store(metadata_file))
+
+    monkeypatch.setattr(main_logic, "_detect_faces", detect)
+    return SimpleNamespace(folder=folder, metadata_file=metadata_file, faces=faces, add=add, ingest=ingest)
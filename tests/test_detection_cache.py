@@ -0,0 +1,35 @@
+import json
+from backend.detection_cache import DetectionCache
+
+
+def test_results_survive_reopen_and_follow_content(tmp_path):
+    db_file = str(tmp_path / "index.db")
+    image = tmp_path / "a.jpg"
+    image.write_bytes(b"first")
+    cache = DetectionCache("yolo", db_file=db_file, legacy_file=str(tmp_path / "none.json"))
+    digest = cache.file_hash(str(image))
+    cache.put(digest, [{"label": "dog"}])
+    assert cache.dirty
+    cache.save()
+    assert not cache.dirty
+
+    reopened = DetectionCache("yolo", db_file=db_file, legacy_file=str(tmp_path / "none.json"))
+    assert reopened.file_hash(str(image)) == digest
+    assert reopened.get(digest) == [{"label": "dog"}]
+    # Results are per model set
+    assert DetectionCache("detr", db_file=db_file, legacy_file=str(tmp_path / "none.json")).get(digest) is None
+
+    image.write_bytes(b"second, longer")
+    assert reopened.file_hash(str(image)) != digest
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / "detection_cache.json"
+    legacy.write_text(json.dumps({
+        "results": {"yolo": {"abc": [{"label": "cat"}]}},
+        "files": {"/photos/a.jpg": {"hash": "abc", "size": 1, "mtime": 2}},
+    }))
+    db_file = str(tmp_path / "index.db")
+    cache = DetectionCache("yolo", db_file=db_file, legacy_file=str(legacy))
+    assert cache.get("abc") == [{"label": "cat"}]
+    assert cache.migrate_json(str(legacy)) == 0
@@ -0,0 +1,34 @@
+import numpy as np
+from backend import main_logic
+from backend.face_ids import next_face_ids, reserve_face_ids, fresh_face_ids
+from backend.face_recluster import map_to_face_ids
+
+
+def test_next_face_ids_skips_taken_and_starts_at_floor():
+    ids = next_face_ids({"Face_000": 1, "Face_004": 1, "Alice": 1})
+    assert [next(ids), next(ids)] == ["Face_005", "Face_006"]
+    ids = next_face_ids({"Face_000": 1}, start=7)
+    assert next(ids) == "Face_007"
+
+
+def test_merged_top_group_id_is_not_reused(library, tmp_path):
+    for seed in (1, 2, 3):
+        library.add(f"p{seed}.png", seed)
+    assert library.ingest() == ["Face_000", "Face_001", "Face_002"]
+
+    assert main_logic.rename_face_id(str(tmp_path / "face_detected"), "Face_002", "Alice", library.metadata_file)
+    library.add("p4.png", 4)
+    assert library.ingest() == ["Alice", "Face_000", "Face_001", "Face_003"]
+
+
+def test_recluster_ids_skip_retired_numbers(tmp_path):
+    metadata_file = str(tmp_path / "face_metadata.json")
+    # Face_002 and Face_003 were used and deleted since
+    reserve_face_ids(metadata_file, ["Face_003"])
+    labels = np.array([0, 0, 1])
+    assert map_to_face_ids(labels, ["Face_000"] * 3, ["Face_000", "Face_001"], metadata_file) == [
+        "Face_000", "Face_000", "Face_004",
+    ]
+    # The mark only goes up
+    reserve_face_ids(metadata_file, ["Face_001"])
+    assert next(fresh_face_ids(metadata_file, {})) == "Face_004"
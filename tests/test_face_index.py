@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from backend.face_index import IVFFaceIndex, HnswFaceIndex, EXEMPLAR_SEPARATOR, pack_encodings
+
+
+def _encodings(count, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, 128)).astype(np.float32)
+
+
+def test_ivf_round_trip_keeps_nprobe(tmp_path):
+    encodings = _encodings(64)
+    index = IVFFaceIndex(nprobe=3, min_train=32)
+    index.add_many([f"Face_{i:03d}" for i in range(64)], encodings)
+    path = str(tmp_path / "faces.index.npz")
+    index.save(path)
+
+    loaded = IVFFaceIndex.load(path)
+    assert loaded.nprobe == 3
+    assert loaded.trained_size == index.trained_size
+    assert loaded.match(encodings[5]) == "Face_005"
+
+
+def test_hnsw_add_match_remove_and_round_trip(tmp_path):
+    pytest.importorskip("hnswlib")
+    encodings = _encodings(50)
+    metadata = {
+        f"Face_{i:03d}": {"encoding": encodings[i].tolist(), "exemplars": pack_encodings(encodings[i:i + 1] + 0.01)}
+        for i in range(50)
+    }
+    index = HnswFaceIndex.from_metadata(metadata)
+    assert len(index) == 100
+    assert index.match(encodings[7]) == "Face_007"
+    ids, distances = index.search(encodings[7], k=3)[0]
+    assert ids[0] == "Face_007" and len(ids) == 3 and distances[0] <= distances[1]
+
+    index.remove_cluster("Face_007")
+    assert "Face_007" not in index and f"Face_007{EXEMPLAR_SEPARATOR}0" not in index
+    assert index.match(encodings[7]) is None
+
+    # Re-adding reuses no labels, and the new vector wins
+    index.set_cluster("Face_008", {"encoding": encodings[7].tolist()})
+    assert index.match(encodings[7]) == "Face_008"
+
+    path = str(tmp_path / "faces.index.npz")
+    index.save(path)
+    loaded = HnswFaceIndex.load(path)
+    assert sorted(loaded.face_ids()) == sorted(index.face_ids())
+    assert loaded.match(encodings[7]) == "Face_008"
+    assert loaded.match(encodings[20]) == "Face_020"
+
+    del metadata["Face_020"]
+    loaded.sync(metadata)
+    assert "Face_020" not in loaded
@@ -0,0 +1,73 @@
+import os
+import shutil
+import numpy as np
+from PIL import Image
+from backend.face_ledger import FaceLedger
+from backend.face_table import get_face_table
+from backend.journal import read_store
+
+
+def _photo(path, shade):
+    Image.new("RGB", (8, 8), (shade, 0, 0)).save(path)
+    return str(path)
+
+
+def test_bootstrap_seeds_every_folder_once(tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    _photo(first / "a.png", 1)
+    _photo(second / "b.png", 2)
+    # Metadata from before the ledger: a copy album under face_detected
+    metadata = {"Face_000": {"images": ["face_detected/Face_000/a.png", "face_detected/Face_000/b.png"]}}
+    ledger = FaceLedger(str(tmp_path / "ledger.json"))
+
+    assert ledger.bootstrap(str(first), ["a.png"], metadata) == 1
+    assert ledger.bootstrap(str(second), ["b.png"], metadata) == 1
+    assert ledger.missing(str(first), ["a.png"]) == []
+    assert ledger.missing(str(second), ["b.png"]) == []
+
+    # A folder already covered is not seeded again, so a new photo under an old name is examined
+    _photo(first / "b.png", 3)
+    assert ledger.bootstrap(str(first), ["a.png", "b.png"], metadata) == 0
+    assert ledger.missing(str(first), ["a.png", "b.png"]) == ["b.png"]
+
+
+def test_ledger_finds_renames_and_copies(tmp_path):
+    ledger = FaceLedger(str(tmp_path / "ledger.json"))
+    original = _photo(tmp_path / "a.png", 1)
+    ledger.record(original, 1)
+
+    copy = str(tmp_path / "copy.png")
+    shutil.copy(original, copy)
+    renamed = str(tmp_path / "renamed.png")
+    os.rename(original, renamed)
+
+    assert ledger.find(renamed)[0] == ledger.key(original)
+    assert ledger.find(copy)[0] == ledger.key(original)
+    assert not ledger.is_processed(copy)
+    assert ledger.find(_photo(tmp_path / "new.png", 2))[0] is None
+
+
+def test_rename_and_copy_carry_faces_over(library):
+    original = library.add("a.png", 1)
+    library.add("b.png", 2)
+    assert library.ingest() == ["Face_000", "Face_001"]
+    encoding = library.faces[original]
+
+    renamed = str(library.folder / "renamed.png")
+    os.rename(original, renamed)
+    copy = str(library.folder / "copy.png")
+    shutil.copy(renamed, copy)
+    library.faces[renamed] = library.faces[copy] = encoding * 100  # Detection must not run again
+    assert library.ingest() == ["Face_000", "Face_001"]
+
+    group = read_store(library.metadata_file)["Face_000"]
+    assert sorted(group["images"]) == sorted([renamed, copy])
+    # The copy's face counts like any other member's; the rename adds nothing
+    assert group["count"] == 2
+    assert np.allclose(group["encoding"], encoding[0], atol=1e-5)
+    table = get_face_table(library.metadata_file)
+    assert table.faces(renamed) == [((0, 4, 4, 0), "Face_000")]
+    assert table.faces(copy) == [((0, 4, 4, 0), "Face_000")]
+    assert table.faces(original) is None
@@ -0,0 +1,21 @@
+import numpy as np
+from backend.face_recluster import knn_graph, chinese_whispers, compare_assignments
+
+
+def test_chinese_whispers_separates_people():
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(3, 128)).astype(np.float32)
+    # Faces of one person lie within tolerance of each other; people lie far apart
+    encodings = np.vstack([centre + rng.normal(scale=0.01, size=(20, 128)) for centre in centres]).astype(np.float32)
+    neighbours, distances = knn_graph(encodings, k=5)
+    labels = chinese_whispers(neighbours, distances, tolerance=0.5)
+
+    people = np.repeat(np.arange(3), 20)
+    assert len(set(labels.tolist())) == 3
+    for person in range(3):
+        assert len(set(labels[people == person].tolist())) == 1
+
+
+def test_compare_assignments_counts_splits_and_merges():
+    report = compare_assignments(["A", "A", "B", "C"], ["A", "X", "C", "C"])
+    assert report == {"before": 3, "after": 3, "split": 1, "merged": 1, "moved": 2}
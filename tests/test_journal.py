@@ -0,0 +1,58 @@
+import json
+import shutil
+from backend.journal import JournaledStore
+
+
+def _reopen(path):
+    return JournaledStore(path).data
+
+
+def test_replay_after_compaction(tmp_path):
+    path = str(tmp_path / "store.json")
+    store = JournaledStore(path, compact_every=3)
+    store.update({"a": 1})  # The first write creates the snapshot
+    store.update({"b": 2})
+    assert store.records == 1
+    store.update({"c": 3, "d": 4})  # Third record compacts into the snapshot
+    assert store.records == 0
+    with open(path) as f:
+        assert json.load(f) == {"a": 1, "b": 2, "c": 3, "d": 4}
+
+    store.update({"a": 10}, deletes=["b"])
+    assert store.records == 2
+    assert _reopen(path) == {"a": 10, "c": 3, "d": 4}
+
+
+def test_crash_between_snapshot_swap_and_truncation(tmp_path):
+    path = str(tmp_path / "store.json")
+    store = JournaledStore(path)
+    store.update({"a": 1})
+    store.update({"a": 2, "b": 1})
+    store.update(deletes=["b"])
+    journal = tmp_path / "journal.bak"
+    shutil.copy(store.journal_path, journal)
+    store.compact()
+    # The old journal is still there when the snapshot already holds its records
+    shutil.copy(journal, store.journal_path)
+    assert _reopen(path) == {"a": 2}
+
+
+def test_torn_record_is_dropped_and_not_joined(tmp_path):
+    path = str(tmp_path / "store.json")
+    store = JournaledStore(path)
+    store.update({"a": 1})
+    store.update({"b": 2})
+    with open(store.journal_path, "ab") as f:
+        f.write(b'{"op": "set", "key": "c", "va')
+
+    # Another writer appends after the torn record without reloading first
+    store.update({"d": 4})
+    assert _reopen(path) == {"a": 1, "b": 2, "d": 4}
+
+    # A reload truncates a torn tail, and later appends replay
+    with open(store.journal_path, "ab") as f:
+        f.write(b'{"op": "set", "key": "e"')
+    reloaded = JournaledStore(path)
+    assert reloaded.data == {"a": 1, "b": 2, "d": 4}
+    reloaded.update({"f": 6})
+    assert _reopen(path) == {"a": 1, "b": 2, "d": 4, "f": 6}